@@ -1,40 +1,213 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import argparse
 import logging
-import json
 import os
-from dotenv import load_dotenv
 from os import path
 from collect.utility.core.logging_config import setup_logging
+from collect.utility.aws_helper import S3Service
 from collect.utility.ebayapi import EBayAuctions
 from collect.utility.collectbot import CollectBot
+from collect.utility.collectdaemon import CollectDaemon
+from collect.utility.core.cache_gc import GcReport
+from collect.utility.core.image_derivatives import ImageDerivativePipeline
+from collect.utility.core.image_store import ImageStore
+from collect.utility.core.deferred_downloads import DeferredDownloadQueue
+from collect.utility.core.run_metrics import RunMetrics, run_metrics
+from collect.utility.core.offline import set_offline
+from collect.utility.core.profiling import PROFILE_MODES, StageProfiler
+from collect.utility.core.http_session import set_transport
+from collect.utility.core.config_registry import config_registry, thaw
 
-def main() -> int:
+def _latency(value: str) -> float | str:
+	if value == "recorded":
+		return value
+	try:
+		return float(value)
+	except ValueError:
+		raise argparse.ArgumentTypeError("expected a number of seconds or `recorded`")
 
-	if not load_dotenv():
-		raise ValueError("Failed to load the .env file.")
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+	parser = argparse.ArgumentParser(prog="collect", description="Generate the Hobby Report site.")
+	parser.add_argument(
+		"--daemon", action="store_true",
+		help="keep running and refresh each source on its own interval"
+	)
+	parser.add_argument(
+		"--force", action="store_true",
+		help="rebuild every site artifact even if its inputs did not change"
+	)
+	parser.add_argument(
+		"--gc", action="store_true",
+		help="evict cached files over their budget in `cache-gc` and exit"
+	)
+	parser.add_argument(
+		"--dry-run", action="store_true",
+		help="with --gc, list the files that would be evicted without removing them"
+	)
+	parser.add_argument(
+		"--profile", choices=PROFILE_MODES,
+		help="profile each stage of the run (cpu: cProfile and flame graph stacks, mem: tracemalloc)"
+	)
+	parser.add_argument(
+		"--offline", action="store_true",
+		help="use the cached data regardless of its age and make no network requests"
+	)
+	cassette = parser.add_mutually_exclusive_group()
+	cassette.add_argument(
+		"--record", metavar="DIR",
+		help="save every eBay, OpenAI, RSS, robots.txt and image response to a cassette in DIR"
+	)
+	cassette.add_argument(
+		"--replay", metavar="DIR",
+		help="serve the responses recorded in DIR instead of using the network"
+	)
+	parser.add_argument(
+		"--replay-latency", type=_latency, metavar="SECONDS",
+		help="with --replay, delay each response by SECONDS, or by the recorded time with `recorded`"
+	)
+	args: argparse.Namespace = parser.parse_args(argv)
+	if args.profile and args.daemon:
+		parser.error("--profile cannot be used with --daemon")
+	if args.replay_latency is not None and not args.replay:
+		parser.error("--replay-latency requires --replay")
+	if args.offline and (args.record or args.replay):
+		parser.error("--offline cannot be used with --record or --replay")
+	return args
+
+def main(argv: list[str] | None = None) -> int:
+
+	args: argparse.Namespace = parse_args(argv)
+	metrics: RunMetrics = run_metrics()
+	metrics.reset()
+	# Every span of the run is profiled, the directory is set once the
+	# configuration is loaded.
+	profiler: StageProfiler | None = StageProfiler(args.profile, None) if args.profile else None
+	metrics.set_profiler(profiler)
+	if args.offline:
+		set_offline()
+	if args.record or args.replay:
+		from collect.utility.core.cassette import CassetteAdapter, CassetteStore
+	if args.record:
+		set_transport(CassetteAdapter(CassetteStore(args.record), mode="record"))
+	elif args.replay:
+		set_transport(CassetteAdapter(
+			CassetteStore(args.replay), mode="replay", latency=args.replay_latency
+		))
+
+	with metrics.span("config_load"):
+		if not config_registry().load_env():
+			raise ValueError("Failed to load the .env file.")
 
-	app_config: dict[str, any] = None
-	with open("config/config.json", "r") as file:
-		app_config = json.load(file)
+		# A mutable copy, so overrides below are not seen by other readers.
+		app_config: dict[str, any] = thaw(config_registry().json("config/config.json"))
+	metrics_directory: str | None = app_config.get("metrics-directory")
+	if profiler:
+		profiler.set_output_dir(app_config.get("profile-directory", "logs/profile/"))
 
 	setup_logging(app_config["output-log-file"], log_level=logging.INFO)
 	logger = logging.getLogger(__name__)
 	logger.info("Application started")
+	if profiler:
+		# Stages running at the same time on other threads are not profiled.
+		logger.info("Profiling, the build targets and uploads run one at a time.")
+		app_config["build-max-workers"] = 1
+		app_config["aws-s3-max-workers"] = 1
+	if args.replay and app_config.get("aws-s3-upload", False):
+		# S3 and CloudFront calls are made by boto3 and are not recorded.
+		logger.info("Replaying a cassette, the upload to S3 is disabled.")
+		app_config["aws-s3-upload"] = False
 
-	collectbot: CollectBot = CollectBot("Hobby Report", app_config)
+	# The site and its images are only uploaded with `aws-s3-upload` set.
+	s3_service: S3Service | None = None
+	if app_config.get("aws-s3-upload", False) and not args.offline:
+		s3_service = S3Service.from_config(app_config)
+	collectbot: CollectBot = CollectBot("Hobby Report", app_config, s3_service=s3_service)
+
+	if args.gc:
+		report: GcReport = collectbot.collect_garbage(dry_run=args.dry_run)
+		for file_path in report.evicted:
+			print(file_path)
+		print(f"{len(report.evicted)} of {report.scanned} files, {report.freed_bytes} bytes.")
+		if profiler:
+			metrics.set_profiler(None)
+			profiler.close()
+		return 0
+
+	image_pipeline: ImageDerivativePipeline | None = None
+	if app_config.get("image-derivatives", False):
+		if ImageDerivativePipeline.available():
+			image_pipeline = ImageDerivativePipeline(
+				path.join(collectbot.filepath_image_directory, "d"),
+				widths=tuple(app_config.get("image-derivative-widths", (200, 400, 800))),
+				max_workers=app_config.get("image-derivative-workers")
+			)
+		else:
+			logger.warning("Pillow is not installed, image derivatives are disabled.")
+	# The large variants are only consumed by the derivative pipeline.
+	large_images: DeferredDownloadQueue | None = None
+	if image_pipeline and app_config.get("image-large-variants", False):
+		large_images = DeferredDownloadQueue(
+			path.join(collectbot.filepath_cache_directory, "large_image_queue.json"),
+			max_pending=app_config.get("image-large-variants-max-pending", 50)
+		)
+	image_store: ImageStore | None = None
+	if app_config.get("image-content-store", False):
+		image_store = ImageStore(path.join(collectbot.filepath_image_directory, "b"))
 	ebay_auctions: EBayAuctions = EBayAuctions(
 		filepath_cache_directory=collectbot.filepath_cache_directory,
 		filepath_image_directory=collectbot.filepath_image_directory,
 		filepath_config_directory=collectbot.filepath_config_directory,
 		refresh_time=collectbot._config["ebay-refresh-time"],
-		user_agent=collectbot.user_agent
+		user_agent=collectbot.user_agent,
+		s3_service=s3_service,
+		image_pipeline=image_pipeline,
+		image_store=image_store,
+		large_images=large_images,
+		prompt_options={
+			"chunk_size": app_config.get("openai-chunk-size", 20),
+			"max_concurrency": app_config.get("openai-max-concurrency", 4),
+			"tokens_per_minute": app_config.get("openai-tokens-per-minute"),
+			"max_retries": app_config.get("openai-max-retries", 4),
+			"timeout": app_config.get("openai-timeout", 60.0),
+			"url": app_config.get("openai-url", "https://api.openai.com/v1/chat/completions")
+		},
+		ebay_options={
+			"domain": app_config.get("ebay-domain", "svcs.ebay.com"),
+			"https": app_config.get("ebay-https", True),
+			"page_size": app_config.get("ebay-page-size", 100),
+			"max_workers": app_config.get("ebay-search-workers", 4)
+		},
+		candidates=app_config.get("ebay-candidates", 0)
 	)
 	ebay_auctions.load_auctions()
 	collectbot.set_ebay_auctions(ebay_auctions)
-	collectbot.generate_site()	# Uncomment the function inside `generate_site()`
-								#	to upload to s3().
+
+	if args.daemon:
+		daemon: CollectDaemon = CollectDaemon(
+			collectbot, ebay_auctions,
+			jitter=app_config.get("daemon-jitter", 0.1),
+			metrics_directory=metrics_directory
+		)
+		try:
+			return daemon.run()
+		finally:
+			ebay_auctions.close()
+			if image_pipeline:
+				image_pipeline.shutdown()
+
+	try:
+		collectbot.generate_site(force=args.force)	# Set `aws-s3-upload` in config.json to upload to S3.
+	finally:
+		ebay_auctions.close()
+		if image_pipeline:
+			image_pipeline.shutdown()
+		if profiler:
+			metrics.set_profiler(None)
+			profiler.close()
+		if metrics_directory:
+			metrics.write(metrics_directory)
 
 	return 0
 
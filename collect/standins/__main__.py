@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import logging
+import os
+import threading
+
+from collect.standins.servers import StandinBehavior, StandinOptions, StandinServer
+
+def write_config(directory: str, categories: int, items: int, feeds: int) -> None:
+	"""Writes an ``auctions-ebay.json`` and ``rss-feeds.json`` of the given size."""
+	os.makedirs(directory, exist_ok=True)
+	auctions: list[dict[str, any]] = [
+		{
+			"id": str(900000 + index),
+			"title": f"Category {index}",
+			"epn-category": "0",
+			"count": items,
+			"exclude-from-top": False,
+			"visible": True
+		}
+		for index in range(categories)
+	]
+	rss_feeds: list[dict[str, any]] = [
+		{
+			"title": f"Feed {index}",
+			"urls": [f"https://feeds.example.com/{index}/feed/"],
+			"interval": 3600,
+			"filename": f"rss_standin_{index}.json",
+			"max_results": 10
+		}
+		for index in range(feeds)
+	]
+	for name, data in (("auctions-ebay.json", auctions), ("rss-feeds.json", rss_feeds)):
+		with open(os.path.join(directory, name), "w") as file:
+			json.dump(data, file, indent="\t")
+
+def main(argv: list[str] | None = None) -> int:
+	parser = argparse.ArgumentParser(
+		prog="collect.standins",
+		description="Serve local stand-ins for eBay, OpenAI, RSS feeds and images."
+	)
+	parser.add_argument("--host", default="127.0.0.1")
+	parser.add_argument("--port", type=int, default=8900)
+	parser.add_argument("--latency", type=float, default=0.0, help="seconds added to each response")
+	parser.add_argument("--jitter", type=float, default=0.0, help="up to this many random seconds added")
+	parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+	parser.add_argument("--openai-latency", type=float, help="seconds added to each chat completion")
+	parser.add_argument("--openai-error-rate", type=float, help="fraction of chat completions answered with 429")
+	parser.add_argument("--items-per-feed", type=int, default=20)
+	parser.add_argument("--auctions-per-category", type=int, default=1000)
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument(
+		"--write-config", metavar="DIR",
+		help="write auctions-ebay.json and rss-feeds.json for a load test to DIR"
+	)
+	parser.add_argument("--categories", type=int, default=200)
+	parser.add_argument("--items", type=int, default=100, help="items per category")
+	parser.add_argument("--feeds", type=int, default=50)
+	args: argparse.Namespace = parser.parse_args(argv)
+
+	logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s: %(message)s")
+	if args.write_config:
+		write_config(args.write_config, args.categories, args.items, args.feeds)
+
+	def behavior(**overrides: any) -> StandinBehavior:
+		values: dict[str, any] = {
+			"latency": args.latency, "jitter": args.jitter, "error_rate": args.error_rate
+		}
+		values.update({key: value for key, value in overrides.items() if value is not None})
+		return StandinBehavior(**values)
+
+	options: StandinOptions = StandinOptions(
+		ebay=behavior(),
+		openai=behavior(latency=args.openai_latency, error_rate=args.openai_error_rate, error_status=429),
+		rss=behavior(),
+		images=behavior(),
+		items_per_feed=args.items_per_feed,
+		auctions_per_category=args.auctions_per_category,
+		seed=args.seed
+	)
+	server: StandinServer = StandinServer(options, host=args.host, port=args.port)
+	url: str = server.start()
+	print(f"\"ebay-domain\": \"{url.split('://', 1)[1]}\", \"ebay-https\": false,")
+	print(f"\"openai-url\": \"{url}/v1/chat/completions\",")
+	print(f"\"rss-endpoint\": \"{url}\"")
+	try:
+		threading.Event().wait()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.stop()
+		print(f"{server.requests.value} requests, {server.errors.value} injected errors")
+	return 0
+
+if __name__ == "__main__":
+	exit(main())
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import json
+import logging
+import random
+import re
+import threading
+import time
+
+import xml.etree.ElementTree as ElementTree
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Final
+from xml.sax.saxutils import escape
+
+logger = logging.getLogger(__name__)
+
+FINDING_PATH: Final[str] = "/services/search/FindingService/v1"
+CHAT_COMPLETIONS_PATH: Final[str] = "/v1/chat/completions"
+IMAGES_PATH: Final[str] = "/images/"
+
+_WORDS: Final[tuple[str, ...]] = (
+	"Rookie", "Card", "PSA", "Graded", "Signed", "Vintage", "Holo", "Refractor",
+	"Comic", "First", "Appearance", "Sealed", "Box", "Auto", "Patch", "Gold",
+	"Silver", "Rare", "Variant", "Poster", "Coin", "Proof", "Mint", "Edition"
+)
+
+@dataclass
+class StandinBehavior:
+	"""How a stand-in service responds.
+
+	Keyword arguments:
+	* latency -- Seconds added to every response.
+	* jitter -- Up to this many seconds are added at random.
+	* error_rate -- The fraction of requests answered with ``error_status``.
+	* error_status -- The status of the injected errors.
+	"""
+	latency: float = 0.0
+	jitter: float = 0.0
+	error_rate: float = 0.0
+	error_status: int = 503
+
+@dataclass
+class StandinOptions:
+	"""The behavior of each service and the size of the generated data."""
+	ebay: StandinBehavior = field(default_factory=StandinBehavior)
+	openai: StandinBehavior = field(default_factory=lambda: StandinBehavior(error_status=429))
+	rss: StandinBehavior = field(default_factory=StandinBehavior)
+	images: StandinBehavior = field(default_factory=StandinBehavior)
+	items_per_feed: int = 20
+	auctions_per_category: int = 1000
+	image_size: tuple[int, int] = (400, 300)
+	seed: int = 0
+
+def _title(rng: random.Random, words: int = 6) -> str:
+	return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+def finding_response(category_id: str, count: int, base_url: str, seed: int = 0,
+					 page: int = 1, total: int | None = None) -> bytes:
+	"""Returns page ``page`` of a findItemsAdvanced response with ``count``
+	synthetic auctions per page, out of ``total`` in the category.
+	"""
+	total = count if total is None else total
+	now: datetime = datetime.now(timezone.utc)
+	first: int = (page - 1) * count
+	indexes: range = range(first, max(first, min(first + count, total)))
+	items: list[str] = []
+	for index in indexes:
+		rng: random.Random = random.Random(f"{seed}:ebay:{category_id}:{index}")
+		item_id: str = f"{category_id}{index:06d}"
+		end_time: datetime = now + timedelta(minutes=rng.randint(5, 7 * 24 * 60))
+		items.append(
+			"<item>"
+			f"<itemId>{item_id}</itemId>"
+			f"<title>{escape(_title(rng))} {index}</title>"
+			f"<viewItemURL>https://www.ebay.com/itm/{item_id}</viewItemURL>"
+			f"<galleryURL>{escape(base_url)}{IMAGES_PATH}g/{item_id}/s-l140.jpg</galleryURL>"
+			"<sellingStatus>"
+			f"<currentPrice currencyId=\"USD\">{rng.uniform(1, 5000):.2f}</currentPrice>"
+			"</sellingStatus>"
+			"<listingInfo>"
+			f"<endTime>{end_time.strftime('%Y-%m-%dT%H:%M:%S.000Z')}</endTime>"
+			f"<watchCount>{rng.randint(1, 500)}</watchCount>"
+			"</listingInfo>"
+			"</item>"
+		)
+	return (
+		"<?xml version=\"1.0\" encoding=\"UTF-8\"?>"
+		"<findItemsAdvancedResponse xmlns=\"http://www.ebay.com/marketplace/search/v1/services\">"
+		"<ack>Success</ack><version>1.13.0</version>"
+		f"<timestamp>{now.strftime('%Y-%m-%dT%H:%M:%S.000Z')}</timestamp>"
+		f"<searchResult count=\"{len(items)}\">{''.join(items)}</searchResult>"
+		"<paginationOutput>"
+		f"<pageNumber>{page}</pageNumber><entriesPerPage>{count}</entriesPerPage>"
+		f"<totalPages>{-(-total // max(1, count))}</totalPages><totalEntries>{total}</totalEntries>"
+		"</paginationOutput>"
+		"</findItemsAdvancedResponse>"
+	).encode("utf-8")
+
+def rss_response(path: str, count: int, seed: int = 0) -> bytes:
+	"""Returns an RSS 2.0 feed of ``count`` items, newest first."""
+	rng: random.Random = random.Random(f"{seed}:rss:{path}")
+	now: datetime = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+	slug: str = re.sub(r"[^a-z0-9]+", "-", path.lower()).strip("-") or "feed"
+	items: list[str] = []
+	for index in range(count):
+		published: datetime = now - timedelta(minutes=30 * index)
+		link: str = f"https://news.example.com/{slug}/{int(published.timestamp())}"
+		items.append(
+			"<item>"
+			f"<title>{escape(_title(rng, 8))}</title>"
+			f"<link>{link}</link>"
+			f"<guid>{link}</guid>"
+			f"<pubDate>{format_datetime(published)}</pubDate>"
+			"</item>"
+		)
+	return (
+		"<?xml version=\"1.0\" encoding=\"UTF-8\"?>"
+		"<rss version=\"2.0\"><channel>"
+		f"<title>{escape(slug)}</title><link>https://news.example.com/{slug}</link>"
+		f"<description>Stand-in feed</description>{''.join(items)}"
+		"</channel></rss>"
+	).encode("utf-8")
+
+def chat_completion_response(request: dict[str, any]) -> bytes:
+	"""Returns a well-formed function call answering a functional prompt.
+
+	The items of the prompt are read from its JSON block and returned with
+	their identifiers unchanged and their other values rewritten.
+	"""
+	function: dict[str, any] = request["functions"][0]
+	argument: str = function["parameters"]["required"][0]
+	content: str = request["messages"][-1]["content"]
+	match = re.search(r"```json\n(.*?)\n```", content, re.DOTALL)
+	items: list[dict[str, str]] = json.loads(match.group(1)) if match else []
+	results: list[dict[str, str]] = [
+		{
+			key: value if key == "identifier" or not isinstance(value, str)
+			else value.title()
+			for key, value in item.items()
+		}
+		for item in items
+	]
+	prompt_tokens: int = len(json.dumps(request)) // 4
+	completion_tokens: int = len(json.dumps(results)) // 4
+	return json.dumps({
+		"id": f"chatcmpl-standin-{time.monotonic_ns()}",
+		"object": "chat.completion",
+		"created": int(time.time()),
+		"model": request.get("model", "stand-in"),
+		"choices": [{
+			"index": 0,
+			"finish_reason": "stop",
+			"message": {
+				"role": "assistant",
+				"content": None,
+				"function_call": {
+					"name": function["name"],
+					"arguments": json.dumps({argument: results})
+				}
+			}
+		}],
+		"usage": {
+			"prompt_tokens": prompt_tokens,
+			"completion_tokens": completion_tokens,
+			"total_tokens": prompt_tokens + completion_tokens
+		}
+	}).encode("utf-8")
+
+def image_response(size: tuple[int, int]) -> tuple[bytes, str]:
+	"""Returns a placeholder image and its content type."""
+	try:
+		from PIL import Image
+	except ImportError:
+		# A transparent 1x1 GIF.
+		return (b"GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01"
+				b"\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;",
+				"image/gif")
+	buffer: io.BytesIO = io.BytesIO()
+	Image.new("RGB", size, (180, 180, 180)).save(buffer, "JPEG", quality=70)
+	return buffer.getvalue(), "image/jpeg"
+
+class _StandinHandler(BaseHTTPRequestHandler):
+	server: "StandinServer"
+	protocol_version = "HTTP/1.1"
+
+	def log_message(self, format: str, *args) -> None:
+		logger.debug(format % args)
+
+	def _send(self, status: int, body: bytes, content_type: str) -> None:
+		self.send_response(status)
+		self.send_header("Content-Type", content_type)
+		self.send_header("Content-Length", str(len(body)))
+		if status == 429:
+			self.send_header("Retry-After", "1")
+		self.end_headers()
+		self.wfile.write(body)
+
+	def _body(self) -> bytes:
+		length: int = int(self.headers.get("Content-Length", 0))
+		return self.rfile.read(length) if length else b""
+
+	def _behave(self, behavior: StandinBehavior) -> bool:
+		"""Delays the response and returns False when an error was sent instead."""
+		self.server.requests.add(1)
+		delay, failed = self.server.draw(behavior)
+		if delay > 0:
+			time.sleep(delay)
+		if failed:
+			self.server.errors.add(1)
+			self._send(behavior.error_status, b"Injected error", "text/plain")
+			return False
+		return True
+
+	@property
+	def _base_url(self) -> str:
+		return f"http://{self.headers.get('Host', '%s:%d' % self.server.server_address[:2])}"
+
+	def do_POST(self) -> None:
+		options: StandinOptions = self.server.options
+		body: bytes = self._body()
+		if self.path.startswith(FINDING_PATH):
+			if not self._behave(options.ebay):
+				return
+			root = ElementTree.fromstring(body)
+			category: str = next((e.text for e in root.iter() if e.tag.endswith("categoryId")), "0")
+			count: str = next((e.text for e in root.iter() if e.tag.endswith("entriesPerPage")), "100")
+			page: str = next((e.text for e in root.iter() if e.tag.endswith("pageNumber")), "1")
+			self._send(200, finding_response(
+				category, int(count), self._base_url, options.seed,
+				page=int(page), total=options.auctions_per_category
+			), "text/xml;charset=UTF-8")
+		elif self.path.startswith(CHAT_COMPLETIONS_PATH):
+			if not self._behave(options.openai):
+				return
+			self._send(200, chat_completion_response(json.loads(body)), "application/json")
+		else:
+			self._send(404, b"Not found", "text/plain")
+
+	def do_GET(self) -> None:
+		options: StandinOptions = self.server.options
+		if self.path == "/robots.txt":
+			self._send(200, b"User-agent: *\nAllow: /\n", "text/plain")
+		elif self.path.startswith(IMAGES_PATH):
+			if not self._behave(options.images):
+				return
+			self._send(200, *self.server.image())
+		else:
+			if not self._behave(options.rss):
+				return
+			self._send(200, rss_response(self.path, options.items_per_feed, options.seed),
+					   "application/rss+xml; charset=utf-8")
+
+class _Counter:
+	def __init__(self):
+		self._lock: threading.Lock = threading.Lock()
+		self.value: int = 0
+
+	def add(self, value: int) -> None:
+		with self._lock:
+			self.value += value
+
+class StandinServer(ThreadingHTTPServer):
+	"""Local stand-ins for the eBay Finding API, the OpenAI chat completions
+	API, RSS feeds and the eBay image server, on one port.
+
+	Point ``ebay-domain``, ``openai-url`` and ``rss-endpoint`` at the server
+	to run the pipeline against generated data of any size.
+
+	Keyword arguments:
+	* options -- The latency, error rates and data sizes.
+	* host -- The address to listen on.
+	* port -- The port to listen on, or 0 for any free port.
+	"""
+	daemon_threads = True
+
+	def __init__(self, options: StandinOptions | None = None,
+				 host: str = "127.0.0.1", port: int = 0):
+		super().__init__((host, port), _StandinHandler)
+		self.options: StandinOptions = options or StandinOptions()
+		self.requests: _Counter = _Counter()
+		self.errors: _Counter = _Counter()
+		self._rng: random.Random = random.Random(self.options.seed)
+		self._rng_lock: threading.Lock = threading.Lock()
+		self._image: tuple[bytes, str] | None = None
+		self._thread: threading.Thread | None = None
+
+	@property
+	def url(self) -> str:
+		host, port = self.server_address[:2]
+		return f"http://{host}:{port}"
+
+	def draw(self, behavior: StandinBehavior) -> tuple[float, bool]:
+		"""Returns the delay of a response and whether it fails."""
+		with self._rng_lock:
+			delay: float = behavior.latency + self._rng.uniform(0, behavior.jitter)
+			return delay, self._rng.random() < behavior.error_rate
+
+	def image(self) -> tuple[bytes, str]:
+		if self._image is None:
+			self._image = image_response(self.options.image_size)
+		return self._image
+
+	def start(self) -> str:
+		"""Serves requests on a background thread and returns the base URL."""
+		self._thread = threading.Thread(target=self.serve_forever, name="standins", daemon=True)
+		self._thread.start()
+		logger.info(f"Stand-in servers listening on {self.url}")
+		return self.url
+
+	def stop(self) -> None:
+		self.shutdown()
+		self.server_close()
+		if self._thread is not None:
+			self._thread.join()
+			self._thread = None
+
+if __name__ == "__main__":
+	raise ValueError("This script is not meant to be run directly.")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+from collect.utility.core.build_graph import BuildGraph, BuildTarget
+
+class TestBuildGraph(unittest.TestCase):
+
+	def setUp(self):
+		self._tmp = tempfile.TemporaryDirectory()
+		self.dir = self._tmp.name
+		self.state_file = os.path.join(self.dir, "build_state.json")
+		self.source = os.path.join(self.dir, "source.txt")
+		self.page = os.path.join(self.dir, "page.txt")
+		self.builds: list[str] = []
+		with open(self.source, "w") as file:
+			file.write("v1")
+
+	def tearDown(self):
+		self._tmp.cleanup()
+
+	def _write_page(self):
+		self.builds.append("page")
+		with open(self.source, "r") as fin, open(self.page, "w") as fout:
+			fout.write(fin.read().upper())
+
+	def _graph(self) -> BuildGraph:
+		graph = BuildGraph(self.state_file)
+		graph.add_target(BuildTarget(
+			name="page", build=self._write_page,
+			inputs=[self.source], outputs=[self.page]
+		))
+		graph.add_target(BuildTarget(
+			name="backup", build=lambda: self.builds.append("backup"),
+			depends=["page"]
+		))
+		return graph
+
+	def test_second_build_does_nothing(self):
+		self.assertEqual(sorted(self._graph().build()), ["backup", "page"])
+		self.assertEqual(self._graph().build(), [])
+		self.assertEqual(self.builds, ["page", "backup"])
+
+	def test_changed_input_rebuilds_dependents(self):
+		self._graph().build()
+		with open(self.source, "w") as file:
+			file.write("v2")
+		self.assertEqual(self._graph().build(), ["page", "backup"])
+
+	def test_missing_output_and_force(self):
+		self._graph().build()
+		os.remove(self.page)
+		self.assertEqual(self._graph().build(), ["page"])
+		self.assertEqual(sorted(self._graph().build(force=True)), ["backup", "page"])
+
+	def test_failed_target_skips_dependents(self):
+		def fail():
+			raise OSError("disk full")
+		graph = BuildGraph(self.state_file)
+		graph.add_target(BuildTarget(name="page", build=fail))
+		graph.add_target(BuildTarget(name="backup", build=lambda: self.builds.append("backup"), depends=["page"]))
+		with self.assertLogs("collect.utility.core.build_graph", level="ERROR"):
+			with self.assertRaises(OSError):
+				graph.build()
+		self.assertEqual(self.builds, [])
+
+	def test_unknown_dependency(self):
+		graph = BuildGraph(self.state_file)
+		graph.add_target(BuildTarget(name="page", build=lambda: None, depends=["missing"]))
+		with self.assertRaises(ValueError):
+			graph.build()
+
+if __name__ == "__main__":
+	unittest.main()
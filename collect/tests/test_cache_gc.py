@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+from collect.utility.core.cache_gc import CacheBudget, CacheCollector, referenced_files
+
+_DAY: int = 24 * 60 * 60
+
+class TestCacheCollector(unittest.TestCase):
+
+	def setUp(self):
+		self._tmp = tempfile.TemporaryDirectory()
+		self.dir = self._tmp.name
+		self.now = 1_000 * _DAY
+
+	def tearDown(self):
+		self._tmp.cleanup()
+
+	def _write(self, name: str, size: int, age_days: float) -> str:
+		file_path = os.path.join(self.dir, name)
+		os.makedirs(os.path.dirname(file_path), exist_ok=True)
+		with open(file_path, "wb") as file:
+			file.write(b"x" * size)
+		used = self.now - age_days * _DAY
+		os.utime(file_path, (used, used))
+		return file_path
+
+	def _collect(self, budget: CacheBudget, protected=()):
+		return CacheCollector([budget], protected=protected, clock=lambda: self.now).collect()
+
+	def test_evicts_least_recently_used_until_within_budget(self):
+		oldest = self._write("i/a.jpg", 100, 3)
+		older = self._write("i/b.jpg", 100, 2)
+		newest = self._write("i/c.jpg", 100, 1)
+		report = self._collect(CacheBudget(os.path.join(self.dir, "i"), max_bytes=150))
+		self.assertEqual(report.evicted, [oldest, older])
+		self.assertEqual(report.freed_bytes, 200)
+		self.assertTrue(os.path.exists(newest))
+
+	def test_age_budget_keeps_patterns_and_newest(self):
+		kept = self._write("cache/build_state.json", 10, 90)
+		newest = self._write("cache/000261.json", 10, 60)
+		stale = self._write("cache/000213.json", 10, 70)
+		budget = CacheBudget(
+			os.path.join(self.dir, "cache"), max_age_days=30,
+			keep=["build_state.json"], keep_newest=1
+		)
+		report = self._collect(budget)
+		self.assertEqual(report.evicted, [stale])
+		self.assertTrue(os.path.exists(kept))
+		self.assertTrue(os.path.exists(newest))
+
+	def test_never_evicts_files_referenced_by_the_page(self):
+		featured = self._write("httpd/i/d/w400-0123456789abcdef.jpeg", 100, 20)
+		webp = self._write("httpd/i/d/w200-0123456789abcdef.webp", 100, 20)
+		unused = self._write("httpd/i/123.jpg", 100, 20)
+		page = os.path.join(self.dir, "httpd", "index.html")
+		with open(page, "w", encoding="utf-8") as file:
+			file.write(
+				'<picture><source srcset="i/d/w200-0123456789abcdef.webp 200w">'
+				'<img src="i/d/w400-0123456789abcdef.jpeg"></picture>'
+				'<a href="https://www.ebay.com/itm/1">x</a>'
+			)
+		protected = referenced_files(page, os.path.join(self.dir, "httpd"))
+		budget = CacheBudget(os.path.join(self.dir, "httpd", "i"), max_bytes=0, max_age_days=1)
+		report = self._collect(budget, protected)
+		self.assertEqual(report.evicted, [unused])
+		self.assertTrue(os.path.exists(featured))
+		self.assertTrue(os.path.exists(webp))
+
+if __name__ == "__main__":
+	unittest.main()
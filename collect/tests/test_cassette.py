@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from requests import Request, Response, Session
+from requests.adapters import HTTPAdapter
+from collect.utility.core.cassette import CassetteAdapter, CassetteMiss, CassetteStore
+
+def _response(request, **kwargs) -> Response:
+	response = Response()
+	response.status_code = 200
+	response.reason = "OK"
+	response.headers["Content-Type"] = "application/json; charset=utf-8"
+	response.headers["Date"] = "Mon, 19 Oct 2026 10:00:00 GMT"
+	response._content = b'{"ack": "Success"}'
+	response.url = request.url
+	response.request = request
+	return response
+
+class TestCassette(unittest.TestCase):
+
+	def setUp(self):
+		self._tmp = tempfile.TemporaryDirectory()
+		self.store = CassetteStore(self._tmp.name)
+
+	def tearDown(self):
+		self._tmp.cleanup()
+
+	def _session(self, mode: str, **kwargs) -> Session:
+		session = Session()
+		session.mount("https://", CassetteAdapter(self.store, mode=mode, **kwargs))
+		return session
+
+	def test_key_ignores_query_order_json_formatting_and_headers(self):
+		first = Request(
+			"POST", "https://API.example.com/v1?b=2&a=1#top",
+			data='{"model": "gpt", "n": 1}', headers={"Authorization": "one"}
+		).prepare()
+		second = Request(
+			"POST", "https://api.example.com/v1?a=1&b=2",
+			data='{"n":1,"model":"gpt"}', headers={"Authorization": "two"}
+		).prepare()
+		other = Request("POST", "https://api.example.com/v1?a=1&b=3", data='{"n":1}').prepare()
+		self.assertEqual(self.store.key(first), self.store.key(second))
+		self.assertNotEqual(self.store.key(first), self.store.key(other))
+
+	def test_record_then_replay(self):
+		with patch.object(HTTPAdapter, "send", side_effect=_response) as send:
+			recorded = self._session("record").get("https://example.com/feed?x=1")
+		send.assert_called_once()
+		self.assertEqual(len(os.listdir(self._tmp.name)), 1)
+
+		replayed = self._session("replay").get("https://example.com/feed?x=1")
+		self.assertEqual(replayed.status_code, 200)
+		self.assertEqual(replayed.json(), recorded.json())
+		self.assertEqual(replayed.encoding, "utf-8")
+		self.assertNotIn("Date", replayed.headers)
+
+	def test_replay_miss_raises(self):
+		with self.assertRaises(CassetteMiss):
+			self._session("replay").get("https://example.com/never-recorded")
+
+	def test_replay_latency(self):
+		with patch.object(HTTPAdapter, "send", side_effect=_response):
+			self._session("record").get("https://example.com/feed")
+		with patch("collect.utility.core.cassette.time.sleep") as sleep:
+			self._session("replay", latency=0.25).get("https://example.com/feed")
+		sleep.assert_called_once_with(0.25)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import tempfile
+import unittest
+from collect.utility.core.config_registry import ConfigRegistry, thaw
+from collect.utility.core.title_cache import prompt_version
+from collect.utility.gpt_function_prompt import PROMPT_LOADER, load_prompt, parse_prompt
+
+_PROMPT: dict[str, any] = {
+	"name": "test",
+	"context": "Test context.",
+	"prompt": "Rewrite these.",
+	"function": {
+		"name": "headlines_function",
+		"description": "Rewrite each headline.",
+		"parameters": {
+			"type": "object",
+			"properties": {
+				"headlines": {
+					"type": "array",
+					"description": "The headlines.",
+					"items": {
+						"type": "object",
+						"properties": {
+							"headline": {"type": "string", "description": "A headline."},
+							"identifier": {"type": "string", "description": "The identifier."}
+						},
+						"required": ["headline", "identifier"]
+					}
+				}
+			},
+			"required": ["headlines"]
+		}
+	}
+}
+
+class TestConfigRegistry(unittest.TestCase):
+
+	def setUp(self):
+		self._tmp = tempfile.TemporaryDirectory()
+		self.dir = self._tmp.name
+		self.registry = ConfigRegistry(self.dir)
+		self.registry.register_loader(PROMPT_LOADER, parse_prompt)
+
+	def tearDown(self):
+		self._tmp.cleanup()
+
+	def _write(self, name: str, data: any, mtime: int | None = None) -> None:
+		file_path = os.path.join(self.dir, name)
+		with open(file_path, "w") as file:
+			json.dump(data, file)
+		if mtime is not None:
+			os.utime(file_path, (mtime, mtime))
+
+	def test_loads_once_and_reloads_on_change(self):
+		feeds = [{"title": "News", "urls": ["https://example.com/feed"], "interval": 60, "filename": "rss_news.json"}]
+		self._write("rss-feeds.json", feeds, mtime=1_000_000)
+		first = self.registry.json("rss-feeds.json")
+		self.assertIs(self.registry.json("rss-feeds.json"), first)
+		self.assertEqual(thaw(first), feeds)
+		with self.assertRaises(TypeError):
+			first[0]["title"] = "Changed"
+
+		feeds[0]["title"] = "Changed"
+		self._write("rss-feeds.json", feeds, mtime=1_000_100)
+		second = self.registry.json("rss-feeds.json")
+		self.assertIsNot(second, first)
+		self.assertEqual(second[0]["title"], "Changed")
+
+	def test_validates_known_files(self):
+		self._write("auctions-ebay.json", [{"id": "212", "title": "Cards"}])
+		with self.assertRaises(ValueError):
+			self.registry.json("auctions-ebay.json")
+
+	def test_prompt_is_parsed_once(self):
+		self._write("function_headlines.json", _PROMPT)
+		loaded = load_prompt("function_headlines.json", self.registry)
+		self.assertIs(load_prompt("function_headlines.json", self.registry), loaded)
+		self.assertEqual(loaded.version, prompt_version(_PROMPT))
+		self.assertEqual(loaded.function_schema, loaded.prompt.function.to_dict())
+		self.assertEqual(loaded.function_schema["name"], "headlines_function")
+
+	def test_unregistered_kind_is_refused(self):
+		self._write("function_headlines.json", _PROMPT)
+		with self.assertRaises(KeyError):
+			ConfigRegistry(self.dir).load(PROMPT_LOADER, "function_headlines.json")
+
+if __name__ == "__main__":
+	unittest.main()
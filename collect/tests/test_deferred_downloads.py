@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import threading
+import unittest
+from collect.utility.core.deferred_downloads import DeferredDownloadQueue
+
+class TestDeferredDownloadQueue(unittest.TestCase):
+
+	def setUp(self):
+		self._tmp = tempfile.TemporaryDirectory()
+		self.queue_file = os.path.join(self._tmp.name, "queue.json")
+
+	def tearDown(self):
+		self._tmp.cleanup()
+
+	def test_queue_is_capped(self):
+		queue = DeferredDownloadQueue(self.queue_file, max_pending=2)
+		self.assertTrue(queue.enqueue("1_large", "https://example.com/1.jpg"))
+		self.assertTrue(queue.enqueue("1_large", "https://example.com/1.jpg"))
+		self.assertTrue(queue.enqueue("2_large", "https://example.com/2.jpg"))
+		self.assertFalse(queue.enqueue("3_large", "https://example.com/3.jpg"))
+		self.assertEqual(len(queue), 2)
+
+	def test_pending_downloads_are_fetched_on_the_next_run(self):
+		queue = DeferredDownloadQueue(self.queue_file)
+		queue.enqueue("1_large", "https://example.com/1.jpg")
+		queue.close()
+
+		fetched: list[tuple[str, str]] = []
+		queue = DeferredDownloadQueue(self.queue_file)
+		queue.start(lambda identifier, url: fetched.append((identifier, url)) or True)
+		queue.wait()
+		queue.close()
+		self.assertEqual(fetched, [("1_large", "https://example.com/1.jpg")])
+		self.assertEqual(len(DeferredDownloadQueue(self.queue_file)), 0)
+
+	def test_downloads_run_in_the_background(self):
+		release = threading.Event()
+		queue = DeferredDownloadQueue(self.queue_file, max_workers=1)
+		queue.start(lambda identifier, url: release.wait(5))
+		queue.enqueue("1_large", "https://example.com/1.jpg")
+		self.assertIn("1_large", queue)
+		release.set()
+		queue.wait()
+		self.assertNotIn("1_large", queue)
+		queue.close()
+
+if __name__ == "__main__":
+	unittest.main()
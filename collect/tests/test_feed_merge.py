@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+from collect.utility.core.feed_merge import canonical_link, merge_by_date, merge_items
+from collect.utility.core.feed_parser import FeedEntry
+
+def _item(link: str, date_added: str = "2024-01-02T00:00:00", guid: str | None = None) -> dict[str, str]:
+	item: dict[str, str] = {"title": link, "link": link, "date-added": date_added}
+	if guid:
+		item["guid"] = guid
+	return item
+
+class TestFeedMerge(unittest.TestCase):
+
+	def test_canonical_link(self):
+		self.assertEqual(
+			canonical_link("HTTP://Example.com/a/?utm_source=x&b=2&a=1&fbclid=y#top"),
+			"https://example.com/a?a=1&b=2"
+		)
+
+	def test_keeps_first_seen_date_and_order(self):
+		cached = [
+			_item("https://example.com/1", "2024-01-01T00:00:00"),
+			_item("https://example.com/2", "2024-01-01T00:00:00", guid="g-2")
+		]
+		new = [
+			_item("https://example.com/3"),
+			_item("https://example.com/1?utm_medium=rss"),
+			_item("https://example.com/2-renamed", guid="g-2")
+		]
+		merged = merge_items(new, cached, max_size=10)
+		self.assertEqual([item["link"] for item in merged], [
+			"https://example.com/3",
+			"https://example.com/1?utm_medium=rss",
+			"https://example.com/2-renamed"
+		])
+		self.assertEqual(
+			[item["date-added"] for item in merged],
+			["2024-01-02T00:00:00", "2024-01-01T00:00:00", "2024-01-01T00:00:00"]
+		)
+		self.assertEqual(new[1]["date-added"], "2024-01-02T00:00:00")
+
+	def test_caps_the_result(self):
+		cached = [_item(f"https://example.com/{i}") for i in range(100)]
+		new = [_item(f"https://example.com/new/{i}") for i in range(5)]
+		merged = merge_items(new, cached, max_size=8)
+		self.assertEqual(len(merged), 8)
+		self.assertEqual(merged[5]["link"], "https://example.com/0")
+
+	def test_merge_by_date(self):
+		read: list[str] = []
+
+		def feed(name: str, dates: list[float | None]):
+			for i, published in enumerate(dates):
+				read.append(f"{name}{i}")
+				yield FeedEntry(f"{name}{i}", f"https://example.com/{name}{i}", None, published)
+
+		merged = merge_by_date([
+			feed("a", [100.0, 50.0, 10.0, 5.0, 1.0]),
+			feed("b", [90.0, None, 80.0, 70.0, 60.0]),
+			feed("c", [None, 95.0])
+		], max_results=5, now=1000.0)
+		self.assertEqual([entry.title for entry in merged], ["c0", "a0", "c1", "b0", "b1"])
+		self.assertNotIn("a4", read)
+		self.assertNotIn("b4", read)
+
+if __name__ == "__main__":
+	unittest.main()
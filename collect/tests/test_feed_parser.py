@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+from collect.utility.core.feed_parser import FeedChannel, FeedEntry, parse_feed, parse_timestamp
+
+_RSS: bytes = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0" xmlns:content="http://purl.org/rss/1.0/modules/content/"><channel>
+<title>Feed</title><link>https://example.com/</link>
+<item><title>First</title><link>https://example.com/1</link><guid isPermaLink="false">a-1</guid>
+<content:encoded><![CDATA[<p>Long text</p>]]></content:encoded></item>
+<item><title>No link</title></item>
+<item><title> Second </title><guid>https://example.com/2</guid></item>
+</channel></rss>"""
+
+_ATOM: bytes = """<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom"><title>Feed</title>
+<link href="https://example.com/"/>
+<entry><title>Café</title><link rel="replies" href="https://example.com/1#comments"/>
+<link rel="alternate" href="https://example.com/1"/><id>tag:example.com,2024:1</id></entry>
+</feed>""".encode("utf-8")
+
+def _chunks(data: bytes, size: int = 7):
+	for i in range(0, len(data), size):
+		yield data[i:i + size]
+
+class TestFeedParser(unittest.TestCase):
+
+	def test_rss(self):
+		entries = list(parse_feed(_chunks(_RSS)))
+		self.assertEqual(entries, [
+			FeedEntry("First", "https://example.com/1", "a-1"),
+			FeedEntry("Second", "https://example.com/2", "https://example.com/2")
+		])
+
+	def test_atom(self):
+		entries = list(parse_feed(_chunks(_ATOM)))
+		self.assertEqual(entries, [
+			FeedEntry("Café", "https://example.com/1", "tag:example.com,2024:1")
+		])
+
+	def test_stops_reading_after_max_results(self):
+		items: bytes = b"".join(
+			b"<item><title>T%d</title><link>https://example.com/%d</link></item>" % (i, i)
+			for i in range(1000)
+		)
+		body: bytes = b"<rss><channel>" + items + b"</channel></rss>"
+		read: list[bytes] = []
+
+		def chunks():
+			for chunk in _chunks(body, 256):
+				read.append(chunk)
+				yield chunk
+
+		entries = list(parse_feed(chunks(), max_results=3))
+		self.assertEqual([entry.title for entry in entries], ["T0", "T1", "T2"])
+		self.assertLess(sum(len(chunk) for chunk in read), 1024)
+
+	def test_dates(self):
+		self.assertEqual(parse_timestamp("Tue, 02 Jan 2024 10:00:00 GMT"), 1704189600.0)
+		self.assertEqual(parse_timestamp("2024-01-02T12:00:00+02:00"), 1704189600.0)
+		self.assertEqual(parse_timestamp("2024-01-02T10:00:00Z"), 1704189600.0)
+		self.assertIsNone(parse_timestamp("yesterday"))
+		body: bytes = (
+			b"<feed xmlns='http://www.w3.org/2005/Atom'><entry><link href='https://example.com/1'/>"
+			b"<updated>2024-01-03T00:00:00Z</updated><published>2024-01-02T10:00:00Z</published>"
+			b"</entry></feed>"
+		)
+		self.assertEqual([entry.published for entry in parse_feed([body])], [1704189600.0])
+
+	def test_channel_hints(self):
+		body: bytes = (
+			b"<rss><channel><ttl>60</ttl><skipHours><hour>0</hour><hour>24</hour><hour>7</hour></skipHours>"
+			b"<item><link>https://example.com/1</link><ttl>5</ttl></item></channel></rss>"
+		)
+		channel = FeedChannel()
+		list(parse_feed([body], channel=channel))
+		self.assertEqual(channel, FeedChannel(ttl=3600.0, skip_hours=frozenset({0, 7})))
+
+if __name__ == "__main__":
+	unittest.main()
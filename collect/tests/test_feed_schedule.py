@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+from collect.utility.core.feed_parser import FeedEntry
+from collect.utility.core.feed_schedule import FeedSchedule, cache_control_max_age
+from collect.utility.core.rss_tool import RssTool
+
+class TestFeedSchedule(unittest.TestCase):
+
+	def test_default_until_publication_dates_are_known(self):
+		schedule = FeedSchedule()
+		self.assertEqual(schedule.interval(7200, 900, 86400), 7200)
+		schedule.record([1000.0, None], hit=True)
+		self.assertEqual(schedule.interval(7200, 900, 86400), 7200)
+
+	def test_interval_follows_publish_rate(self):
+		schedule = FeedSchedule()
+		schedule.record([0.0, 3600.0, 7200.0, 10800.0], hit=True)
+		self.assertEqual(schedule.interval(54000, 900, 86400), 1800)
+		schedule.record([10800.0], hit=False)
+		schedule.record([10800.0], hit=False)
+		self.assertEqual(schedule.interval(54000, 900, 86400), 1800 * 1.5 ** 2)
+		self.assertEqual(schedule.interval(54000, 900, 3000), 3000)
+		schedule.record([14400.0], hit=True)
+		self.assertEqual(schedule.interval(54000, 2000, 86400), 2000)
+
+	def test_hints(self):
+		schedule = FeedSchedule()
+		schedule.record([0.0, 600.0], hit=True, ttl=3600.0)
+		self.assertEqual(schedule.interval(7200, 60, 86400), 3600)
+		schedule.record([1200.0], hit=True, max_age=5400.0)
+		self.assertEqual(schedule.interval(7200, 60, 86400), 5400)
+		self.assertEqual(cache_control_max_age("public, max-age=300, s-maxage=600"), 300)
+		self.assertIsNone(cache_control_max_age("no-store, max-age=300"))
+		self.assertIsNone(cache_control_max_age(None))
+
+	def test_skip_hours(self):
+		schedule = FeedSchedule()
+		schedule.record([], hit=True, skip_hours=[1, 2, 3])
+		# 2024-01-02 00:30 GMT, due at 01:30 and moved to 04:00.
+		last: float = 1704155400.0
+		self.assertEqual(schedule.next_refresh(last, 3600, 900, 86400), 1704168000.0)
+		self.assertEqual(schedule.next_refresh(last, 3600, 900, 7200), last + 7200)
+
+	def test_round_trip(self):
+		schedule = FeedSchedule()
+		schedule.record([5.0, 1.0], hit=False, ttl=60.0, skip_hours={2})
+		self.assertEqual(FeedSchedule.from_dict(schedule.to_dict()), schedule)
+
+	def test_group_reads_only_the_due_feeds(self):
+		fast, slow = "https://example.com/fast", "https://example.com/slow"
+		with tempfile.TemporaryDirectory() as directory:
+			tool = RssTool("TestBot/1.0", urls=[fast, slow], cache_directory=directory,
+						   min_interval=60, max_interval=86400)
+			tool._cache = [{"title": "Old", "link": "https://example.com/old", "date-added": "2024-01-01"}]
+			now: float = time.time()
+			tool._schedule(fast).record([now - 600, now - 300], hit=True, now=now - 3600)
+			tool._schedule(slow).record([now - 86400, now - 43200], hit=True, now=now - 3600)
+			read: list[str] = []
+
+			def entries(url, known):
+				read.append(url)
+				yield FeedEntry("New", "https://example.com/new", None, now)
+
+			with patch.object(tool, "_feed_entries", side_effect=entries):
+				self.assertTrue(tool.refresh())
+		self.assertEqual(read, [fast])
+		self.assertEqual([item["title"] for item in tool.items], ["New", "Old"])
+
+if __name__ == "__main__":
+	unittest.main()
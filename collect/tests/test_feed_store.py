@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+from collect.utility.collectdaemon import CollectDaemon
+from collect.utility.core.config_registry import freeze
+from collect.utility.core.feed_store import FeedStore
+
+_ITEM: dict[str, str] = {
+	"title": "First", "link": "https://example.com/1", "date-added": "2024-01-02T00:00:00"
+}
+
+class TestFeedStore(unittest.TestCase):
+
+	def setUp(self):
+		self._directory = tempfile.TemporaryDirectory()
+		self.directory: str = self._directory.name
+		self.store_path: str = os.path.join(self.directory, "feeds.json")
+		self.legacy_path: str = os.path.join(self.directory, "rss_a.json")
+		with open(self.legacy_path, "w") as file:
+			json.dump({"cache": [_ITEM], "last_fetch_time": "2024-01-02T00:00:00"}, file)
+
+	def tearDown(self):
+		self._directory.cleanup()
+
+	def _store(self) -> FeedStore:
+		return FeedStore(self.store_path, "TestBot/1.0", legacy_directory=self.directory)
+
+	def test_migrates_legacy_files(self):
+		store = self._store()
+		tool = store.group("A", ["https://example.com/feed"], 3600, "rss_a.json")
+		self.assertEqual(tool.items, [_ITEM])
+		self.assertTrue(store.save())
+		self.assertFalse(os.path.exists(self.legacy_path))
+		self.assertFalse(os.path.exists(self.store_path + ".tmp"))
+
+		reloaded = self._store()
+		tool = reloaded.group("A", ["https://example.com/feed"], 3600, "rss_a.json")
+		self.assertEqual(tool.items, [_ITEM])
+		self.assertFalse(reloaded.save())
+
+	def test_saves_changed_groups(self):
+		store = self._store()
+		store.group("A", ["https://example.com/feed"], 3600, "rss_a.json")
+		store.update("rss_b.json", {"cache": [], "last_fetch_time": None})
+		store.save()
+		encoded: str = store._encoded["rss_a.json"]
+		store.update("rss_b.json", {"cache": [_ITEM], "last_fetch_time": None})
+		self.assertTrue(store.changed)
+		store.save()
+		self.assertIs(store._encoded["rss_a.json"], encoded)
+		with open(self.store_path) as file:
+			groups = json.load(file)["groups"]
+		self.assertEqual(groups["rss_b.json"]["cache"], [_ITEM])
+		self.assertEqual(groups["rss_a.json"]["cache"], [_ITEM])
+
+	def test_edited_group_is_read_with_the_new_settings(self):
+		store = self._store()
+		tool = store.group("A", ("https://example.com/feed",), 3600, "rss_a.json")
+		self.assertIs(store.group("A", ("https://example.com/feed",), 3600, "rss_a.json"), tool)
+		edited = store.group("A", ("https://example.com/feed", "https://example.com/more"), 3600, "rss_a.json")
+		self.assertIsNot(edited, tool)
+		self.assertEqual(edited.items, [_ITEM])
+
+	def test_daemon_follows_the_feed_groups(self):
+		feeds: list[dict[str, any]] = [
+			{"title": "A", "urls": ["https://example.com/feed"], "interval": 3600, "filename": "rss_a.json"}
+		]
+		collectbot = MagicMock(feed_store=self._store())
+		collectbot.rss_feeds.side_effect = lambda: freeze(feeds)
+		ebay = MagicMock()
+		ebay.seconds_until_stale.return_value = 3600.0
+		daemon = CollectDaemon(collectbot, ebay)
+		names = lambda: sorted(job.name for job in daemon.scheduler._jobs)
+		self.assertEqual(names(), ["A", "ebay", "rss-feeds.json"])
+		self.assertFalse(daemon._sync_feed_jobs())
+
+		feeds.append({"title": "B", "urls": ["https://example.com/b"], "interval": 600, "filename": "rss_b.json"})
+		feeds[0] = dict(feeds[0], title="Renamed")
+		self.assertTrue(daemon._sync_feed_jobs())
+		self.assertEqual(names(), ["B", "Renamed", "ebay", "rss-feeds.json"])
+
+		del feeds[1]
+		self.assertTrue(daemon._sync_feed_jobs())
+		self.assertEqual(names(), ["Renamed", "ebay", "rss-feeds.json"])
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone, timedelta
+from unittest.mock import patch
+from collect.utility.core.file_upload_tracker import FileUploadTracker
+
+class TestFileUploadTracker(unittest.TestCase):
+
+	def setUp(self):
+		self._tmp = tempfile.TemporaryDirectory()
+		self.dir = self._tmp.name
+		self.file = self._write("a/style.css", "p{}")
+		self.tracker = FileUploadTracker(self.dir)
+
+	def tearDown(self):
+		self._tmp.cleanup()
+
+	def _write(self, name: str, content: str) -> str:
+		file_path = os.path.join(self.dir, name)
+		os.makedirs(os.path.dirname(file_path), exist_ok=True)
+		with open(file_path, "w") as file:
+			file.write(content)
+		return file_path
+
+	def test_unchanged_stat_skips_hashing(self):
+		self.assertTrue(self.tracker.has_changed(self.file, "style.css"))
+		self.tracker.mark_as_uploaded(self.file, key="style.css")
+		with patch.object(self.tracker, "_hash_file") as hash_file:
+			self.assertFalse(self.tracker.has_changed(self.file, "style.css"))
+		hash_file.assert_not_called()
+
+	def test_touched_file_with_same_content_is_unchanged(self):
+		self.tracker.mark_as_uploaded(self.file, key="style.css")
+		stat = os.stat(self.file)
+		os.utime(self.file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+		self.assertFalse(self.tracker.has_changed(self.file, "style.css"))
+
+	def test_change_during_upload_is_not_recorded_as_uploaded(self):
+		digests = self.tracker.file_digests(self.file, "style.css")
+		stat = os.stat(self.file)
+		self._write("a/style.css", "p{color:red}")
+		os.utime(self.file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+		self.tracker.mark_as_uploaded(self.file, key="style.css", digests=digests)
+		self.assertTrue(self.tracker.has_changed(self.file, "style.css"))
+
+	def test_entries_are_keyed_by_object_key(self):
+		other = self._write("b/style.css", "body{}")
+		self.tracker.mark_as_uploaded(self.file, key="a/style.css")
+		self.tracker.mark_as_uploaded(other, key="b/style.css")
+		self.assertFalse(self.tracker.has_changed(self.file, "a/style.css"))
+		self.assertFalse(self.tracker.has_changed(other, "b/style.css"))
+		entry = FileUploadTracker(self.dir).uploaded_files["a/style.css"]
+		self.assertEqual(set(entry), {"size", "mtime_ns", "sha256", "md5", "uploaded_at"})
+
+	def test_legacy_hash_entries_are_migrated(self):
+		with open(self.tracker.cache_file, "w") as file:
+			json.dump({"style.css": self.tracker._hash_file(self.file)}, file)
+		tracker = FileUploadTracker(self.dir)
+		self.assertFalse(tracker.has_changed(self.file))
+
+	def test_prune(self):
+		self.tracker.mark_as_uploaded(self.file, key="i/1.jpg")
+		self.tracker.mark_as_uploaded(self.file, key="i/2.jpg")
+		self.tracker.mark_as_uploaded(self.file, key="index.html")
+		self.assertEqual(self.tracker.prune(["i/1.jpg"], prefix="i/", max_age_days=12), 0)
+
+		old = (datetime.now(timezone.utc) - timedelta(days=13)).isoformat()
+		self.tracker.uploaded_files["i/2.jpg"]["uploaded_at"] = old
+		self.assertEqual(self.tracker.prune(["i/1.jpg"], prefix="i/", max_age_days=12), 1)
+		self.assertEqual(sorted(self.tracker.uploaded_files), ["i/1.jpg", "index.html"])
+
+	def test_missing_file(self):
+		with self.assertRaises(FileNotFoundError):
+			self.tracker.has_changed(os.path.join(self.dir, "missing.txt"))
+
+if __name__ == "__main__":
+	unittest.main()
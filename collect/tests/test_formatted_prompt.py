@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import unittest
+from unittest.mock import patch, MagicMock
+import requests
+from collect.utility.formatted_prompt import PromptPersonalityFunctional
+from collect.utility.gpt_function_prompt import GptFunctionPrompt
+from collect.utility.core.rate_limit import TokenBudget
+
+def _response(status_code: int, items: list[dict[str, str]] | None = None,
+			  headers: dict[str, str] | None = None) -> MagicMock:
+	response = MagicMock(status_code=status_code, headers=headers or {}, text="")
+	arguments = json.dumps({"headlines": [
+		{"headline": title.upper(), "identifier": identifier}
+		for title, identifier in ((i["headline"], i["identifier"]) for i in items or [])
+	]})
+	response.json.return_value = {
+		"choices": [{"message": {"function_call": {"arguments": arguments}}}],
+		"usage": {"total_tokens": 100}
+	}
+	response.raise_for_status.side_effect = requests.HTTPError(str(status_code))
+	return response
+
+class TestPromptPersonalityFunctional(unittest.TestCase):
+
+	def setUp(self):
+		with open("prompts/function_headlines.json", "r") as file:
+			self.prompt = GptFunctionPrompt.from_dict(json.load(file))
+		self.sleeps: list[float] = []
+
+	def _fprompt(self, **kwargs) -> PromptPersonalityFunctional:
+		fprompt = PromptPersonalityFunctional(
+			"key", self.prompt, sleep=self.sleeps.append, **kwargs
+		)
+		fprompt.add_prompt_item_data(*((f"title {i}", str(i)) for i in range(5)))
+		return fprompt
+
+	@staticmethod
+	def _reply(**kwargs):
+		content: str = kwargs["json"]["messages"][1]["content"]
+		items = json.loads(content.split("```json\n")[1].split("\n```")[0])
+		return _response(200, items)
+
+	def test_chunks_are_merged_in_item_order(self):
+		session = MagicMock()
+		session.post.side_effect = TestPromptPersonalityFunctional._reply
+		with patch("collect.utility.formatted_prompt.shared_session", return_value=session):
+			results = self._fprompt(chunk_size=2, max_concurrency=3).get_results()
+		self.assertEqual(session.post.call_count, 3)
+		self.assertEqual([r["identifier"] for r in results], ["0", "1", "2", "3", "4"])
+		self.assertEqual(results[0]["headline"], "TITLE 0")
+
+	def test_prompts_share_a_budget(self):
+		session = MagicMock()
+		session.post.side_effect = TestPromptPersonalityFunctional._reply
+		budget = TokenBudget(100000, clock=lambda: 0.0)
+		with patch("collect.utility.formatted_prompt.shared_session", return_value=session):
+			for _ in range(2):
+				self._fprompt(budget=budget, tokens_per_minute=10).get_results()
+		self.assertEqual(budget._available, 100000 - 2 * 100)
+
+	def test_retries_on_429_and_honors_retry_after(self):
+		session = MagicMock()
+		session.post.side_effect = [
+			_response(429, headers={"Retry-After": "7"}),
+			requests.Timeout("slow"),
+			_response(200, [{"headline": "a", "identifier": str(i)} for i in range(5)])
+		]
+		with patch("collect.utility.formatted_prompt.shared_session", return_value=session):
+			results = self._fprompt().get_results()
+		self.assertEqual(len(results), 5)
+		self.assertEqual(len(self.sleeps), 2)
+		self.assertGreaterEqual(self.sleeps[0], 7)
+		self.assertEqual(session.post.call_args.kwargs["timeout"], 60.0)
+
+	def test_failed_chunk_is_left_out(self):
+		def reply(**kwargs):
+			if '"0"' in kwargs["json"]["messages"][1]["content"]:
+				return _response(503)
+			return TestPromptPersonalityFunctional._reply(**kwargs)
+		session = MagicMock()
+		session.post.side_effect = reply
+		with patch("collect.utility.formatted_prompt.shared_session", return_value=session):
+			results = self._fprompt(chunk_size=2, max_retries=1).get_results()
+		self.assertEqual([r["identifier"] for r in results], ["2", "3", "4"])
+
+class TestTokenBudget(unittest.TestCase):
+
+	def test_acquire_waits_for_refill(self):
+		now = [0.0]
+		def sleep(seconds: float):
+			now[0] += seconds
+		budget = TokenBudget(600, clock=lambda: now[0], sleep=sleep)
+		budget.acquire(600)
+		budget.acquire(100)
+		self.assertAlmostEqual(now[0], 10.0)
+		budget.adjust(-100)
+		budget.acquire(100)
+		self.assertAlmostEqual(now[0], 10.0)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from collect.utility.collectbot_template import CollectBotTemplate
+from collect.utility.core.image_derivatives import ImageDerivativePipeline
+
+@unittest.skipUnless(ImageDerivativePipeline.available(), "Pillow is not installed")
+class TestImageDerivativePipeline(unittest.TestCase):
+
+	def setUp(self):
+		from PIL import Image
+		self._tmp = tempfile.TemporaryDirectory()
+		self.dir = self._tmp.name
+		self.source = os.path.join(self.dir, "123.jpg")
+		Image.new("RGB", (500, 250), (200, 30, 30)).save(self.source, "JPEG")
+		self.executor = ThreadPoolExecutor(max_workers=2)
+		self.pipeline = self._pipeline()
+
+	def tearDown(self):
+		self.executor.shutdown()
+		self._tmp.cleanup()
+
+	def _pipeline(self) -> ImageDerivativePipeline:
+		return ImageDerivativePipeline(
+			os.path.join(self.dir, "d"), widths=(200, 400, 800),
+			executor=self.executor
+		)
+
+	def test_derivatives_are_never_upscaled(self):
+		responsive = self.pipeline.submit(self.source).result()
+		widths = sorted({variant.width for variant in responsive.variants})
+		self.assertEqual(widths, [200, 400, 500])
+		self.assertEqual(len(responsive.variants), 6)
+		for variant in responsive.variants:
+			self.assertTrue(os.path.exists(self.pipeline.local_path(variant)))
+			self.assertEqual(variant.height, variant.width // 2)
+		self.assertEqual(responsive.fallback(400).width, 400)
+
+	def test_cached_derivatives_skip_the_pool(self):
+		self.pipeline.submit(self.source).result()
+		pipeline = self._pipeline()
+		with patch.object(self.executor, "submit") as submit:
+			responsive = pipeline.submit(self.source).result()
+		submit.assert_not_called()
+		self.assertEqual(len(responsive.variants), 6)
+
+	def test_concurrent_jobs_are_all_indexed(self):
+		from PIL import Image
+		sources: list[str] = []
+		for number in range(8):
+			source: str = os.path.join(self.dir, f"{number}.jpg")
+			Image.new("RGB", (300, 150), (number * 30, 30, 30)).save(source, "JPEG")
+			sources.append(source)
+		for future in [self.pipeline.submit(source) for source in sources]:
+			future.result()
+		pipeline = self._pipeline()
+		with patch.object(self.executor, "submit") as submit:
+			for source in sources:
+				pipeline.submit(source).result()
+		submit.assert_not_called()
+
+	def test_featured_image_markup(self):
+		responsive = self.pipeline.submit(self.source).result()
+		html = CollectBotTemplate.make_featured_image(
+			"i/123.jpg", "Featured", responsive=responsive, sizes="400px"
+		)
+		self.assertIn("<picture><source type=\"image/webp\"", html)
+		self.assertIn(" 200w, ", html)
+		self.assertIn("width=\"400\" height=\"200\"", html)
+		self.assertIn("loading=\"eager\"", html)
+		self.assertNotIn("i/123.jpg", html)
+
+if __name__ == "__main__":
+	unittest.main()
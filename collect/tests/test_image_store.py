@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+from collect.utility.core.imagecache import ImageCache
+from collect.utility.core.image_store import ImageStore
+
+class TestImageStore(unittest.TestCase):
+
+	def setUp(self):
+		self._tmp = tempfile.TemporaryDirectory()
+		self.dir = self._tmp.name
+		self.store = ImageStore(os.path.join(self.dir, "b"))
+
+	def tearDown(self):
+		self._tmp.cleanup()
+
+	def test_identical_images_share_one_blob(self):
+		first = self.store.put("111", b"photo", ".JPG")
+		second = self.store.put("222", b"photo", ".jpg")
+		self.assertEqual(first, second)
+		self.assertTrue(first.endswith(".jpg"))
+		self.assertEqual(self.store.lookup("222"), first)
+		self.assertEqual(len([n for n in os.listdir(self.store.directory) if n.endswith(".jpg")]), 1)
+		self.assertIsNone(ImageStore(self.store.directory).lookup("111"))
+		self.assertTrue(self.store.flush())
+		self.assertFalse(self.store.flush())
+		self.assertEqual(ImageStore(self.store.directory).lookup("111"), first)
+
+	def test_evicted_blob_is_not_found(self):
+		os.remove(self.store.put("111", b"photo", ".jpg"))
+		self.assertIsNone(self.store.lookup("111"))
+
+	def test_migrate_moves_legacy_files_into_the_store(self):
+		for name in ("111.jpg", "111_large.jpg", "222.jpg"):
+			with open(os.path.join(self.dir, name), "wb") as file:
+				file.write(b"large" if "large" in name else b"photo")
+		self.assertEqual(self.store.migrate(self.dir, (".jpg",)), 3)
+		self.assertFalse(os.path.exists(os.path.join(self.dir, "111.jpg")))
+		self.assertEqual(self.store.lookup("111"), self.store.lookup("222"))
+		self.assertNotEqual(self.store.lookup("111"), self.store.lookup("111_large"))
+
+	def test_image_cache_downloads_into_the_store(self):
+		session = MagicMock()
+		session.get.return_value.content = b"photo"
+		with patch("collect.utility.core.imagecache.shared_session", return_value=session):
+			cache = ImageCache(
+				url="https://i.ebayimg.com/images/g/x/s-l400.jpg", identifier="111",
+				cache_dir=self.dir, store=self.store
+			)
+			self.assertTrue(cache.download_image_if_needed())
+			self.assertTrue(cache.download_image_if_needed())
+		session.get.assert_called_once()
+		self.assertEqual(cache.image_path, self.store.lookup("111"))
+		self.assertFalse(os.path.exists(os.path.join(self.dir, "111.jpg")))
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+_ROOT: str = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Heavy dependencies that must only be imported when they are used.
+_LAZY_MODULES: tuple[str, ...] = ("boto3", "botocore", "ebaysdk", "markdown", "requests")
+
+# The budget for the time spent in the collect modules themselves while
+# importing collect.__main__, in milliseconds.  Third party and standard
+# library imports are left out, as their cost depends on the machine and
+# its disk cache.  Set COLLECT_IMPORT_BUDGET_MS to adjust it.
+_BUDGET_MS: float = float(os.getenv("COLLECT_IMPORT_BUDGET_MS", "100"))
+_IMPORT_TIME: re.Pattern = re.compile(r"^import time:\s+(\d+) \|\s+\d+ \|\s+(collect(?:\.\S+)?)$", re.MULTILINE)
+
+def _run(code: str, *options: str, cwd: str = _ROOT,
+		 env: dict[str, str] | None = None) -> subprocess.CompletedProcess:
+	return subprocess.run(
+		[sys.executable, *options, "-c", code],
+		cwd=cwd, env=env, capture_output=True, text=True, check=True
+	)
+
+def _lazy_modules_loaded(code: str) -> str:
+	return code + f"; print(','.join(m for m in {_LAZY_MODULES!r} if m in sys.modules))"
+
+class TestImportTime(unittest.TestCase):
+
+	def test_heavy_dependencies_are_lazy(self):
+		self.assertEqual(_run(_lazy_modules_loaded("import sys, collect.__main__")).stdout.strip(), "")
+
+	def test_cached_run_setup_stays_lazy(self):
+		"""Creating the bot and the auctions from fresh caches, with the upload
+		disabled, loads none of the heavy dependencies.
+		"""
+		with tempfile.TemporaryDirectory() as directory:
+			shutil.copytree(os.path.join(_ROOT, "config"), os.path.join(directory, "config"))
+			os.makedirs(os.path.join(directory, "cache"))
+			with open(os.path.join(directory, "config", "auctions-ebay.json"), "r") as file:
+				categories: list[dict[str, any]] = json.load(file)
+			item: dict[str, any] = {
+				"itemId": "1", "listingInfo": {"watchCount": "1"},
+				"sellingStatus": {"currentPrice": {"value": "1.0"}}
+			}
+			for category in categories:
+				with open(os.path.join(directory, "cache", f"{category['id'].zfill(6)}.json"), "w") as file:
+					json.dump({"data": [item], "timestamp": time.time()}, file)
+			environment: dict[str, str] = dict(os.environ, PYTHONPATH=_ROOT,
+				EBAY_APPID="a", EBAY_CERTID="b", EBAY_DEVID="c")
+			code: str = _lazy_modules_loaded(
+				"import sys\n"
+				"from collect.utility.collectbot import CollectBot\n"
+				"from collect.utility.ebayapi import EBayAuctions\n"
+				"from collect.utility.core.config_registry import config_registry, thaw\n"
+				"config = thaw(config_registry().json('config/config.json'))\n"
+				"config['aws-s3-upload'] = False\n"
+				"bot = CollectBot('Hobby Report', config)\n"
+				"auctions = EBayAuctions(filepath_cache_directory='cache', filepath_image_directory='httpd/i')\n"
+				"auctions.load_auctions()\n"
+				"bot.set_ebay_auctions(auctions)\n"
+				"auctions.close()"
+			)
+			self.assertEqual(_run(code, cwd=directory, env=environment).stdout.strip(), "")
+
+	def test_import_time_budget(self):
+		timings: list[float] = []
+		for _ in range(3):
+			stderr: str = _run("import collect.__main__", "-X", "importtime").stderr
+			matches: list[tuple[str, str]] = _IMPORT_TIME.findall(stderr)
+			self.assertTrue(matches, stderr[-500:])
+			timings.append(sum(int(self_time) for self_time, _ in matches) / 1000)
+		self.assertLess(
+			min(timings), _BUDGET_MS,
+			f"The collect modules took {min(timings):.1f}ms to import."
+		)
+
+if __name__ == "__main__":
+	unittest.main()
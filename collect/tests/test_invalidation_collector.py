@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+from unittest.mock import MagicMock
+from collect.utility.aws_helper import InvalidationCollector
+
+class TestInvalidationCollector(unittest.TestCase):
+
+	def test_deduplicates_and_sends_one_batch(self):
+		collector = InvalidationCollector()
+		collector.add("index.html", "/", "/index.html", "style.css")
+		create_invalidation = MagicMock(return_value="I1")
+		self.assertEqual(collector.flush(create_invalidation), "I1")
+		create_invalidation.assert_called_once_with(["/", "/index.html", "/style.css"])
+		self.assertEqual(len(collector), 0)
+
+	def test_nothing_to_invalidate(self):
+		create_invalidation = MagicMock()
+		self.assertIsNone(InvalidationCollector().flush(create_invalidation))
+		create_invalidation.assert_not_called()
+
+	def test_wildcard_for_crowded_directory(self):
+		collector = InvalidationCollector(wildcard_threshold=3)
+		collector.add("i/1.jpg", "i/2.jpg", "i/3.jpg", "index.html")
+		self.assertEqual(collector.paths(), ["/i/*", "/index.html"])
+
+	def test_explicit_wildcard_covers_paths(self):
+		collector = InvalidationCollector()
+		collector.add("/i/*", "/i/1.jpg", "/style.css")
+		self.assertEqual(collector.paths(), ["/i/*", "/style.css"])
+
+	def test_too_many_paths_invalidates_everything(self):
+		collector = InvalidationCollector(wildcard_threshold=10, max_paths=3)
+		collector.add("a.html", "b/c.html", "d/e.html", "f/g.html")
+		self.assertEqual(collector.paths(), ["/*"])
+
+	def test_fingerprinted_assets_are_skipped(self):
+		collector = InvalidationCollector()
+		collector.add("app.3f2a9c1b.js", "i/9f86d081884c7d65.webp", "i/123456789012.jpg", "h.min.js")
+		self.assertEqual(collector.paths(), ["/h.min.js", "/i/123456789012.jpg"])
+		collector = InvalidationCollector(skip_fingerprinted=False)
+		collector.add("app.3f2a9c1b.js")
+		self.assertEqual(collector.paths(), ["/app.3f2a9c1b.js"])
+
+if __name__ == "__main__":
+	unittest.main()
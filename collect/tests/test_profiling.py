@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import pstats
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+from collect.utility.apicache import APICache
+from collect.utility.core.offline import OfflineError, set_offline
+from collect.utility.core.profiling import StageProfiler
+from collect.utility.core.run_metrics import RunMetrics
+
+def _busy(seconds: float) -> list[str]:
+	end = time.perf_counter() + seconds
+	allocations: list[str] = []
+	while time.perf_counter() < end:
+		allocations.append("x" * 100)
+	return allocations
+
+class TestStageProfiler(unittest.TestCase):
+
+	def setUp(self):
+		self._tmp = tempfile.TemporaryDirectory()
+		self.dir = self._tmp.name
+
+	def tearDown(self):
+		self._tmp.cleanup()
+
+	def test_cpu_profile_writes_pstats_and_collapsed_stacks(self):
+		profiler = StageProfiler("cpu", self.dir, sample_interval=0.001)
+		with profiler.stage("render"):
+			_busy(0.05)
+		stats = pstats.Stats(os.path.join(self.dir, "01-render.pstats"))
+		self.assertTrue(any(func[2] == "_busy" for func in stats.stats))
+		with open(os.path.join(self.dir, "01-render.collapsed")) as file:
+			lines = file.read().splitlines()
+		self.assertTrue(any("_busy (test_profiling.py" in line for line in lines))
+		self.assertTrue(all(line.rsplit(" ", 1)[1].isdigit() for line in lines))
+
+	def test_mem_profile_lists_top_allocators(self):
+		profiler = StageProfiler("mem", self.dir)
+		try:
+			with profiler.stage("render"):
+				kept = _busy(0.01)
+		finally:
+			profiler.close()
+		with open(os.path.join(self.dir, "01-render.mem.txt")) as file:
+			report = file.read()
+		self.assertTrue(report.startswith("current "))
+		self.assertIn("test_profiling.py", report)
+		self.assertTrue(kept)
+
+	def test_spans_are_profiled_once_the_directory_is_known(self):
+		metrics = RunMetrics()
+		profiler = StageProfiler("cpu", None, sample_interval=0.001)
+		metrics.set_profiler(profiler)
+		with metrics.span("config_load"):
+			_busy(0.01)
+		with metrics.span("build", target="index.html"):
+			with metrics.span("headlines"):
+				_busy(0.01)
+		self.assertEqual(os.listdir(self.dir), [])
+		profiler.set_output_dir(self.dir)
+		with metrics.span("s3_upload"):
+			_busy(0.01)
+		self.assertEqual(sorted(os.listdir(self.dir)), [
+			"01-config_load.collapsed", "01-config_load.pstats",
+			"02-build-index.html.collapsed", "02-build-index.html.pstats",
+			"03-s3_upload.collapsed", "03-s3_upload.pstats"
+		])
+		self.assertEqual(len(metrics.snapshot()["stages"]), 4)
+
+	def test_concurrent_stages_are_listed_as_skipped(self):
+		profiler = StageProfiler("cpu", self.dir, sample_interval=0.001)
+
+		def build_sitemap() -> None:
+			with profiler.stage("build", target="sitemap.xml"):
+				pass
+
+		with profiler.stage("build", target="index.html"):
+			with profiler.stage("headlines"):
+				pass
+			worker = threading.Thread(target=build_sitemap)
+			worker.start()
+			worker.join()
+		self.assertEqual(profiler.skipped, {"build": 1})
+		with self.assertLogs("collect.utility.core.profiling", level="WARNING") as logs:
+			profiler.close()
+		self.assertIn("build (1x)", logs.output[0])
+
+class TestOffline(unittest.TestCase):
+
+	def tearDown(self):
+		set_offline(False)
+
+	def test_offline_uses_expired_cache_and_never_calls_the_api(self):
+		with tempfile.TemporaryDirectory() as directory:
+			cache = APICache(directory, "000213.json", cache_ttl=0)
+			api = MagicMock(return_value=[{"itemId": "1"}])
+			cache.cached_api_call(api)
+			set_offline()
+			self.assertEqual(cache.cached_api_call(api), [{"itemId": "1"}])
+			self.assertEqual(api.call_count, 1)
+			with self.assertRaises(OfflineError):
+				APICache(directory, "000261.json").cached_api_call(api)
+
+if __name__ == "__main__":
+	unittest.main()
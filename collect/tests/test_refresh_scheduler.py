@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+import unittest
+from collect.utility.core.refresh_scheduler import RefreshScheduler
+
+class FakeClock:
+	def __init__(self):
+		self.now = 0.0
+
+	def __call__(self) -> float:
+		return self.now
+
+class TestRefreshScheduler(unittest.TestCase):
+
+	def setUp(self):
+		self.clock = FakeClock()
+		self.scheduler = RefreshScheduler(jitter=0.0, min_interval=1.0, clock=self.clock)
+
+	def test_runs_due_jobs_and_reports_changes(self):
+		self.scheduler.add_job("fast", lambda: True, interval=10)
+		self.scheduler.add_job("slow", lambda: False, interval=100)
+		self.assertEqual(self.scheduler.run_pending(), ["fast"])
+
+		self.clock.now = 10.0
+		self.assertEqual(self.scheduler.run_pending(), ["fast"])
+		self.assertEqual(self.scheduler.seconds_until_next(), 10.0)
+
+	def test_initial_delay(self):
+		self.scheduler.add_job("rss", lambda: True, interval=10, initial_delay=5)
+		self.assertEqual(self.scheduler.run_pending(), [])
+		self.clock.now = 5.0
+		self.assertEqual(self.scheduler.run_pending(), ["rss"])
+
+	def test_failed_job_is_rescheduled(self):
+		def fail() -> bool:
+			raise ValueError("network down")
+		self.scheduler.add_job("broken", fail, interval=30)
+		with self.assertLogs("collect.utility.core.refresh_scheduler", level="ERROR"):
+			self.assertEqual(self.scheduler.run_pending(), [])
+		self.assertEqual(len(self.scheduler), 1)
+		self.assertEqual(self.scheduler.seconds_until_next(), 30.0)
+
+	def test_callable_interval_and_jitter(self):
+		scheduler = RefreshScheduler(jitter=0.5, min_interval=1.0, clock=self.clock)
+		scheduler.add_job("feed", lambda: False, interval=lambda: 20)
+		scheduler.run_pending()
+		self.assertGreaterEqual(scheduler.seconds_until_next(), 20.0)
+		self.assertLessEqual(scheduler.seconds_until_next(), 30.0)
+
+	def test_empty_scheduler_stops_on_the_stop_event(self):
+		scheduler = RefreshScheduler()
+		self.assertIsNone(scheduler.seconds_until_next())
+		stop = threading.Event()
+		timer = threading.Timer(0.05, stop.set)
+		timer.start()
+		scheduler.run_forever(lambda changed: None, stop)
+		timer.join()
+		self.assertTrue(stop.is_set())
+
+if __name__ == "__main__":
+	unittest.main()
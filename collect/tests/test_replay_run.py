@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from collect.__main__ import main
+from collect.standins.servers import StandinOptions, StandinServer
+from collect.utility.core.config_registry import ConfigRegistry
+from collect.utility.core.http_session import close_shared_session, set_transport
+
+_ROOT: str = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class TestReplayRun(unittest.TestCase):
+	"""Records a run against the stand-ins and replays it without the
+	stand-ins or AWS credentials, with the S3 upload switched on.
+	"""
+
+	def setUp(self):
+		self._tmp = tempfile.TemporaryDirectory()
+		self.directory: str = self._tmp.name
+		for name in ("config", "templates", "prompts"):
+			shutil.copytree(os.path.join(_ROOT, name), os.path.join(self.directory, name))
+		# The minified script is built outside of this repository.
+		open(os.path.join(self.directory, "templates", "h.min.js"), "w").close()
+		for name in ("logs", "cache", os.path.join("httpd", "i")):
+			os.makedirs(os.path.join(self.directory, name))
+		self._cwd: str = os.getcwd()
+		self._handlers: list[logging.Handler] = list(logging.getLogger().handlers)
+		os.chdir(self.directory)
+
+	def tearDown(self):
+		os.chdir(self._cwd)
+		root: logging.Logger = logging.getLogger()
+		for handler in list(root.handlers):
+			if handler not in self._handlers:
+				root.removeHandler(handler)
+				handler.close()
+		set_transport(None)
+		close_shared_session()
+		self._tmp.cleanup()
+
+	def _write_config(self, **values: any) -> None:
+		with open("config/config.json", "r") as file:
+			config: dict[str, any] = json.load(file)
+		config.update(values)
+		with open("config/config.json", "w") as file:
+			json.dump(config, file, indent="\t")
+
+	def test_replay_without_aws_credentials(self):
+		environment: dict[str, str] = {
+			key: value for key, value in os.environ.items() if not key.startswith("AWS_")
+		}
+		environment.update({
+			"EBAY_APPID": "a", "EBAY_CERTID": "b", "EBAY_DEVID": "c", "OPENAI_API_KEY": "k"
+		})
+		server = StandinServer(StandinOptions(auctions_per_category=30))
+		url: str = server.start()
+		with patch.dict(os.environ, environment, clear=True), \
+				patch.object(ConfigRegistry, "load_env", return_value=True):
+			try:
+				self._write_config(**{
+					"ebay-domain": url.split("://", 1)[1], "ebay-https": False,
+					"openai-url": f"{url}/v1/chat/completions", "rss-endpoint": url,
+					"aws-s3-upload": False
+				})
+				self.assertEqual(main(["--record", "cassette"]), 0)
+			finally:
+				server.stop()
+			requests: int = server.requests.value
+
+			for name in ("cache", "httpd"):
+				shutil.rmtree(name)
+			os.makedirs(os.path.join("httpd", "i"))
+			os.makedirs("cache")
+			self._write_config(**{"aws-s3-upload": True})
+			with patch("collect.__main__.S3Service.from_config", side_effect=AssertionError("S3 used")):
+				self.assertEqual(main(["--replay", "cassette"]), 0)
+
+		self.assertEqual(server.requests.value, requests)
+		with open(os.path.join("httpd", "index.html"), "r") as file:
+			self.assertIn("<html", file.read())
+
+if __name__ == "__main__":
+	unittest.main()
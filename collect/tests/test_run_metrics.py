@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import tempfile
+import unittest
+from collect.utility.core.run_metrics import RunMetrics
+
+class TestRunMetrics(unittest.TestCase):
+
+	def setUp(self):
+		self.metrics = RunMetrics()
+
+	def test_spans_are_aggregated_by_name_and_labels(self):
+		for size in (100, 50):
+			with self.metrics.span("image_fetch") as span:
+				span.add(images=1, bytes=size)
+		with self.metrics.span("ebay_fetch", category="261328"):
+			pass
+		with self.assertRaises(ValueError):
+			with self.metrics.span("ebay_fetch", category="213"):
+				raise ValueError("offline")
+
+		stages = {(s["stage"], s["labels"].get("category")): s for s in self.metrics.snapshot()["stages"]}
+		fetch = stages[("image_fetch", None)]
+		self.assertEqual(fetch["calls"], 2)
+		self.assertEqual(fetch["counters"], {"images": 2, "bytes": 150})
+		self.assertEqual(stages[("ebay_fetch", "261328")]["errors"], 0)
+		self.assertEqual(stages[("ebay_fetch", "213")]["errors"], 1)
+
+	def test_write_json_and_prometheus_textfile(self):
+		with self.metrics.span("write", file="index.html") as span:
+			span.add(bytes=2048)
+		self.metrics.count("headline_cache", title_hits=3)
+		with tempfile.TemporaryDirectory() as directory:
+			self.metrics.write(directory)
+			with open(os.path.join(directory, "metrics.json")) as file:
+				self.assertEqual(len(json.load(file)["stages"]), 2)
+			with open(os.path.join(directory, "collect.prom")) as file:
+				prom = file.read()
+		self.assertIn("# TYPE collect_stage_seconds gauge", prom)
+		self.assertIn('collect_stage_bytes{stage="write",file="index.html"} 2048', prom)
+		self.assertIn('collect_stage_title_hits{stage="headline_cache"} 3', prom)
+		self.assertNotIn('collect_stage_calls{stage="headline_cache"}', prom)
+		self.assertIn("collect_run_seconds ", prom)
+
+if __name__ == "__main__":
+	unittest.main()
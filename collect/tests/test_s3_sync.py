@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import threading
+import hashlib
+import unittest
+import boto3
+from botocore.stub import Stubber
+from unittest.mock import patch
+from collect.utility.core.file_upload_tracker import FileUploadTracker
+from collect.utility.aws_helper import S3Service
+from collect.utility.s3_sync import S3SyncManager, S3RemoteListing
+
+class LocalS3(object):
+	"""A stand-in for the boto3 S3 client that stores uploads in memory."""
+	def __init__(self):
+		self.objects: dict[str, bytes] = {}
+		self.content_types: dict[str, str] = {}
+		self._lock = threading.Lock()
+
+	def upload_file(self, file_path, bucket, key, ExtraArgs=None):
+		with open(file_path, "rb") as f, self._lock:
+			self.objects[f"{bucket}/{key}"] = f.read()
+			self.content_types[key] = ExtraArgs["ContentType"]
+
+class TestS3SyncManager(unittest.TestCase):
+
+	def setUp(self):
+		self._tmp = tempfile.TemporaryDirectory()
+		self.site = os.path.join(self._tmp.name, "httpd")
+		os.makedirs(os.path.join(self.site, "i"))
+		for name, content in (("index.html", "<p>"), ("style.css", "p{}"), ("i/1.jpg", "jpg")):
+			with open(os.path.join(self.site, name), "w") as file:
+				file.write(content)
+		self.client = LocalS3()
+		self.tracker = FileUploadTracker(self._tmp.name)
+		self.manager = S3SyncManager(self.client, "bucket", self.tracker, max_workers=4)
+
+	def tearDown(self):
+		self._tmp.cleanup()
+
+	def test_uploads_changed_files_once(self):
+		uploaded = self.manager.sync_directory(self.site)
+		self.assertEqual(sorted(uploaded), ["i/1.jpg", "index.html", "style.css"])
+		self.assertEqual(self.client.content_types["style.css"], "text/css")
+		self.assertTrue(self.tracker.cache_file.exists())
+
+		self.assertEqual(self.manager.sync_directory(self.site), [])
+
+		with open(os.path.join(self.site, "index.html"), "w") as file:
+			file.write("<p>new")
+		self.assertEqual(self.manager.sync_directory(self.site), ["index.html"])
+
+	def test_hashes_each_file_once_and_saves_once(self):
+		with patch.object(self.tracker, "_digest_file", wraps=self.tracker._digest_file) as digest_file, \
+			patch.object(self.tracker, "_save_cache", wraps=self.tracker._save_cache) as save_cache:
+			self.manager.sync_directory(self.site)
+		self.assertEqual(digest_file.call_count, 3)
+		self.assertEqual(save_cache.call_count, 1)
+
+	def test_failed_upload_is_not_tracked(self):
+		def fail(file_path, bucket, key, ExtraArgs=None):
+			if key == "style.css":
+				raise OSError("connection reset")
+			LocalS3.upload_file(self.client, file_path, bucket, key, ExtraArgs)
+		self.client.upload_file = fail
+		with self.assertLogs("collect.utility.s3_sync", level="ERROR"):
+			with self.assertRaises(OSError):
+				self.manager.sync_directory(self.site)
+		self.client.upload_file = lambda *args, **kwargs: LocalS3.upload_file(self.client, *args, **kwargs)
+		self.assertEqual(self.manager.sync_directory(self.site), ["style.css"])
+
+class TestRemoteSync(unittest.TestCase):
+
+	def setUp(self):
+		self._tmp = tempfile.TemporaryDirectory()
+		self.site = os.path.join(self._tmp.name, "httpd")
+		os.makedirs(os.path.join(self.site, "i"))
+		self.files = {"index.html": b"<p>", "i/1.jpg": b"jpg1", "i/2.jpg": b"jpg2"}
+		for name, content in self.files.items():
+			with open(os.path.join(self.site, name), "wb") as file:
+				file.write(content)
+		self.client = boto3.client(
+			"s3", region_name="us-east-1",
+			aws_access_key_id="test", aws_secret_access_key="test"
+		)
+		self.uploads: list[str] = []
+		self.client.upload_file = lambda file_path, bucket, key, ExtraArgs=None: self.uploads.append(key)
+		self.stubber = Stubber(self.client)
+		self.cache_file = os.path.join(self._tmp.name, "s3_remote_listing.json")
+		# A fresh host: the local manifest is empty.
+		self.manager = S3SyncManager(self.client, "bucket", FileUploadTracker(self._tmp.name))
+
+	def tearDown(self):
+		self._tmp.cleanup()
+
+	def _remote_object(self, key: str, content: bytes) -> dict:
+		return {"Key": key, "Size": len(content), "ETag": f'"{hashlib.md5(content).hexdigest()}"'}
+
+	def test_uploads_and_deletes_only_differences(self):
+		self.stubber.add_response(
+			"list_objects_v2",
+			{
+				"Contents": [self._remote_object("index.html", b"<p>")],
+				"IsTruncated": True, "NextContinuationToken": "page2"
+			},
+			{"Bucket": "bucket"}
+		)
+		self.stubber.add_response(
+			"list_objects_v2",
+			{
+				"Contents": [
+					self._remote_object("i/1.jpg", b"old"),
+					self._remote_object("i/3.jpg", b"orphan")
+				],
+				"IsTruncated": False
+			},
+			{"Bucket": "bucket", "ContinuationToken": "page2"}
+		)
+		self.stubber.add_response(
+			"delete_objects", {},
+			{"Bucket": "bucket", "Delete": {"Objects": [{"Key": "i/3.jpg"}], "Quiet": True}}
+		)
+		with self.stubber:
+			remote = S3RemoteListing(self.client, "bucket", self.cache_file)
+			uploaded = self.manager.sync_directory(self.site, prefix="", remote=remote)
+			self.assertEqual(sorted(uploaded), ["i/1.jpg", "i/2.jpg"])
+			self.manager.sync(
+				S3SyncManager.walk_directory(os.path.join(self.site, "i"), prefix="i/"),
+				remote=remote, delete_prefix="i/"
+			)
+			self.stubber.assert_no_pending_responses()
+
+		# The listing is cached, so a second run makes no requests at all.
+		remote = S3RemoteListing(self.client, "bucket", self.cache_file)
+		with self.stubber:
+			self.assertEqual(self.manager.sync_directory(self.site, remote=remote), [])
+		self.assertEqual(sorted(remote.objects), ["i/1.jpg", "i/2.jpg", "index.html"])
+
+	def test_multipart_etag_compares_size(self):
+		remote = S3RemoteListing(self.client, "bucket", self.cache_file)
+		remote._objects = {"index.html": {"size": 3, "etag": "abc-2"}}
+		digests = self.manager._tracker.file_digests(os.path.join(self.site, "index.html"))
+		self.assertTrue(remote.matches("index.html", digests))
+		self.assertFalse(remote.matches("missing.html", digests))
+
+class TestS3Service(unittest.TestCase):
+
+	@patch.dict(os.environ, {"AWS_ACCESS_KEY_ID": "test", "AWS_SECRET_ACCESS_KEY": "test"})
+	@patch("collect.utility.aws_helper.config_registry")
+	def test_shares_one_client_and_tracker(self, mock_registry):
+		with tempfile.TemporaryDirectory() as cache_dir:
+			service = S3Service.from_config({
+				"aws-s3-bucket-name": "bucket",
+				"aws-s3-region": "us-east-1",
+				"directory-cache": cache_dir,
+				"aws-s3-max-workers": 16
+			})
+			mock_registry.return_value.load_env.assert_called_once()
+			clients: list = []
+			threads = [threading.Thread(target=lambda: clients.append(service.client)) for _ in range(8)]
+			for thread in threads:
+				thread.start()
+			for thread in threads:
+				thread.join()
+			self.assertEqual(len({id(client) for client in clients}), 1)
+			self.assertEqual(service.client.meta.config.max_pool_connections, 32)
+
+			helper = service.helper()
+			self.assertIs(helper, service.helper())
+			self.assertIs(helper._s3_client, service.client)
+			self.assertIs(helper._upload_tracker, service.tracker)
+
+	@patch.dict(os.environ, {}, clear=True)
+	@patch("collect.utility.aws_helper.config_registry")
+	def test_missing_credentials(self, mock_registry):
+		service = S3Service("bucket")
+		with self.assertRaises(ValueError):
+			service.client
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import unittest
+from unittest.mock import patch
+from collect.standins.servers import StandinBehavior, StandinOptions, StandinServer
+from collect.utility.core.fetch_bot import FetchBot
+from collect.utility.core.http_session import shared_session
+from collect.utility.ebayapi import eBayAPIHelper
+from collect.utility.formatted_prompt import PromptPersonalityFunctional
+from collect.utility.gpt_function_prompt import GptFunctionPrompt
+
+_PROMPT: dict[str, any] = {
+	"name": "test",
+	"context": "Test context.",
+	"prompt": "Rewrite these.",
+	"function": {
+		"name": "headlines_function",
+		"description": "Rewrite each headline.",
+		"parameters": {
+			"type": "object",
+			"properties": {
+				"headlines": {
+					"type": "array",
+					"description": "The headlines.",
+					"items": {
+						"type": "object",
+						"properties": {
+							"headline": {"type": "string", "description": "A headline."},
+							"identifier": {"type": "string", "description": "The identifier."}
+						},
+						"required": ["headline", "identifier"]
+					}
+				}
+			},
+			"required": ["headlines"]
+		}
+	}
+}
+
+class TestStandins(unittest.TestCase):
+
+	def setUp(self):
+		self.server = StandinServer(StandinOptions(items_per_feed=4))
+		self.url = self.server.start()
+
+	def tearDown(self):
+		self.server.stop()
+
+	def test_finding_api_items(self):
+		environment = {"EBAY_APPID": "a", "EBAY_CERTID": "b", "EBAY_DEVID": "c"}
+		with patch.dict(os.environ, environment):
+			helper = eBayAPIHelper(domain=self.url.split("://", 1)[1], https=False)
+		items = helper.search_top_watched_items("212", max_results=7)
+		self.assertEqual(len(items), 7)
+		self.assertEqual(len({item["itemId"] for item in items}), 7)
+		self.assertTrue(items[0]["galleryURL"].startswith(self.url))
+		int(items[0]["listingInfo"]["watchCount"])
+		float(items[0]["sellingStatus"]["currentPrice"]["value"])
+
+	def test_paginated_search(self):
+		self.server.options.auctions_per_category = 25
+		environment = {"EBAY_APPID": "a", "EBAY_CERTID": "b", "EBAY_DEVID": "c"}
+		with patch.dict(os.environ, environment):
+			helper = eBayAPIHelper(domain=self.url.split("://", 1)[1], https=False,
+								   page_size=10, max_workers=3)
+		try:
+			items = list(helper.iter_top_watched_items("212", budget=100))
+			self.assertEqual(len({item["itemId"] for item in items}), 25)
+			self.assertEqual(self.server.requests.value, 3)
+			items = list(helper.iter_top_watched_items("212", budget=12))
+			self.assertEqual(len(items), 12)
+			self.assertEqual(self.server.requests.value, 5)
+		finally:
+			helper.close()
+
+	def test_chat_completions_function_call(self):
+		fprompt = PromptPersonalityFunctional(
+			"key", GptFunctionPrompt.from_dict(_PROMPT),
+			url=f"{self.url}/v1/chat/completions", chunk_size=2
+		)
+		fprompt.add_prompt_item_data(("first title", "1"), ("second title", "2"), ("third", "3"))
+		results = fprompt.get_results()
+		self.assertEqual([result["identifier"] for result in results], ["1", "2", "3"])
+		self.assertEqual(results[0]["headline"], "First Title")
+
+	def test_feed_through_endpoint(self):
+		url = FetchBot.endpoint_url("https://feeds.example.com/a/feed/?x=1", self.url)
+		self.assertEqual(url, f"{self.url}/a/feed/?x=1")
+		response = FetchBot("https://feeds.example.com/a/feed/", endpoint=self.url).fetch()
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.text.count("<item>"), 4)
+
+	def test_injected_errors(self):
+		self.server.options.rss = StandinBehavior(error_rate=1.0)
+		response = shared_session().get(f"{self.url}/feed/")
+		self.assertEqual(response.status_code, 503)
+		self.assertEqual(self.server.errors.value, 1)
+
+if __name__ == "__main__":
+	unittest.main()
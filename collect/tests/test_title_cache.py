@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+from collect.utility.core.title_cache import TitleHeadlineCache, normalize_title, prompt_version
+
+class TestTitleHeadlineCache(unittest.TestCase):
+
+	def setUp(self):
+		self._tmp = tempfile.TemporaryDirectory()
+		self.cache_file = os.path.join(self._tmp.name, "headlines_by_title.json")
+		self.version = prompt_version({"prompt": "Rewrite these listings."})
+
+	def tearDown(self):
+		self._tmp.cleanup()
+
+	def test_normalize_title(self):
+		self.assertEqual(
+			normalize_title("  2023 Topps  CHROME #1/1 🔥🔥 Ohtani!! "),
+			"2023 topps chrome 1 1 ohtani"
+		)
+		self.assertNotEqual(normalize_title("#1/1"), normalize_title("#11"))
+
+	def test_headline_is_shared_by_near_identical_titles(self):
+		cache = TitleHeadlineCache(self.cache_file)
+		cache.add(self.version, "2023 Topps Chrome Ohtani PSA 10 🔥", "**Ohtani** Topps Chrome")
+		self.assertTrue(cache.save())
+		reloaded = TitleHeadlineCache(self.cache_file)
+		self.assertEqual(
+			reloaded.find(self.version, "2023 TOPPS chrome  Ohtani - PSA 10"),
+			"**Ohtani** Topps Chrome"
+		)
+
+	def test_headlines_are_written_once_by_save(self):
+		cache = TitleHeadlineCache(self.cache_file)
+		cache.add(self.version, "Ohtani PSA 10", "Ohtani")
+		cache.add(self.version, "Judge PSA 9", "Judge")
+		self.assertFalse(os.path.exists(self.cache_file))
+		self.assertTrue(cache.save())
+		self.assertFalse(cache.save())
+		reloaded = TitleHeadlineCache(self.cache_file)
+		self.assertEqual(reloaded.find(self.version, "judge psa 9"), "Judge")
+
+	def test_prompt_edits_invalidate_headlines(self):
+		cache = TitleHeadlineCache(self.cache_file)
+		cache.add(self.version, "Ohtani PSA 10", "Ohtani")
+		edited = prompt_version({"prompt": "Rewrite these listings briefly."})
+		self.assertNotEqual(edited, self.version)
+		self.assertIsNone(cache.find(edited, "Ohtani PSA 10"))
+
+if __name__ == "__main__":
+	unittest.main()
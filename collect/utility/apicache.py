@@ -8,6 +8,8 @@ import time
 
 from typing import Callable
 
+from .core.offline import OfflineError, is_offline
+
 logger = logging.getLogger(__name__)
 
 class APICache:
@@ -19,6 +21,7 @@ class APICache:
 		self._cache_dir = cache_dir
 		self._cache_file = cache_file
 		self._cache_ttl = cache_ttl
+		self._memory: dict[str, dict[str, any]] = {}
 		if not os.path.exists(self._cache_dir):
 			os.makedirs(self._cache_dir)
 	
@@ -26,16 +29,30 @@ class APICache:
 	def _cache_file_path(self) -> str:
 		return os.path.join(self._cache_dir, self._cache_file)
 
-	def _load_cache(self) -> list[dict[str, any]]:
-		"""Load the cache from the file if it exists and is not expired."""
+	def _read_cache_data(self) -> dict[str, any] | None:
+		"""Return the cache file contents, reading the file only once per process."""
 		cache_file_path: str = self._cache_file_path
-		if os.path.exists(cache_file_path):
+		cache_data: dict[str, any] | None = self._memory.get(cache_file_path)
+		if cache_data is None and os.path.exists(cache_file_path):
 			with open(cache_file_path, 'r') as f:
-				cache_data: dict[str, any] = json.load(f)
-				if time.time() - cache_data['timestamp'] < self._cache_ttl:
-					return cache_data['data']
+				cache_data = json.load(f)
+				self._memory[cache_file_path] = cache_data
+		return cache_data
+
+	def _load_cache(self) -> list[dict[str, any]]:
+		"""Load the cache from the file if it exists and is not expired."""
+		cache_data: dict[str, any] | None = self._read_cache_data()
+		if cache_data and time.time() - cache_data['timestamp'] < self._cache_ttl:
+			return cache_data['data']
 		return []
 
+	def seconds_until_stale(self) -> float:
+		"""Return the number of seconds until the current cache file expires."""
+		cache_data: dict[str, any] | None = self._read_cache_data()
+		if not cache_data:
+			return 0.0
+		return max(0.0, self._cache_ttl - (time.time() - cache_data['timestamp']))
+
 	def _save_cache(self, data: list[dict[str, any]]):
 		"""Save the data to the cache file with the current timestamp."""
 		cache_data: dict[str, any] = {
@@ -44,12 +61,19 @@ class APICache:
 		}
 		with open(self._cache_file_path, 'w') as cache_file:
 			json.dump(cache_data, cache_file, indent="\t")
+		self._memory[self._cache_file_path] = cache_data
 
 	def cached_api_call(self, func: Callable[[], list[dict[str, any]]], *args) -> list[dict[str, any]]:
 		"""Fetches data from the cache or calls the API function and caches the result."""
 		cached_data: list[dict[str, any]] = self._load_cache()
 		if cached_data:
 			return cached_data
+		if is_offline():
+			# Expired data is used as is rather than calling the API.
+			cache_data: dict[str, any] | None = self._read_cache_data()
+			if not cache_data:
+				raise OfflineError(f"No cached data in {self._cache_file_path}.")
+			return cache_data['data']
 
 		api_data: list[dict[str, any]] = func(*args)
 		self._save_cache(api_data)
@@ -2,50 +2,161 @@
 # -*- coding: utf-8 -*-
 
 import os
+import re
 import logging
+import threading
 import time
-import json
 
-import boto3
-import mimetypes
+from pathlib import Path, PurePosixPath
+from typing import Callable
 
-from dotenv import load_dotenv
-from pathlib import Path
-from datetime import datetime, timezone, timedelta
-from botocore.exceptions import NoCredentialsError, ClientError
-
-from .core.file_upload_tracker import FileUploadTracker
+from .core.config_registry import config_registry
+from .core.file_upload_tracker import FileDigests, FileUploadTracker
+from .core.run_metrics import run_metrics
+from .s3_sync import S3SyncManager, S3RemoteListing, SyncItem, content_type_args
 
 logger = logging.getLogger(__name__)
 
-class AwsS3Helper:
-	def __init__(self, bucket_name, region=None, ensure_bucket=True,
-				 cache_dir="cache/"):
-		load_dotenv()
+class S3Service:
+	"""The AWS clients and upload tracker shared by every upload in the process.
+
+	The S3 and CloudFront clients are created on first use, under a lock,
+	with a connection pool large enough for ``max_workers`` concurrent
+	uploads.  boto3 clients are thread-safe, so one client serves every
+	thread.  The upload tracker is loaded from disk once.
+
+	Keyword arguments:
+	* bucket_name -- The bucket the site is uploaded to.
+	* region -- The region of the bucket.
+	* cache_dir -- The directory holding the upload manifest.
+	* max_workers -- The number of concurrent uploads.
+	"""
+	def __init__(self, bucket_name: str, region: str | None = None,
+				 cache_dir: str = "cache/", max_workers: int = 8):
+		if not bucket_name:
+			raise ValueError("bucket_name is required.")
+		config_registry().load_env()
+		self._bucket_name: str = bucket_name
+		self._region: str | None = region
+		self._cache_dir: str = cache_dir
+		self._max_workers: int = max_workers
+		self._lock: threading.Lock = threading.Lock()
+		self._s3_client: any = None
+		self._cf_client: any = None
+		self._tracker: FileUploadTracker | None = None
+		self._helpers: dict[bool, AwsS3Helper] = {}
+
+	@classmethod
+	def from_config(cls, app_config: dict[str, any]) -> 'S3Service':
+		"""Creates the service from the application configuration."""
+		return cls(
+			bucket_name=app_config["aws-s3-bucket-name"],
+			region=app_config.get("aws-s3-region"),
+			cache_dir=app_config.get("directory-cache", "cache/"),
+			max_workers=app_config.get("aws-s3-max-workers", 8)
+		)
+
+	@property
+	def bucket_name(self) -> str:
+		return self._bucket_name
+
+	@property
+	def region(self) -> str | None:
+		return self._region
 
-		self._upload_tracker: FileUploadTracker = FileUploadTracker(cache_dir)
+	@property
+	def cache_dir(self) -> str:
+		return self._cache_dir
 
+	@property
+	def max_workers(self) -> int:
+		return self._max_workers
+
+	def _credentials(self) -> dict[str, str]:
 		aws_akey: str | None = os.getenv("AWS_ACCESS_KEY_ID")
 		aws_sec: str | None = os.getenv("AWS_SECRET_ACCESS_KEY")
 		if aws_akey is None or aws_sec is None:
 			raise ValueError("AWS credentials not available.")
+		return {"aws_access_key_id": aws_akey, "aws_secret_access_key": aws_sec}
+
+	def _client_config(self) -> "Config":
+		from botocore.config import Config
+		return Config(max_pool_connections=max(10, self._max_workers * 2))
+
+	@property
+	def client(self) -> any:
+		"""The S3 client, created on first use."""
+		if self._s3_client is None:
+			with self._lock:
+				if self._s3_client is None:
+					import boto3
+					self._s3_client = boto3.client(
+						"s3", region_name=self._region,
+						config=self._client_config(), **self._credentials()
+					)
+		return self._s3_client
+
+	@property
+	def cloudfront_client(self) -> any:
+		"""The CloudFront client, created on first use."""
+		if self._cf_client is None:
+			with self._lock:
+				if self._cf_client is None:
+					import boto3
+					self._cf_client = boto3.client(
+						"cloudfront", config=self._client_config(),
+						**self._credentials()
+					)
+		return self._cf_client
+
+	@property
+	def tracker(self) -> FileUploadTracker:
+		"""The upload manifest, loaded from disk on first use."""
+		if self._tracker is None:
+			with self._lock:
+				if self._tracker is None:
+					self._tracker = FileUploadTracker(self._cache_dir)
+		return self._tracker
+
+	def helper(self, ensure_bucket: bool = False) -> 'AwsS3Helper':
+		"""Returns an AwsS3Helper that shares the clients and tracker of the service."""
+		with self._lock:
+			helper: AwsS3Helper | None = self._helpers.get(ensure_bucket)
+		if helper is None:
+			helper = AwsS3Helper(
+				bucket_name=self._bucket_name, region=self._region,
+				ensure_bucket=ensure_bucket, cache_dir=self._cache_dir,
+				max_workers=self._max_workers, service=self
+			)
+			with self._lock:
+				helper = self._helpers.setdefault(ensure_bucket, helper)
+		return helper
 
-		self._s3_client = boto3.client(
-			"s3",
-			aws_access_key_id=aws_akey,
-			aws_secret_access_key=aws_sec,
-			region_name=region
-		)
+class AwsS3Helper:
+	_IMAGE_EXTENSIONS: tuple[str, ...] = ('.png', '.jpg', '.jpeg', '.gif', '.webp')
+
+	def __init__(self, bucket_name, region=None, ensure_bucket=True,
+				 cache_dir="cache/", max_workers: int = 8,
+				 service: S3Service | None = None):
+		if service is None:
+			service = S3Service(bucket_name, region, cache_dir, max_workers)
+
+		self._cache_dir: str = cache_dir
+		self._upload_tracker: FileUploadTracker = service.tracker
+		self._s3_client = service.client
 
 		self._bucket_name = bucket_name
 		self._region = region
-
-		self.tracking_file = "cache/upload_tracking.json"
+		self._sync_manager: S3SyncManager = S3SyncManager(
+			self._s3_client, bucket_name, self._upload_tracker,
+			max_workers=max_workers
+		)
 
 		if ensure_bucket:
 			self._ensure_bucket()
 
 	def _ensure_bucket(self):
+		from botocore.exceptions import ClientError
 		try:
 			self._s3_client.head_bucket(Bucket=self._bucket_name)
 			logger.info(f"Bucket {self._bucket_name} already exists.")
@@ -53,6 +164,7 @@ class AwsS3Helper:
 			self._create_bucket()
 
 	def _create_bucket(self):
+		from botocore.exceptions import ClientError
 		try:
 			if self._region is None:
 				self._s3_client.create_bucket(Bucket=self._bucket_name)
@@ -68,9 +180,11 @@ class AwsS3Helper:
 			raise
 
 	def upload_file_if_changed(self, file_path, object_name=None) -> bool:
-		if self._upload_tracker.has_changed(file_path):
-			self.upload_file(file_path, object_name)
-			self._upload_tracker.mark_as_uploaded(file_path)
+		key: str = object_name or Path(file_path).name
+		digests: FileDigests = self._upload_tracker.file_digests(file_path, key)
+		if self._upload_tracker.has_changed_hash(key, digests.sha256):
+			self.upload_file(file_path, key)
+			self._upload_tracker.mark_as_uploaded(file_path, key=key, digests=digests)
 			return True
 		else:
 			logger.info(f"Skipping {file_path} (no changes detected).")
@@ -80,12 +194,13 @@ class AwsS3Helper:
 		if object_name is None:
 			object_name = Path(file_path).name
 
-		content_type, _ = mimetypes.guess_type(file_path)
-		content_type = content_type or "application/octet-stream"
-		extraArgs = {"ContentType": content_type}
+		extraArgs = content_type_args(file_path)
 
+		from botocore.exceptions import NoCredentialsError
 		try:
-			self._s3_client.upload_file(file_path, self._bucket_name, object_name, ExtraArgs=extraArgs)
+			with run_metrics().span("s3_upload") as span:
+				self._s3_client.upload_file(file_path, self._bucket_name, object_name, ExtraArgs=extraArgs)
+				span.add(files=1, bytes=os.path.getsize(file_path))
 			logger.info(f"File {file_path} uploaded to {self._bucket_name}/{object_name}")
 		except FileNotFoundError:
 			logger.error(f"The file {file_path} was not found.")
@@ -94,12 +209,26 @@ class AwsS3Helper:
 			logger.error("Credentials not available.")
 			raise
 
-	def upload_directory(self, directory_path):
-		for root, dirs, files in os.walk(directory_path):
-			for file in files:
-				file_path = os.path.join(root, file)
-				relative_path = os.path.relpath(file_path, directory_path)
-				self.upload_file_if_changed(file_path, object_name=relative_path)
+	def remote_listing(self, max_age: int = 24 * 60 * 60) -> S3RemoteListing:
+		"""Returns the listing of the bucket, cached for ``max_age`` seconds."""
+		return S3RemoteListing(
+			self._s3_client, self._bucket_name,
+			cache_file=os.path.join(self._cache_dir, "s3_remote_listing.json"),
+			max_age=max_age
+		)
+
+	def upload_files_if_changed(self, files: list[tuple[str, str]],
+								remote: S3RemoteListing | None = None) -> list[str]:
+		"""Uploads the changed (file path, object name) pairs concurrently.
+
+		With a remote listing, files are compared with the bucket contents.
+		Returns the object names that were uploaded.
+		"""
+		return self._sync_manager.sync([SyncItem(*file) for file in files], remote=remote)
+
+	def upload_directory(self, directory_path, remote: S3RemoteListing | None = None) -> list[str]:
+		"""Uploads the changed files in the directory concurrently."""
+		return self._sync_manager.sync_directory(directory_path, remote=remote)
 
 	def configure_bucket_for_website(self):
 		website_configuration = {
@@ -107,6 +236,7 @@ class AwsS3Helper:
 			"IndexDocument": {"Suffix": "index.html"},
 		}
 
+		from botocore.exceptions import ClientError
 		try:
 			self._s3_client.put_bucket_website(
 				Bucket=self._bucket_name,
@@ -117,58 +247,50 @@ class AwsS3Helper:
 			logging.error(f"Could not configure bucket for website: {e}")
 			raise
 
-	def _load_tracking_file(self):
-		"""Load the tracking file if it exists, else return an empty dictionary."""
-		if os.path.exists(self.tracking_file):
-			with open(self.tracking_file, 'r') as file:
-				return json.load(file)
-
-		return {}
-
-	def _save_tracking_file(self, tracking_data):
-		"""Save the tracking data to the JSON file."""
-		with open(self.tracking_file, 'w') as file:
-			json.dump(tracking_data, file, indent=4)
-
-	def _prune_tracking_file(self, tracking_data):
-		"""Prune entries older than 12 days."""
-		cutoff_date = datetime.now() - timedelta(days=12)
-		pruned_data = {key: value for key, value in tracking_data.items() if datetime.strptime(value, '%Y-%m-%d %H:%M:%S') > cutoff_date}
-		return pruned_data
-
-	def upload_images_with_tracking(self, images_directory):
-		tracking_data = self._load_tracking_file()
-		tracking_data = self._prune_tracking_file(tracking_data)
-
-		for root, _, files in os.walk(images_directory):
-			for file in files:
-				if file.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')):
-					file_path = os.path.join(root, file)
-					object_name = os.path.relpath(file_path, images_directory)
-
-					# Check if file has been uploaded in the last 12 days
-					if object_name in tracking_data:
-						logger.info(f"Skipping {object_name} (already uploaded within the last 12 days).")
-						continue
-
-					# Upload the file and update the tracking data
-					self.upload_file_if_changed(file_path=file_path, object_name=f"i/{object_name}")
-					tracking_data[object_name] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-		# Save the updated tracking data
-		self._save_tracking_file(tracking_data)
+	def upload_images_with_tracking(self, images_directory, max_age_days: int = 12,
+									remote: S3RemoteListing | None = None,
+									prune_orphans: bool = False) -> list[str]:
+		"""Uploads the changed images below ``i/`` and prunes the manifest.
+
+		Manifest entries of images removed from the directory are dropped
+		once they are older than ``max_age_days``.  With a remote listing and
+		``prune_orphans``, images in the bucket without a local file are
+		deleted.
+		"""
+		items: list[SyncItem] = S3SyncManager.walk_directory(
+			images_directory, prefix="i/",
+			include=lambda name: name.lower().endswith(AwsS3Helper._IMAGE_EXTENSIONS)
+		)
+		uploaded: list[str] = self._sync_manager.sync(
+			items, remote=remote,
+			delete_prefix="i/" if prune_orphans else None
+		)
+		self._upload_tracker.prune(
+			live_keys=(item.object_name for item in items),
+			prefix="i/", max_age_days=max_age_days
+		)
 		logger.info("Upload process completed with tracking.")
+		return uploaded
 
 class AwsCFHelper:
-	def __init__(self):
-		load_dotenv()
+	def __init__(self, service: S3Service | None = None):
+		if service is None:
+			config_registry().load_env()
+
+		self._aws_cfid: str | None = os.getenv('AWS_CF_DISTRIBUTION_ID')
+		if self._aws_cfid is None:
+			raise ValueError("AWS credentials not available.")
+
+		if service is not None:
+			self.cf_client = service.cloudfront_client
+			return
 
 		aws_akey: str | None = os.getenv('AWS_ACCESS_KEY_ID')
 		aws_sec: str | None = os.getenv('AWS_SECRET_ACCESS_KEY')
-		self._aws_cfid: str | None = os.getenv('AWS_CF_DISTRIBUTION_ID')
-		if aws_akey is None or aws_sec is None or self._aws_cfid is None:
+		if aws_akey is None or aws_sec is None:
 			raise ValueError("AWS credentials not available.")
 
+		import boto3
 		self.cf_client = boto3.client(
 			'cloudfront',
 			aws_access_key_id=aws_akey,
@@ -182,18 +304,109 @@ class AwsCFHelper:
 		:param paths: List of paths to invalidate (e.g., ['/index.html', '/about.html'])
 		:return: Invalidation ID
 		"""
-		invalidation = self.cf_client.create_invalidation(
-			DistributionId=self._aws_cfid,
-			InvalidationBatch={
-				'Paths': {
-					'Quantity': len(paths),
-					'Items': paths
-				},
-				'CallerReference': str(time.time())  # Use current timestamp as unique caller reference
-			}
-		)
+		with run_metrics().span("cf_invalidation") as span:
+			invalidation = self.cf_client.create_invalidation(
+				DistributionId=self._aws_cfid,
+				InvalidationBatch={
+					'Paths': {
+						'Quantity': len(paths),
+						'Items': paths
+					},
+					'CallerReference': str(time.time())  # Use current timestamp as unique caller reference
+				}
+			)
+			span.add(paths=len(paths))
 		return invalidation['Invalidation']['Id']
 
+class InvalidationCollector:
+	"""Collects the paths changed during an upload and invalidates them in one batch.
+
+	Duplicate paths are removed.  When at least ``wildcard_threshold`` paths
+	share a directory they are replaced by a ``/dir/*`` wildcard, and when
+	more than ``max_paths`` paths remain the whole distribution is
+	invalidated with ``/*``.  A wildcard counts as a single path against the
+	invalidation quota.  Fingerprinted assets, whose names change with their
+	content, never need an invalidation and are skipped.
+
+	Keyword arguments:
+	* wildcard_threshold -- The number of paths in a directory that are replaced by a wildcard.
+	* max_paths -- The largest number of paths sent before invalidating everything.
+	* skip_fingerprinted -- Skip paths that match the fingerprint pattern.
+	"""
+	_FINGERPRINT_PATTERN: re.Pattern = re.compile(r"[/.-](?=[0-9]*[a-f])[0-9a-f]{8,64}\.[A-Za-z0-9]+$")
+
+	def __init__(self, wildcard_threshold: int = 5, max_paths: int = 15,
+				 skip_fingerprinted: bool = True):
+		if wildcard_threshold < 2:
+			raise ValueError("wildcard_threshold must be at least 2.")
+		self._wildcard_threshold: int = wildcard_threshold
+		self._max_paths: int = max_paths
+		self._skip_fingerprinted: bool = skip_fingerprinted
+		self._paths: set[str] = set()
+
+	def __len__(self) -> int:
+		return len(self._paths)
+
+	@staticmethod
+	def is_fingerprinted(path: str) -> bool:
+		"""Returns True if the file name carries a content hash, e.g. ``app.3f2a9c1b.js``.
+
+		Purely numeric names, such as eBay item IDs, are not fingerprints.
+		"""
+		return InvalidationCollector._FINGERPRINT_PATTERN.search(path) is not None
+
+	def add(self, *paths: str) -> None:
+		"""Adds paths or object keys to the batch."""
+		for path in paths:
+			if not path.startswith("/"):
+				path = "/" + path
+			if self._skip_fingerprinted and InvalidationCollector.is_fingerprinted(path):
+				logger.info(f"Skipping invalidation of fingerprinted {path}.")
+				continue
+			self._paths.add(path)
+
+	def paths(self) -> list[str]:
+		"""Returns the paths that will be invalidated, after coalescing."""
+		by_directory: dict[str, list[str]] = {}
+		for path in self._paths:
+			if path.endswith("*"):
+				continue
+			by_directory.setdefault(str(PurePosixPath(path).parent), []).append(path)
+
+		coalesced: set[str] = {path for path in self._paths if path.endswith("*")}
+		for directory, paths in by_directory.items():
+			if len(paths) >= self._wildcard_threshold:
+				coalesced.add(directory.rstrip("/") + "/*")
+			else:
+				coalesced.update(paths)
+
+		wildcards: list[str] = [path[:-1] for path in coalesced if path.endswith("*")]
+		result: list[str] = sorted(
+			path for path in coalesced
+			if path.endswith("*") or not any(
+				path.startswith(prefix) and path != prefix for prefix in wildcards
+			)
+		)
+		if len(result) > self._max_paths or "/*" in result:
+			return ["/*"]
+		return result
+
+	def flush(self, create_invalidation: Callable[[list[str]], str] | None = None) -> str | None:
+		"""Sends the batch and returns the invalidation ID, or None if nothing changed.
+
+		``create_invalidation`` defaults to ``AwsCFHelper().create_invalidation``,
+		so the CloudFront client is only created when there is work to do.
+		"""
+		paths: list[str] = self.paths()
+		if not paths:
+			return None
+		if create_invalidation is None:
+			create_invalidation = AwsCFHelper().create_invalidation
+		invalidation_id: str = create_invalidation(paths)
+		logger.info(f"Invalidation ID: {invalidation_id} - {', '.join(paths)}")
+		self._paths.clear()
+		return invalidation_id
+
 if __name__ == "__main__":
 	import sys
 	def _test():
@@ -205,10 +418,9 @@ if __name__ == "__main__":
 		aws_helper.upload_images_with_tracking('httpd/i')
 		aws_helper.upload_file_if_changed(file_path='httpd/index.html', object_name='index.html')
 		aws_helper.upload_file_if_changed(file_path='httpd/style.css', object_name='style.css')
-		cf: AwsCFHelper = AwsCFHelper()
-		invalidation_id = cf.create_invalidation(['/index.html'])
-		invalidation_id = cf.create_invalidation(['/style.css'])
-		logger.info(f"Invalidation ID: {invalidation_id}")
+		invalidations: InvalidationCollector = InvalidationCollector()
+		invalidations.add('/index.html', '/style.css')
+		invalidations.flush()
 
 		exit(0)
 
@@ -3,20 +3,26 @@
 
 import json
 import logging
-import markdown
 
 from random import randint
 from os import path
 from datetime import datetime, timezone
 from io import StringIO
-from typing import Optional
+from typing import Mapping, Optional
 
-from .aws_helper import AwsCFHelper, AwsS3Helper
+from .aws_helper import AwsS3Helper, AwsCFHelper, InvalidationCollector, S3Service
+from .s3_sync import S3RemoteListing
 from .ebayapi import EBayAuctions, AuctionListing
 from .filepathtools import FilePathTools
 from .listitem import UnorderedList, TimeItem, IntItem, StrItem, LinkItem, DescriptionList
 from .collectbot_template import CollectBotTemplate
+from .core.build_graph import BuildGraph, BuildTarget
+from .core.config_registry import config_registry, thaw
+from .core.cache_gc import CacheBudget, CacheCollector, GcReport, referenced_files
 from .core.html_template_processor import HtmlTemplateProcessor
+from .core.run_metrics import RunMetrics, run_metrics
+from .core.offline import is_offline
+from .core.feed_store import FeedStore
 from .core.rss_tool import RssTool
 
 logger = logging.getLogger(__name__)
@@ -27,7 +33,8 @@ class CollectBot:
 			self,
 			app_name: str,
 			app_config: dict[str, any],
-			ebay_auctions: Optional[EBayAuctions] = None):
+			ebay_auctions: Optional[EBayAuctions] = None,
+			s3_service: Optional[S3Service] = None):
 		assert app_name, "App name is required."
 		assert app_config, "App config is required."
 		self._template: CollectBotTemplate = CollectBotTemplate()
@@ -35,9 +42,9 @@ class CollectBot:
 		self._markdown_extensions: list[str] = ['attr_list']
 		self._app_name: str = app_name
 		self._ebay_auctions: EBayAuctions = ebay_auctions
+		self._s3_service: S3Service | None = s3_service
 		self._config = app_config
-		with open("config/epn-categories.json", "r") as file:
-			self._epn_categories = json.load(file)
+		self._feed_store: FeedStore | None = None
 
 	@property
 	def filepath_log(self) -> str:
@@ -104,6 +111,10 @@ class CollectBot:
 		"""Returns the directory path for the config."""
 		return self._config["directory-config"]
 	
+	@property
+	def _epn_categories(self) -> Mapping[str, str]:
+		return config_registry().json(path.join(self.filepath_config_directory, "epn-categories.json"))
+
 	@property
 	def epn_category_default(self) -> str:
 		"""Returns the default category for the eBay Partner Network."""
@@ -122,14 +133,18 @@ class CollectBot:
 	def write_html_to_file(self):
 		"""Writes the HTML to the output file."""
 		s: str = self.create_html()
-		with open(self.filepath_output_html, 'w', encoding="utf-8") as file:
-			file.write(s)
-			logger.info(f"File {self.filepath_output_html} created.")
+		with run_metrics().span("write", file=self.filename_output) as span:
+			with open(self.filepath_output_html, 'w', encoding="utf-8") as file:
+				span.add(bytes=file.write(s))
+				logger.info(f"File {self.filepath_output_html} created.")
 
 	def create_html(self) -> str:
-		_header: str = self._create_html_header()
+		metrics: RunMetrics = run_metrics()
+		with metrics.span("render", section="header"):
+			_header: str = self._create_html_header()
 		_body: str = self._create_html_body()
-		_footer: str = self._create_html_footer()
+		with metrics.span("render", section="footer"):
+			_footer: str = self._create_html_footer()
 		return "".join((_header, _body, _footer))
 	
 	def _create_html_header(self) -> str:
@@ -137,6 +152,7 @@ class CollectBot:
 	
 	def _create_html_body(self) -> str:
 
+		metrics: RunMetrics = run_metrics()
 		exclude: list[str] = [] # Track items displayed above the fold
 
 		# Get the top 3-5 items to display above the fold
@@ -150,25 +166,26 @@ class CollectBot:
 		exclude.append(topitem['itemId'])
 
 		above_fold_links: list[AuctionListing] = []
-		for item in topn:
-			listing: AuctionListing = self._ebay_auctions.top_item_to_auction_listing(
-				item,
-				epn_category=self.epn_category_above_headline_link,
-				download_images=False
+		with metrics.span("render", section="above_fold"):
+			for item in topn:
+				listing: AuctionListing = self._ebay_auctions.top_item_to_auction_listing(
+					item,
+					epn_category=self.epn_category_above_headline_link,
+					download_images=False
+				)
+				above_fold_links.append(listing)
+				exclude.append(item['itemId'])
+
+		with metrics.span("render", section="lead"):
+			top_listing: AuctionListing = self._ebay_auctions.top_item_to_auction_listing(
+				topitem,
+				epn_category=self.epn_category_headline_link
 			)
-			above_fold_links.append(listing)
-			exclude.append(item['itemId'])
-
-		top_listing: AuctionListing = self._ebay_auctions.top_item_to_auction_listing(
-			topitem,
-			epn_category=self.epn_category_headline_link
-		)
-		img: str = CollectBotTemplate.make_featured_image(top_listing.image, "Featured Auction")
 		top_listing_class: str = "th"
 		if top_listing.ending_soon:
 			top_listing_class = "thending"
 
-		title: str = CollectBotTemplate.strip_outter_tag(markdown.markdown(top_listing.title))
+		title: str = CollectBotTemplate.markdown_inline(top_listing.title)
 		attribs: dict[str, str] = {
 			"href": top_listing.url,
 			"class": top_listing_class
@@ -180,6 +197,25 @@ class CollectBot:
 		)
 		link = CollectBotTemplate.html_wrapper(tag="p", content=link)
 
+		# The image derivatives are rendered in the background while the
+		# auctions and news are composed.
+		with metrics.span("render", section="auctions"):
+			auctions: str = self._template.auctions_to_html(
+				self._ebay_auctions, exclude=exclude
+			)
+
+		buffer_html_news: StringIO = StringIO()
+		with metrics.span("render", section="news"):
+			buffer_html_news.write(CollectBotTemplate.make_section_header("News"))
+			buffer_html_news.write(self.section_news_to_html())
+			news: str = CollectBotTemplate.make_news(buffer_html_news.getvalue())
+
+		with metrics.span("render", section="featured_image"):
+			img: str = CollectBotTemplate.make_featured_image(
+				top_listing.image, "Featured Auction",
+				responsive=self._ebay_auctions.responsive_image(top_listing.identifier),
+				sizes=self._config.get("image-derivative-sizes", "(max-width: 600px) 100vw, 400px")
+			)
 		top_item_md: str = "\n".join((img, link))
 
 		bufbody: StringIO = StringIO()
@@ -196,14 +232,6 @@ class CollectBot:
 				body=top_item_md
 			)
 		)
-		auctions: str = self._template.auctions_to_html(
-			self._ebay_auctions, exclude=exclude
-		)
-
-		buffer_html_news: StringIO = StringIO()
-		buffer_html_news.write(CollectBotTemplate.make_section_header("News"))
-		buffer_html_news.write(self.section_news_to_html())
-		news: str = CollectBotTemplate.make_news(buffer_html_news.getvalue())
 		bufbody.write(auctions)
 		bufbody.write("\n")
 		bufbody.write(news)
@@ -225,9 +253,10 @@ class CollectBot:
 
 	def create_sitemap(self, urls: list[str]):
 		filepath_output:str = path.join(self.filepath_output_directory, "sitemap.xml")
-		with open(filepath_output, 'w', encoding="utf-8") as file:
-			file.write(self._template.create_sitemap(urls))
-			logger.info(f"File {filepath_output} created.")
+		with run_metrics().span("write", file="sitemap.xml") as span:
+			with open(filepath_output, 'w', encoding="utf-8") as file:
+				span.add(bytes=file.write(self._template.create_sitemap(urls)))
+				logger.info(f"File {filepath_output} created.")
 
 	def create_style_sheet(self):
 		"""Creates the style sheet for the CollectBot."""
@@ -249,39 +278,65 @@ class CollectBot:
 				logger.info(f"File {filepath_output} created.")
 
 	def update_edition(self):
-		"""Updates the edition of the CollectBot."""
+		"""Updates the edition of the CollectBot.
+
+		Only the edition and modification time are written back, so settings
+		overridden for this run do not end up in the configuration file.
+		"""
 		self._config["edition"] = self._config["edition"] + 1
 		self._config["last-modified"] = datetime.now(timezone.utc).isoformat()
 		filepath_config: str = path.join(
 			self.filepath_config_directory,
 			"config.json"
 		)
+		config_file: dict[str, any] = thaw(config_registry().json(filepath_config))
+		config_file["edition"] = self._config["edition"]
+		config_file["last-modified"] = self._config["last-modified"]
 		with open(filepath_config, "w") as file:
-			json.dump(self._config, file, indent="\t")
+			json.dump(config_file, file, indent="\t")
+
+	@property
+	def feed_store(self) -> FeedStore:
+		"""The state of every news feed group, read once from ``feeds.json``."""
+		if self._feed_store is None:
+			self._feed_store = FeedStore(
+				path.join(self.filepath_cache_directory, "feeds.json"),
+				self.user_agent,
+				legacy_directory=self.filepath_cache_directory,
+				cache_directory=self.filepath_cache_directory,
+				endpoint=self._config.get("rss-endpoint"),
+				min_interval=self._config.get("rss-min-interval", 900),
+				max_interval=self._config.get("rss-max-interval", 86400)
+			)
+		return self._feed_store
+
+	def rss_tool(self, title: str, urls:list[dict[str, any]],
+				 interval: int, filename: str,
+				 max_results: int = 10) -> RssTool:
+		"""Returns the RssTool for a feed group, keeping it in memory between calls."""
+		return self.feed_store.group(title, urls, interval, filename, max_results)
+
+	def rss_feeds(self) -> tuple[Mapping[str, any], ...]:
+		"""Returns the feed groups from the RSS configuration file."""
+		p: str = path.join(self.filepath_config_directory, "rss-feeds.json")
+		return config_registry().json(p)
 
 	def section_news(self, title: str, urls:list[dict[str, any]],
 					 interval: int, filename: str,
 					 max_results: int = 10) -> str:
-		rss: RssTool = RssTool(self.user_agent,
-							   urls=urls, cache_duration=interval,
-							   max_results=max_results,
-							   cache_directory=self.filepath_cache_directory,
-							   cache_file=filename)
 		html_section: str = CollectBotTemplate.generate_html_section(
 			title=title,
-			fetch_func=rss.fetch
+			fetch_func=lambda: self.feed_store.fetch(title, urls, interval, filename, max_results)
 		)
 		return html_section
 	
 	def section_news_to_html(self) -> str:
-		p: str = path.join(self.filepath_config_directory, "rss-feeds.json")
 		buff: StringIO = StringIO()
-		with open(p, "r") as f:
-			rss_feeds = json.load(f)
-			section_html: str = ""
-			for feed in rss_feeds:
-				section_html = self.section_news(**feed)
-				buff.write(section_html)
+		section_html: str = ""
+		for feed in self.rss_feeds():
+			section_html = self.section_news(**feed)
+			buff.write(section_html)
+		self.feed_store.save()
 
 		return CollectBotTemplate.make_container(buff.getvalue())
 
@@ -292,65 +347,168 @@ class CollectBot:
 		logger.info(f"File {self.filename_output} moved to backup.")
 
 	def upload_to_s3(self):
-		"""Uploads the output file to S3."""
-		aws_helper: AwsS3Helper = AwsS3Helper(
-			bucket_name=self._config['aws-s3-bucket-name'],
-			region=self._config['aws-s3-region'],
-			ensure_bucket=bool(self._config['aws-s3-ensure-bucket']),
-			cache_dir=self.filepath_cache_directory
+		"""Uploads the changed site files to S3 and invalidates them in one batch."""
+		if self._s3_service is None:
+			self._s3_service = S3Service.from_config(self._config)
+		service: S3Service = self._s3_service
+		aws_helper: AwsS3Helper = service.helper(
+			ensure_bucket=bool(self._config['aws-s3-ensure-bucket'])
 		)
 
 		img_filepath: str = path.join(self.filepath_template_directory, "og-image.jpeg")
-		og_image_updated: bool = aws_helper.upload_file_if_changed(
+		aws_helper.upload_file_if_changed(
 			file_path=img_filepath, object_name="og-image.jpeg"
 		)
 
-		cf: AwsCFHelper = AwsCFHelper()
-		if aws_helper.upload_file_if_changed(
-			file_path='httpd/index.html', object_name='index.html'):
-
-			invalidation_id = cf.create_invalidation(['/'])
-			logger.info(f"Invalidation ID: {invalidation_id} - /")
-
-			invalidation_id = cf.create_invalidation(['/index.html'])
-			logger.info(f"Invalidation ID: {invalidation_id} - /index.html")
-
-		if aws_helper.upload_file_if_changed(
-			file_path='httpd/sitemap.xml', object_name='sitemap.xml'):
-			invalidation_id = cf.create_invalidation(['/sitemap.xml'])
-			logger.info(f"Invalidation ID: {invalidation_id} - /sitemap.xml")
-
-		if aws_helper.upload_file_if_changed(
-			file_path='httpd/style.css', object_name='style.css'):
-			invalidation_id = cf.create_invalidation(['/style.css'])
-			logger.info(f"Invalidation ID: {invalidation_id} - /style.css")
-		
-		if aws_helper.upload_file_if_changed(
-			file_path='httpd/favicon.ico', object_name='favicon.ico'):
-			invalidation_id = cf.create_invalidation(['/favicon.ico'])
-			logger.info(f"Invalidation ID: {invalidation_id} - /favicon.ico")
-
+		site_files: list[str] = [
+			self.filename_output, "sitemap.xml", "style.css",
+			"favicon.ico", "robots.txt", "h.min.js"
+		]
+		remote: S3RemoteListing | None = None
+		if self._config.get('aws-s3-remote-sync', False):
+			remote = aws_helper.remote_listing(
+				max_age=self._config.get('aws-s3-listing-ttl', 24 * 60 * 60)
+			)
+		uploaded: list[str] = aws_helper.upload_files_if_changed([
+			(path.join(self.filepath_output_directory, name), name)
+			for name in site_files
+		], remote=remote)
+		if remote:
+			aws_helper.upload_images_with_tracking(
+				self.filepath_image_directory, remote=remote,
+				prune_orphans=self._config.get('aws-s3-prune-orphans', False)
+			)
 
-		if aws_helper.upload_file_if_changed(
-			file_path='httpd/robots.txt', object_name='robots.txt'):
-			invalidation_id = cf.create_invalidation(['/robots.txt'])
-			logger.info(f"Invalidation ID: {invalidation_id} - /robots.txt")
-		
+		invalidations: InvalidationCollector = InvalidationCollector(
+			wildcard_threshold=self._config.get('aws-cf-wildcard-threshold', 5),
+			max_paths=self._config.get('aws-cf-max-paths', 15)
+		)
+		for name in uploaded:
+			invalidations.add(name)
+			if name == self.filename_output:
+				invalidations.add("/")
+		invalidations.flush(lambda paths: AwsCFHelper(service).create_invalidation(paths))
 
-		if aws_helper.upload_file_if_changed(
-			file_path="httpd/h.min.js", object_name="h.min.js"):
-			invalidation_id = cf.create_invalidation(['/h.min.js'])
-			logger.info(f"Invalidation ID: {invalidation_id} - /h.min.js")
+	@property
+	def s3_service(self) -> S3Service | None:
+		return self._s3_service
 
 	def set_ebay_auctions(self, ebay_auctions: EBayAuctions):
 		self._ebay_auctions = ebay_auctions
 
-	def generate_site(self):
-		self.write_html_to_file()
-		self.create_sitemap(["https://hobbyreport.net"])
-		self.create_style_sheet()
-		self.create_js()
-		self.backup_files()
-		self.update_edition()
-		#self.upload_to_s3()
-		logger.info("Site generation complete.")
+	def refresh_news(self) -> bool:
+		"""Refreshes every expired news feed and returns True if any produced new items."""
+		changed: bool = False
+		for feed in self.rss_feeds():
+			with run_metrics().span("rss_refresh", feed=feed["title"]):
+				changed = self.rss_tool(**feed).refresh() or changed
+		self.feed_store.save()
+		return changed
+
+	def _page_config_digest(self) -> str:
+		"""The configuration values rendered into the page, excluding the edition."""
+		keys: tuple[str, ...] = (
+			"site-title", "canonical-url",
+			"display-above-the-fold-header", "display-lead-headline-header"
+		)
+		values: dict[str, any] = {key: self._config.get(key) for key in keys}
+		values["app-name"] = self._app_name
+		return json.dumps(values, sort_keys=True)
+
+	def _auctions_digest(self) -> str:
+		"""The eBay listings rendered into the page."""
+		return json.dumps(
+			[auction.get("items", []) for auction in self._ebay_auctions.auctions],
+			sort_keys=True
+		)
+
+	def _news_digest(self) -> str:
+		"""The news items rendered into the page."""
+		return json.dumps(
+			[self.rss_tool(**feed).items for feed in self.rss_feeds()],
+			sort_keys=True
+		)
+
+	def build_graph(self) -> BuildGraph:
+		"""Returns the build graph for the site artifacts."""
+		template: str = self.filepath_template_directory
+		config: str = self.filepath_config_directory
+		output: str = self.filepath_output_directory
+		canonical_url: str = self._config["canonical-url"]
+		graph: BuildGraph = BuildGraph(
+			path.join(self.filepath_cache_directory, "build_state.json"),
+			max_workers=self._config.get("build-max-workers", 4)
+		)
+		graph.add_target(BuildTarget(
+			name="index.html",
+			build=self.write_html_to_file,
+			inputs=[
+				path.join(template, "header.html"),
+				path.join(template, "style_inline.css"),
+				path.join(template, "header_js.html"),
+				path.join(template, "footer.html"),
+				path.join(config, "auctions-ebay.json"),
+				path.join(config, "rss-feeds.json"),
+				path.join(config, "epn-categories.json"),
+				"prompts/function_headlines.json",
+				self._page_config_digest,
+				self._auctions_digest,
+				self._news_digest
+			],
+			outputs=[self.filepath_output_html]
+		))
+		graph.add_target(BuildTarget(
+			name="sitemap.xml",
+			build=lambda: self.create_sitemap([canonical_url]),
+			inputs=[lambda: canonical_url],
+			depends=["index.html"],
+			outputs=[path.join(output, "sitemap.xml")]
+		))
+		graph.add_target(BuildTarget(
+			name="style.css",
+			build=self.create_style_sheet,
+			inputs=[path.join(template, "style.css")],
+			outputs=[path.join(output, "style.css")]
+		))
+		graph.add_target(BuildTarget(
+			name="h.min.js",
+			build=self.create_js,
+			inputs=[path.join(template, "h.min.js")],
+			outputs=[path.join(output, "h.min.js")]
+		))
+		graph.add_target(BuildTarget(
+			name="backup",
+			build=self.backup_files,
+			depends=["index.html"]
+		))
+		graph.add_target(BuildTarget(
+			name="edition",
+			build=self.update_edition,
+			depends=["index.html"]
+		))
+		return graph
+
+	def cache_budgets(self) -> list[CacheBudget]:
+		"""Returns the budgets of the cache directories from `cache-gc`."""
+		return [
+			CacheBudget.from_dict(directory, budget)
+			for directory, budget in self._config.get("cache-gc", {}).items()
+		]
+
+	def collect_garbage(self, dry_run: bool = False) -> GcReport:
+		"""Evicts cached files over budget, keeping the files the current page references."""
+		collector: CacheCollector = CacheCollector(
+			self.cache_budgets(),
+			protected=referenced_files(self.filepath_output_html, self.filepath_output_directory)
+		)
+		return collector.collect(dry_run=dry_run)
+
+	def generate_site(self, force: bool = False):
+		"""Builds the site artifacts whose inputs changed since the last build."""
+		self.refresh_news()
+		built: list[str] = self.build_graph().build(force=force)
+		if built and self._config.get("aws-s3-upload", False) and not is_offline():
+			self.upload_to_s3()
+		logger.info(f"Site generation complete. Built: {', '.join(built) or 'nothing'}.")
+		if self._config.get("cache-gc-after-run", False):
+			self.collect_garbage()
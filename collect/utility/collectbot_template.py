@@ -2,7 +2,6 @@
 # -*- coding: utf-8 -*-
 
 import logging
-import markdown
 
 from datetime import datetime, timezone
 from io import StringIO
@@ -11,6 +10,7 @@ from os import path
 
 from .listitem import ListItemsCollection
 from .ebayapi import EBayAuctions, AuctionListing, AuctionListingSimple
+from .core.image_derivatives import ImageVariant, ResponsiveImage
 from .core.html_template_processor import HtmlTemplateProcessor
 from .core.string_adorner import StringAdorner, HtmlWrapper
 
@@ -112,7 +112,7 @@ class CollectBotTemplate:
 				attribs: dict = { "href": listing.url }
 				if listing.ending_soon:
 					attribs["class"] = "aending"
-				title: str = CollectBotTemplate.strip_outter_tag(markdown.markdown(listing.title))
+				title: str = CollectBotTemplate.markdown_inline(listing.title)
 				link: str = CollectBotTemplate.html_wrapper(tag="a", content=title, attributes=attribs)
 				time: str = ""
 				if listing.ending_soon:
@@ -174,15 +174,63 @@ class CollectBotTemplate:
 		end = len(s)-s[::-1].find('<')-1
 		return s[start:end]
 
-	def make_featured_image(src: str, alt: str) -> str:
-		s: str = HtmlWrapper.html_item(
+	def markdown_inline(s: str) -> str:
+		""" renders markdown without the outer paragraph tag """
+		import markdown
+		return CollectBotTemplate.strip_outter_tag(markdown.markdown(s))
+
+	def make_featured_image(src: str, alt: str,
+							responsive: ResponsiveImage | None = None,
+							sizes: str = "(max-width: 600px) 100vw, 400px",
+							loading: str = "eager",
+							fallback_width: int = 400) -> str:
+		"""Returns the featured image.
+
+		With responsive derivatives the image is wrapped in a picture element
+		offering the WebP derivatives, and the img element carries the JPEG
+		srcset along with its intrinsic width and height.
+		"""
+		if responsive is None:
+			s: str = HtmlWrapper.html_item(
+				tag="img",
+				attributes={
+					"src": src,
+					"class": "thi",
+					"alt": alt,
+					"loading": loading
+				}
+			)
+			return HtmlWrapper.wrap_html(content=s, tag="p")
+
+		fallback: ImageVariant = responsive.fallback(fallback_width)
+		buf: StringIO = StringIO()
+		buf.write("<picture>")
+		webp_srcset: str = responsive.webp_srcset()
+		if webp_srcset:
+			buf.write(HtmlWrapper.html_item(
+				tag="source",
+				attributes={
+					"type": "image/webp",
+					"srcset": webp_srcset,
+					"sizes": sizes
+				}
+			))
+		buf.write(HtmlWrapper.html_item(
 			tag="img",
 			attributes={
-				"src": src,
+				"src": fallback.path,
+				"srcset": responsive.jpeg_srcset(),
+				"sizes": sizes,
+				"width": str(fallback.width),
+				"height": str(fallback.height),
 				"class": "thi",
-				"alt": alt
+				"alt": alt,
+				"loading": loading
 			}
-		)
+		))
+		buf.write("</picture>")
+		s = buf.getvalue()
+		buf.close()
 		return HtmlWrapper.wrap_html(content=s, tag="p")
 	
 	@_adorner.html_wrapper_attributes("main", {"id": "hrpt"})
@@ -209,7 +257,7 @@ class CollectBotTemplate:
 			else:
 				time = ""
 			
-			title: str = CollectBotTemplate.strip_outter_tag(markdown.markdown(link.title))
+			title: str = CollectBotTemplate.markdown_inline(link.title)
 			link_html: str = CollectBotTemplate.html_wrapper(tag="a", content=title, attributes=attribs)
 			link_html = CollectBotTemplate.html_wrapper(tag="li", content=(link_html + time))
 			buf.write(link_html)
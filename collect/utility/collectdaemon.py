@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+import signal
+import threading
+
+from functools import partial
+from typing import Final, Mapping
+
+from .collectbot import CollectBot
+from .ebayapi import EBayAuctions
+from .core.refresh_scheduler import RefreshScheduler
+from .core.run_metrics import RunMetrics, run_metrics
+from .core.feed_store import FeedStore
+from .core.rss_tool import RssTool
+
+logger = logging.getLogger(__name__)
+
+class CollectDaemon:
+	"""Keeps the CollectBot running and refreshes each source on its own interval.
+
+	The caches, robots.txt rules and HTTP connection pools stay in memory
+	between refreshes. The site is generated again only when a refresh
+	produced new data.
+
+	``rss-feeds.json`` is checked every minute; the jobs of the groups that
+	were added, removed or edited are scheduled again.
+	"""
+	_FEEDS_JOB: Final[str] = "rss-feeds.json"
+	_FEEDS_CHECK_INTERVAL: Final[float] = 60.0
+
+	def __init__(self, collectbot: CollectBot, ebay_auctions: EBayAuctions,
+				 jitter: float = 0.1, metrics_directory: str | None = None):
+		self._collectbot: CollectBot = collectbot
+		self._metrics_directory: str | None = metrics_directory
+		self._ebay_auctions: EBayAuctions = ebay_auctions
+		self._stop_event: threading.Event = threading.Event()
+		self._scheduler: RefreshScheduler = RefreshScheduler(jitter=jitter)
+		# The entries of rss-feeds.json the feed jobs were scheduled with, by filename.
+		self._feeds: dict[str, Mapping[str, any]] = {}
+		self._add_jobs()
+
+	@property
+	def scheduler(self) -> RefreshScheduler:
+		return self._scheduler
+
+	def _add_jobs(self) -> None:
+		ebay: EBayAuctions = self._ebay_auctions
+		self._scheduler.add_job(
+			name="ebay",
+			func=ebay.refresh_auctions,
+			interval=ebay.seconds_until_stale,
+			initial_delay=ebay.seconds_until_stale()
+		)
+		self._sync_feed_jobs()
+		self._scheduler.add_job(
+			name=CollectDaemon._FEEDS_JOB,
+			func=self._sync_feed_jobs,
+			interval=CollectDaemon._FEEDS_CHECK_INTERVAL,
+			initial_delay=CollectDaemon._FEEDS_CHECK_INTERVAL
+		)
+
+	def _sync_feed_jobs(self) -> bool:
+		"""Schedules the feed groups of rss-feeds.json, which is read again
+		when it changed on disk.  Returns True if a group was added, removed
+		or edited since the last call.
+		"""
+		feeds: dict[str, Mapping[str, any]] = {
+			feed["filename"]: feed for feed in self._collectbot.rss_feeds()
+		}
+		changed: bool = False
+		for filename, feed in list(self._feeds.items()):
+			if feeds.get(filename) != feed:
+				self._scheduler.remove_job(feed["title"])
+				del self._feeds[filename]
+				changed = True
+		store: FeedStore = self._collectbot.feed_store
+		for filename, feed in feeds.items():
+			if filename in self._feeds:
+				continue
+			rss: RssTool = store.group(**feed)
+			self._scheduler.add_job(
+				name=feed["title"],
+				func=partial(store.refresh, filename),
+				interval=rss.seconds_until_stale,
+				initial_delay=rss.seconds_until_stale()
+			)
+			self._feeds[filename] = feed
+			changed = True
+		return changed
+
+	def _on_change(self, sources: list[str]) -> None:
+		try:
+			self._collectbot.generate_site()
+		except Exception as e:
+			logger.error(f"Site generation failed: {e}")
+		self._ebay_auctions.flush()
+		# The metrics of a run cover the refreshes leading up to it.
+		if self._metrics_directory:
+			metrics: RunMetrics = run_metrics()
+			metrics.write(self._metrics_directory)
+			metrics.reset()
+
+	def stop(self, *args) -> None:
+		"""Stops the daemon after the current refresh completes."""
+		logger.info("Stopping the daemon.")
+		self._stop_event.set()
+
+	def run(self) -> int:
+		"""Runs until interrupted by SIGINT or SIGTERM."""
+		signal.signal(signal.SIGINT, self.stop)
+		signal.signal(signal.SIGTERM, self.stop)
+		logger.info(f"Daemon started with {len(self._scheduler)} sources.")
+		self._scheduler.run_forever(self._on_change, self._stop_event)
+		return 0
+
+if __name__ == "__main__":
+	raise ValueError("This script is not meant to be run directly.")
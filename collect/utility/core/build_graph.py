@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import logging
+import os
+
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import Callable
+
+from .run_metrics import run_metrics
+
+logger = logging.getLogger(__name__)
+
+BuildInput = str | Callable[[], str | bytes]
+
+@dataclass
+class BuildTarget:
+	"""A site artifact and the inputs it is built from.
+
+	Attributes:
+		name (str): The unique name of the target.
+		build (Callable[[], None]): Builds the target.
+		inputs (list[BuildInput]): File paths, or callables returning the
+			value the target depends on.
+		depends (list[str]): Names of the targets that must be built first.
+		outputs (list[str]): The files written by the target.  A missing
+			output forces a rebuild.
+	"""
+	name: str
+	build: Callable[[], None]
+	inputs: list[BuildInput] = field(default_factory=list)
+	depends: list[str] = field(default_factory=list)
+	outputs: list[str] = field(default_factory=list)
+
+class BuildGraph:
+	"""A small make-like build graph.
+
+	Each target is rebuilt only when the digest of its inputs, including the
+	outputs of the targets it depends on, differs from the digest recorded
+	by the previous build.  Targets whose dependencies are satisfied are
+	built in parallel.
+	"""
+	_CHUNK_SIZE: int = 1024 * 1024
+
+	def __init__(self, state_file: str, max_workers: int = 4):
+		self._state_file: str = state_file
+		self._max_workers: int = max_workers
+		self._targets: dict[str, BuildTarget] = {}
+		self._state: dict[str, dict[str, str]] = self._load_state()
+
+	def __len__(self) -> int:
+		return len(self._targets)
+
+	def add_target(self, target: BuildTarget) -> None:
+		if target.name in self._targets:
+			raise ValueError(f"Target {target.name} already exists.")
+		self._targets[target.name] = target
+
+	def _load_state(self) -> dict[str, dict[str, str]]:
+		if not os.path.exists(self._state_file):
+			return {}
+		with open(self._state_file, "r") as file:
+			try:
+				return json.load(file)
+			except json.JSONDecodeError:
+				logger.warning(f"Corrupted build state file: {self._state_file}")
+				return {}
+
+	def _save_state(self) -> None:
+		with open(self._state_file, "w") as file:
+			json.dump(self._state, file, indent="\t")
+
+	def _file_digest(self, file_path: str) -> str:
+		if not os.path.exists(file_path):
+			return "missing"
+		hasher = hashlib.sha256()
+		with open(file_path, "rb") as f:
+			for chunk in iter(lambda: f.read(BuildGraph._CHUNK_SIZE), b""):
+				hasher.update(chunk)
+		return hasher.hexdigest()
+
+	def _input_digest(self, target: BuildTarget, output_digests: dict[str, str]) -> str:
+		hasher = hashlib.sha256()
+		for build_input in target.inputs:
+			if callable(build_input):
+				value: str | bytes = build_input()
+				if isinstance(value, str):
+					value = value.encode("utf-8")
+				hasher.update(hashlib.sha256(value).digest())
+			else:
+				hasher.update(build_input.encode("utf-8"))
+				hasher.update(self._file_digest(build_input).encode("ascii"))
+		for name in target.depends:
+			hasher.update(name.encode("utf-8"))
+			hasher.update(output_digests.get(name, "").encode("ascii"))
+		return hasher.hexdigest()
+
+	def _output_digest(self, target: BuildTarget, input_digest: str) -> str:
+		if not target.outputs:
+			return input_digest
+		hasher = hashlib.sha256()
+		for output in target.outputs:
+			hasher.update(self._file_digest(output).encode("ascii"))
+		return hasher.hexdigest()
+
+	def _is_up_to_date(self, target: BuildTarget, input_digest: str) -> bool:
+		state: dict[str, str] | None = self._state.get(target.name)
+		if not state or state.get("inputs") != input_digest:
+			return False
+		return all(os.path.exists(output) for output in target.outputs)
+
+	def _validate(self) -> None:
+		for target in self._targets.values():
+			for name in target.depends:
+				if name not in self._targets:
+					raise ValueError(f"Target {target.name} depends on unknown target {name}.")
+
+	@staticmethod
+	def _build_target(target: BuildTarget) -> None:
+		with run_metrics().span("build", target=target.name):
+			target.build()
+
+	def build(self, force: bool = False) -> list[str]:
+		"""Build every out of date target and return the names of the targets that were built."""
+		self._validate()
+		pending: dict[str, BuildTarget] = dict(self._targets)
+		done: set[str] = set()
+		failed: set[str] = set()
+		built: list[str] = []
+		output_digests: dict[str, str] = {}
+		errors: list[Exception] = []
+		running: dict[Future, tuple[BuildTarget, str]] = {}
+
+		with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+			while pending or running:
+				progress: bool = True
+				while progress:
+					progress = False
+					for name, target in list(pending.items()):
+						if any(dep in failed for dep in target.depends):
+							logger.warning(f"Skipping {name}, a dependency failed.")
+							failed.add(name)
+							del pending[name]
+							progress = True
+							continue
+						if not all(dep in done for dep in target.depends):
+							continue
+						del pending[name]
+						progress = True
+						input_digest: str = self._input_digest(target, output_digests)
+						if not force and self._is_up_to_date(target, input_digest):
+							logger.info(f"Target {name} is up to date.")
+							output_digests[name] = self._state[name]["outputs"]
+							done.add(name)
+							continue
+						running[executor.submit(self._build_target, target)] = (target, input_digest)
+
+				if not running:
+					if pending:
+						raise ValueError(f"Dependency cycle between {', '.join(pending)}.")
+					break
+
+				finished, _ = wait(running, return_when=FIRST_COMPLETED)
+				for future in finished:
+					target, input_digest = running.pop(future)
+					try:
+						future.result()
+					except Exception as e:
+						logger.error(f"Target {target.name} failed: {e}")
+						failed.add(target.name)
+						errors.append(e)
+						continue
+					output_digests[target.name] = self._output_digest(target, input_digest)
+					self._state[target.name] = {
+						"inputs": input_digest,
+						"outputs": output_digests[target.name]
+					}
+					done.add(target.name)
+					built.append(target.name)
+
+		if built:
+			self._save_state()
+		if errors:
+			raise errors[0]
+		return built
+
+if __name__ == "__main__":
+	raise ValueError("This script is not meant to be run directly.")
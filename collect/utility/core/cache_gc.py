@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import fnmatch
+import logging
+import os
+import re
+import time
+
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class CacheBudget:
+	"""The size and age limits of one cache directory.
+
+	Attributes:
+		directory (str): The directory, scanned recursively.
+		max_bytes (int | None): The total size the files may use.
+		max_age_days (float | None): Files unused for longer are evicted.
+		keep (list[str]): File name patterns that are never evicted.
+		keep_newest (int): The number of most recently used files that are
+			never evicted.
+	"""
+	directory: str
+	max_bytes: int | None = None
+	max_age_days: float | None = None
+	keep: list[str] = field(default_factory=list)
+	keep_newest: int = 0
+
+	@classmethod
+	def from_dict(cls, directory: str, data: dict[str, any]) -> "CacheBudget":
+		return cls(
+			directory=directory,
+			max_bytes=data.get("max-bytes"),
+			max_age_days=data.get("max-age-days"),
+			keep=list(data.get("keep", [])),
+			keep_newest=data.get("keep-newest", 0)
+		)
+
+class CacheEntry(NamedTuple):
+	path: str
+	size: int
+	last_used: float
+
+class GcReport(NamedTuple):
+	scanned: int
+	evicted: list[str]
+	freed_bytes: int
+
+_REFERENCE_PATTERN: re.Pattern = re.compile(r'\b(?:src|href|srcset)="([^"]+)"')
+
+def referenced_files(html_file: str, site_directory: str) -> set[str]:
+	"""Returns the local files referenced by the src, href and srcset
+	attributes of the page.
+	"""
+	if not os.path.exists(html_file):
+		return set()
+	with open(html_file, "r", encoding="utf-8") as file:
+		html: str = file.read()
+	files: set[str] = set()
+	for match in _REFERENCE_PATTERN.finditer(html):
+		for candidate in match.group(1).split(","):
+			url: str = candidate.strip().split(" ")[0]
+			if not url or "://" in url or url.startswith(("#", "mailto:", "data:", "//")):
+				continue
+			url = url.split("?")[0].split("#")[0].lstrip("/")
+			files.add(os.path.abspath(os.path.join(site_directory, url)))
+	return files
+
+class CacheCollector:
+	"""Evicts the least recently used files of each cache directory until
+	the directory is within its budget.
+
+	A file is last used at the later of its access and modification times,
+	so file systems mounted with ``noatime`` fall back to the modification
+	time.  Protected files, such as the files referenced by the current
+	page, are never evicted but count toward the size of their directory.
+
+	Keyword arguments:
+	* budgets -- The budget of each directory.
+	* protected -- Paths that must never be evicted.
+	* clock -- Returns the current time in seconds since the epoch.
+	"""
+	def __init__(self, budgets: Iterable[CacheBudget],
+				 protected: Iterable[str] = (),
+				 clock: Callable[[], float] = time.time):
+		self._budgets: list[CacheBudget] = list(budgets)
+		self._protected: set[str] = {os.path.abspath(p) for p in protected}
+		self._clock: Callable[[], float] = clock
+
+	def protect(self, paths: Iterable[str]) -> None:
+		self._protected.update(os.path.abspath(p) for p in paths)
+
+	@staticmethod
+	def _scan(directory: str) -> list[CacheEntry]:
+		entries: list[CacheEntry] = []
+		stack: list[str] = [directory]
+		while stack:
+			current: str = stack.pop()
+			try:
+				with os.scandir(current) as iterator:
+					for entry in iterator:
+						if entry.is_dir(follow_symlinks=False):
+							stack.append(entry.path)
+						elif entry.is_file(follow_symlinks=False):
+							stat: os.stat_result = entry.stat(follow_symlinks=False)
+							entries.append(CacheEntry(
+								entry.path, stat.st_size, max(stat.st_atime, stat.st_mtime)
+							))
+			except FileNotFoundError:
+				continue
+		return entries
+
+	def _is_kept(self, budget: CacheBudget, entry: CacheEntry) -> bool:
+		name: str = os.path.basename(entry.path)
+		return os.path.abspath(entry.path) in self._protected \
+			or any(fnmatch.fnmatch(name, pattern) for pattern in budget.keep)
+
+	def _select(self, budget: CacheBudget, entries: list[CacheEntry]) -> list[CacheEntry]:
+		"""Returns the entries to evict, least recently used first."""
+		entries = sorted(entries, key=lambda e: e.last_used)
+		if budget.keep_newest > 0:
+			candidates: list[CacheEntry] = entries[:-budget.keep_newest]
+		else:
+			candidates = entries
+		candidates = [e for e in candidates if not self._is_kept(budget, e)]
+
+		evict: list[CacheEntry] = []
+		if budget.max_age_days is not None:
+			cutoff: float = self._clock() - budget.max_age_days * 24 * 60 * 60
+			evict = [e for e in candidates if e.last_used < cutoff]
+
+		if budget.max_bytes is not None:
+			evicted: set[str] = {e.path for e in evict}
+			total: int = sum(e.size for e in entries) - sum(e.size for e in evict)
+			for entry in candidates:
+				if total <= budget.max_bytes:
+					break
+				if entry.path in evicted:
+					continue
+				evict.append(entry)
+				total -= entry.size
+			if total > budget.max_bytes:
+				logger.warning(f"{budget.directory} exceeds its budget by {total - budget.max_bytes} bytes in kept files.")
+		return evict
+
+	def collect(self, dry_run: bool = False) -> GcReport:
+		"""Evicts the files over budget and returns what was evicted."""
+		scanned: int = 0
+		evicted: list[str] = []
+		freed: int = 0
+		for budget in self._budgets:
+			if not os.path.isdir(budget.directory):
+				continue
+			entries: list[CacheEntry] = CacheCollector._scan(budget.directory)
+			scanned += len(entries)
+			for entry in self._select(budget, entries):
+				if not dry_run:
+					try:
+						os.remove(entry.path)
+					except FileNotFoundError:
+						continue
+					except OSError as e:
+						logger.warning(f"Could not evict {entry.path}: {e}")
+						continue
+				evicted.append(entry.path)
+				freed += entry.size
+		logger.info(f"Cache GC {'would evict' if dry_run else 'evicted'} {len(evicted)} of {scanned} files, {freed} bytes.")
+		return GcReport(scanned, evicted, freed)
+
+if __name__ == "__main__":
+	raise ValueError("This script is not meant to be run directly.")
@@ -6,12 +6,14 @@ import os
 import time
 import logging
 
-from requests import get
-from requests.models import Response
-from typing import Final
+from typing import Final, TYPE_CHECKING
+from .http_session import shared_session
 from urllib.parse import urlparse, ParseResult
 from urllib.robotparser import RobotFileParser
 
+if TYPE_CHECKING:
+	from requests.models import Response
+
 logger = logging.getLogger(__name__)
 
 class CachingRobotFileParser:
@@ -41,13 +43,14 @@ class CachingRobotFileParser:
 			raise ValueError("Invalid domain.")
 		
 		self._loaded: bool = False
+		self._fetched_time: float = 0.0
 		self._cache_directory: str = cache_directory
 		self._robot_parser: RobotFileParser = RobotFileParser()
 		self._robot_parser.modified()
 
-	def get(self, url: str) -> Response:
+	def get(self, url: str) -> "Response":
 		"""Wrapper around requests.get for easier mocking in tests."""
-		return get(url)
+		return shared_session().get(url)
 
 	@property
 	def cache_file_path(self) -> str:
@@ -57,9 +60,17 @@ class CachingRobotFileParser:
 			f"robots_txt_{self._domain}.json"
 		)
 
+	@property
+	def is_stale(self) -> bool:
+		"""Return True if the robots.txt rules need to be loaded again."""
+		if not self._loaded:
+			return True
+		return time.time() - self._fetched_time >= CachingRobotFileParser._ROBOTS_TXT_TIMEOUT
+
 	def load_robots_txt_from_text(self, robots_txt: str) -> None:
 		"""Load the robots.txt file from the given text."""
 		self._robot_parser.parse(robots_txt.splitlines())
+		self._fetched_time = time.time()
 		self._loaded = True
 		return
 
@@ -68,6 +79,7 @@ class CachingRobotFileParser:
 		cache_filepath: str = self.cache_file_path
 		robots_txt: str = ""
 		cache_data: dict = {}
+		fetched_time: float = time.time()
 		if os.path.exists(cache_filepath):
 			try:
 				with open(cache_filepath, "r") as cache_file:
@@ -84,6 +96,7 @@ class CachingRobotFileParser:
 
 		if cache_data:
 			robots_txt = cache_data["robots_txt"]
+			fetched_time = cache_data["timestamp"]
 		else:
 			# Cache is old or doesn't exist.  Fetch the robots.txt file.
 			response: Response = self.get(robots_url)
@@ -96,6 +109,7 @@ class CachingRobotFileParser:
 				robots_txt = ""
 
 		self._robot_parser.parse(robots_txt.splitlines())
+		self._fetched_time = fetched_time
 		self._loaded = True
 		return
 
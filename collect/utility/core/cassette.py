@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from datetime import timedelta
+from typing import Final
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from requests import ConnectionError, PreparedRequest, Response
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_MODES: Final[tuple[str, ...]] = ("record", "replay")
+
+class CassetteMiss(ConnectionError):
+	"""Raised when a replayed request was never recorded."""
+
+class CassetteStore:
+	"""Recorded responses, one gzip compressed JSON file per request.
+
+	Requests are keyed by a hash of their method, their URL with sorted
+	query parameters and their body, with JSON bodies in canonical form.
+	Headers are not part of the key, so API keys and per request IDs do
+	not prevent a replay.
+
+	Keyword arguments:
+	* directory -- The directory holding the cassette files.
+	* ignore_params -- Query parameters left out of the key.
+	"""
+	# Response headers describing the transfer rather than the content.
+	_DROPPED_HEADERS: Final[frozenset[str]] = frozenset({
+		"content-encoding", "content-length", "transfer-encoding", "connection",
+		"set-cookie", "date"
+	})
+
+	def __init__(self, directory: str, ignore_params: tuple[str, ...] = ()):
+		os.makedirs(directory, exist_ok=True)
+		self._directory: str = directory
+		self._ignore_params: frozenset[str] = frozenset(ignore_params)
+
+	@staticmethod
+	def _normalize_body(body: bytes | str | None) -> bytes:
+		if body is None:
+			return b""
+		if isinstance(body, str):
+			body = body.encode("utf-8")
+		try:
+			return json.dumps(json.loads(body), sort_keys=True, separators=(",", ":")).encode("utf-8")
+		except (ValueError, UnicodeDecodeError):
+			return body.strip()
+
+	def _normalize_url(self, url: str) -> str:
+		parts = urlsplit(url)
+		query: list[tuple[str, str]] = sorted(
+			(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+			if key not in self._ignore_params
+		)
+		return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/",
+						   urlencode(query), ""))
+
+	def key(self, request: PreparedRequest) -> str:
+		"""Returns the key of the normalized request."""
+		hasher = hashlib.sha256()
+		hasher.update(request.method.upper().encode("ascii"))
+		hasher.update(b"\0")
+		hasher.update(self._normalize_url(request.url).encode("utf-8"))
+		hasher.update(b"\0")
+		hasher.update(CassetteStore._normalize_body(request.body))
+		return hasher.hexdigest()[:32]
+
+	def _path(self, key: str) -> str:
+		return os.path.join(self._directory, f"{key}.json.gz")
+
+	def save(self, request: PreparedRequest, response: Response) -> None:
+		"""Records the response to the request."""
+		content: bytes = response.content or b""
+		entry: dict[str, any] = {
+			"method": request.method,
+			"url": request.url,
+			"status": response.status_code,
+			"reason": response.reason,
+			"headers": {
+				name: value for name, value in response.headers.items()
+				if name.lower() not in CassetteStore._DROPPED_HEADERS
+			},
+			"elapsed": response.elapsed.total_seconds() if response.elapsed else 0.0
+		}
+		# Text compresses better than its base64 encoding.
+		try:
+			entry["text"] = content.decode("utf-8")
+		except UnicodeDecodeError:
+			entry["body"] = base64.b64encode(content).decode("ascii")
+		path: str = self._path(self.key(request))
+		temp_file: str = f"{path}.{threading.get_ident()}.tmp"
+		with gzip.open(temp_file, "wt", encoding="utf-8") as file:
+			json.dump(entry, file, separators=(",", ":"))
+		os.replace(temp_file, path)
+
+	def load(self, request: PreparedRequest) -> dict[str, any] | None:
+		"""Returns the recorded entry of the request, or None."""
+		path: str = self._path(self.key(request))
+		if not os.path.exists(path):
+			return None
+		with gzip.open(path, "rt", encoding="utf-8") as file:
+			return json.load(file)
+
+class CassetteAdapter(HTTPAdapter):
+	"""A requests transport adapter that records or replays responses.
+
+	In ``record`` mode requests go to the network and every response is
+	saved to the store.  In ``replay`` mode responses are served from the
+	store and a request that was not recorded raises CassetteMiss.  The
+	replayed responses can be delayed by a fixed number of seconds, or by
+	the time the recorded request took with ``latency="recorded"``.
+	"""
+	def __init__(self, store: CassetteStore, mode: str = "replay",
+				 latency: float | str | None = None, **kwargs):
+		if mode not in CASSETTE_MODES:
+			raise ValueError(f"Unknown cassette mode: {mode}")
+		super().__init__(**kwargs)
+		self._store: CassetteStore = store
+		self._mode: str = mode
+		self._latency: float | str | None = latency
+
+	@property
+	def mode(self) -> str:
+		return self._mode
+
+	def _delay(self, entry: dict[str, any]) -> float:
+		if self._latency == "recorded":
+			return float(entry.get("elapsed", 0.0))
+		return float(self._latency or 0.0)
+
+	def _replay(self, request: PreparedRequest) -> Response:
+		entry: dict[str, any] | None = self._store.load(request)
+		if entry is None:
+			raise CassetteMiss(f"No recorded response for {request.method} {request.url}.", request=request)
+		delay: float = self._delay(entry)
+		if delay > 0:
+			time.sleep(delay)
+		response: Response = Response()
+		response.status_code = entry["status"]
+		response.reason = entry.get("reason")
+		response.headers = CaseInsensitiveDict(entry["headers"])
+		response.encoding = get_encoding_from_headers(response.headers)
+		if "text" in entry:
+			response._content = entry["text"].encode("utf-8")
+		else:
+			response._content = base64.b64decode(entry["body"])
+		response._content_consumed = True
+		response.url = request.url
+		response.request = request
+		response.elapsed = timedelta(seconds=delay)
+		response.connection = self
+		return response
+
+	def send(self, request: PreparedRequest, **kwargs) -> Response:
+		if self._mode == "replay":
+			return self._replay(request)
+		response: Response = super().send(request, **kwargs)
+		self._store.save(request, response)
+		return response
+
+if __name__ == "__main__":
+	raise ValueError("This script is not meant to be run directly.")
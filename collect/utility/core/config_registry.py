@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import os
+import threading
+
+from types import MappingProxyType
+from typing import Callable, Final, Mapping, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+def freeze(value: any) -> any:
+	"""Returns a read-only copy: dicts become mapping proxies and lists tuples."""
+	if isinstance(value, dict):
+		return MappingProxyType({key: freeze(item) for key, item in value.items()})
+	if isinstance(value, list):
+		return tuple(freeze(item) for item in value)
+	return value
+
+def thaw(value: any) -> any:
+	"""Returns a mutable copy of a frozen value."""
+	if isinstance(value, Mapping):
+		return {key: thaw(item) for key, item in value.items()}
+	if isinstance(value, tuple):
+		return [thaw(item) for item in value]
+	return value
+
+def require_keys(name: str, data: any, keys: tuple[str, ...]) -> None:
+	"""Raises a ValueError unless the data is an object holding the keys."""
+	if not isinstance(data, dict):
+		raise ValueError(f"{name} must contain an object.")
+	missing: list[str] = [key for key in keys if key not in data]
+	if missing:
+		raise ValueError(f"{name} is missing {', '.join(missing)}.")
+
+def _require_item_keys(name: str, data: any, keys: tuple[str, ...]) -> None:
+	if not isinstance(data, list):
+		raise ValueError(f"{name} must contain a list.")
+	for index, item in enumerate(data):
+		require_keys(f"{name}[{index}]", item, keys)
+
+# The keys read without a default, checked when each file is loaded.
+_VALIDATORS: Final[dict[str, Callable[[str, any], None]]] = {
+	"config.json": lambda name, data: require_keys(name, data, (
+		"edition", "last-modified", "site-title", "canonical-url", "output-file-name",
+		"output-log-file", "user-agent-name", "user-agent-version", "directory-template",
+		"directory-out", "directory-images", "directory-cache", "directory-config",
+		"display-above-the-fold-header", "display-lead-headline-header"
+	)),
+	"epn-categories.json": lambda name, data: require_keys(name, data, (
+		"default", "above_headline_link", "headline_link"
+	)),
+	"auctions-ebay.json": lambda name, data: _require_item_keys(name, data, (
+		"id", "title", "epn-category", "count", "exclude-from-top"
+	)),
+	"rss-feeds.json": lambda name, data: _require_item_keys(name, data, (
+		"title", "urls", "interval", "filename"
+	))
+}
+
+class _Entry(NamedTuple):
+	mtime_ns: int
+	size: int
+	value: any
+
+class ConfigRegistry:
+	"""The configuration files, loaded once per process.
+
+	Each file is parsed, validated and frozen on first use, and reloaded
+	only when its modification time or size changes, so a long running
+	process picks up edits without re-reading unchanged files.  Other kinds
+	of JSON files, such as the prompts, are parsed by the loaders registered
+	with ``register_loader`` and cached the same way.
+
+	Keyword arguments:
+	* root -- The directory relative paths are resolved against.
+	"""
+	def __init__(self, root: str = "."):
+		self._root: str = root
+		self._lock: threading.Lock = threading.Lock()
+		self._entries: dict[tuple[str, str], _Entry] = {}
+		self._loaders: dict[str, Callable[[str, any], any]] = {}
+		self._env_loaded: bool | None = None
+
+	def _path(self, file_path: str) -> str:
+		return os.path.normpath(os.path.join(self._root, file_path))
+
+	def _load(self, kind: str, file_path: str, parse: Callable[[str, any], any]) -> any:
+		full_path: str = self._path(file_path)
+		stat: os.stat_result = os.stat(full_path)
+		key: tuple[str, str] = (kind, full_path)
+		entry: _Entry | None = self._entries.get(key)
+		if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+			return entry.value
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+				return entry.value
+			with open(full_path, "r", encoding="utf-8") as file:
+				data: any = json.load(file)
+			value: any = parse(file_path, data)
+			self._entries[key] = _Entry(stat.st_mtime_ns, stat.st_size, value)
+			if entry is not None:
+				logger.info(f"Reloaded {file_path}.")
+			return value
+
+	@staticmethod
+	def _parse_json(file_path: str, data: any) -> any:
+		validator: Callable[[str, any], None] | None = _VALIDATORS.get(os.path.basename(file_path))
+		if validator is not None:
+			validator(file_path, data)
+		return freeze(data)
+
+	def json(self, file_path: str) -> any:
+		"""Returns the frozen contents of a JSON configuration file.
+
+		Known files (config.json, epn-categories.json, auctions-ebay.json and
+		rss-feeds.json) are validated and a ValueError is raised when a
+		required key is missing.  Use ``thaw`` for a mutable copy.
+		"""
+		return self._load("json", file_path, ConfigRegistry._parse_json)
+
+	def register_loader(self, kind: str, parse: Callable[[str, any], any]) -> None:
+		"""Registers the parser of a kind of file.
+
+		Keyword arguments:
+		* kind -- The name the files are loaded by, e.g. ``prompt``.
+		* parse -- Called with the file path and the decoded JSON, returns the
+		  value to cache.  Raises a ValueError when the file is invalid.
+		"""
+		if kind == "json":
+			raise ValueError("The json kind is built in.")
+		self._loaders[kind] = parse
+
+	def load(self, kind: str, file_path: str) -> any:
+		"""Returns the file parsed by the loader registered for the kind."""
+		parse: Callable[[str, any], any] | None = self._loaders.get(kind)
+		if parse is None:
+			raise KeyError(f"No loader is registered for {kind}.")
+		return self._load(kind, file_path, parse)
+
+	def load_env(self, file_path: str | None = None) -> bool:
+		"""Loads the .env file into the environment once per process.
+
+		Returns whether the file was found.
+		"""
+		if self._env_loaded is None:
+			with self._lock:
+				if self._env_loaded is None:
+					from dotenv import load_dotenv
+					self._env_loaded = load_dotenv(file_path and self._path(file_path))
+		return self._env_loaded
+
+_registry: ConfigRegistry = ConfigRegistry()
+
+def config_registry() -> ConfigRegistry:
+	"""Returns the process wide configuration registry."""
+	return _registry
+
+if __name__ == "__main__":
+	raise ValueError("This script is not meant to be run directly.")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import os
+import threading
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+FetchFunction = Callable[[str, str], bool]
+
+class DeferredDownloadQueue:
+	"""A capped queue of downloads that are off the critical path.
+
+	Downloads are fetched in background threads once the queue is started.
+	Downloads still pending when the queue is closed are saved to the queue
+	file and fetched on the next run.  Failed downloads are not retried.
+
+	Keyword arguments:
+	* queue_file -- The file the pending downloads are saved to.
+	* max_pending -- The maximum number of pending downloads.  Downloads
+		enqueued while the queue is full are dropped.
+	* max_workers -- The number of concurrent downloads.
+	"""
+	def __init__(self, queue_file: str, max_pending: int = 50, max_workers: int = 2):
+		if max_pending < 1:
+			raise ValueError("max_pending must be at least 1.")
+		self._queue_file: str = queue_file
+		self._max_pending: int = max_pending
+		self._max_workers: int = max_workers
+		self._lock: threading.Lock = threading.Lock()
+		self._pending: dict[str, str] = self._load()
+		self._futures: dict[str, Future] = {}
+		self._executor: ThreadPoolExecutor | None = None
+		self._fetch: FetchFunction | None = None
+
+	def __len__(self) -> int:
+		with self._lock:
+			return len(self._pending)
+
+	def __contains__(self, identifier: str) -> bool:
+		with self._lock:
+			return identifier in self._pending
+
+	def _load(self) -> dict[str, str]:
+		if not os.path.exists(self._queue_file):
+			return {}
+		with open(self._queue_file, "r") as file:
+			try:
+				return dict(json.load(file))
+			except (json.JSONDecodeError, TypeError, ValueError):
+				logger.warning(f"Corrupted download queue: {self._queue_file}")
+				return {}
+
+	def save(self) -> None:
+		"""Saves the pending downloads to the queue file."""
+		with self._lock:
+			pending: dict[str, str] = dict(self._pending)
+		with open(self._queue_file, "w") as file:
+			json.dump(pending, file, indent="\t")
+
+	def start(self, fetch: FetchFunction) -> None:
+		"""Starts fetching the pending downloads in the background.
+
+		``fetch`` receives the identifier and the URL and returns True when
+		the download succeeded.
+		"""
+		with self._lock:
+			self._fetch = fetch
+			if self._executor is None:
+				self._executor = ThreadPoolExecutor(
+					max_workers=self._max_workers, thread_name_prefix="deferred"
+				)
+			pending: list[tuple[str, str]] = list(self._pending.items())
+		for identifier, url in pending:
+			self._submit(identifier, url)
+
+	def enqueue(self, identifier: str, url: str) -> bool:
+		"""Queues the download and returns False if the queue is full."""
+		with self._lock:
+			if identifier not in self._pending:
+				if len(self._pending) >= self._max_pending:
+					logger.info(f"Download queue is full, dropping {identifier}.")
+					return False
+				self._pending[identifier] = url
+		self._submit(identifier, url)
+		return True
+
+	def _submit(self, identifier: str, url: str) -> None:
+		with self._lock:
+			if self._executor is None or identifier in self._futures:
+				return
+			future: Future = self._executor.submit(self._run, identifier, url)
+			self._futures[identifier] = future
+
+	def _run(self, identifier: str, url: str) -> None:
+		try:
+			if not self._fetch(identifier, url):
+				logger.warning(f"Deferred download of {identifier} failed.")
+		except Exception as e:
+			logger.warning(f"Deferred download of {identifier} failed: {e}")
+		# Failed downloads are dropped; they are queued again when needed.
+		with self._lock:
+			self._futures.pop(identifier, None)
+			self._pending.pop(identifier, None)
+
+	def wait(self, timeout: float | None = None) -> None:
+		"""Waits for the running downloads to finish."""
+		with self._lock:
+			futures: list[Future] = list(self._futures.values())
+		for future in futures:
+			future.exception(timeout=timeout)
+
+	def close(self, wait: bool = False) -> None:
+		"""Stops the background downloads and saves the pending ones."""
+		with self._lock:
+			executor: ThreadPoolExecutor | None = self._executor
+			self._executor = None
+		if executor is not None:
+			executor.shutdown(wait=wait, cancel_futures=not wait)
+		self.save()
+
+if __name__ == "__main__":
+	raise ValueError("This script is not meant to be run directly.")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import heapq
+import logging
+import time
+
+from itertools import chain, islice
+from typing import Final, Iterable, Iterator
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from .feed_parser import FeedEntry
+
+logger = logging.getLogger(__name__)
+
+# Query parameters added for tracking, which do not change the article.
+_TRACKING_PARAMS: Final[frozenset[str]] = frozenset({
+	"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid",
+	"ref", "ref_src", "cmpid", "_ga", "_hsenc", "_hsmi"
+})
+
+def canonical_link(link: str) -> str:
+	"""Returns the link without tracking parameters, fragment or trailing
+	slash, with the scheme and host in lower case and the query sorted.
+	"""
+	parts = urlsplit(link.strip())
+	query: list[tuple[str, str]] = sorted(
+		(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+		if not key.lower().startswith("utm_") and key.lower() not in _TRACKING_PARAMS
+	)
+	scheme: str = parts.scheme.lower()
+	if scheme == "http":
+		scheme = "https"
+	path: str = parts.path.rstrip("/") or "/"
+	return urlunsplit((scheme, parts.netloc.lower(), path, urlencode(query), ""))
+
+def identity_keys(item: dict[str, str]) -> tuple[str, ...]:
+	"""Returns the keys identifying a feed item: its guid, if any, and its
+	canonical link.
+	"""
+	link_key: str = "link:" + canonical_link(item["link"])
+	guid: str | None = item.get("guid")
+	if guid:
+		return ("guid:" + guid, link_key)
+	return (link_key,)
+
+def merge_items(new_items: Iterable[dict[str, str]], cached_items: list[dict[str, str]],
+				max_size: int) -> list[dict[str, str]]:
+	"""Merges freshly fetched items in front of the cached ones.
+
+	Items are the same when their guid or canonical link match; the first
+	occurrence is kept, with the ``date-added`` of the item when it was
+	first cached.  Stops once ``max_size`` items were kept.  Runs in time
+	linear in the number of items.
+	"""
+	first_seen: dict[str, str] = {}
+	for item in cached_items:
+		for key in identity_keys(item):
+			first_seen.setdefault(key, item["date-added"])
+
+	merged: list[dict[str, str]] = []
+	taken: set[str] = set()
+	for item in chain(new_items, cached_items):
+		if len(merged) >= max_size:
+			break
+		keys: tuple[str, ...] = identity_keys(item)
+		if any(key in taken for key in keys):
+			continue
+		taken.update(keys)
+		date_added: str | None = next((first_seen[key] for key in keys if key in first_seen), None)
+		if date_added is not None and date_added != item["date-added"]:
+			item = {**item, "date-added": date_added}
+		merged.append(item)
+	return merged
+
+def _dated(entries: Iterable[FeedEntry], now: float) -> Iterator[tuple[float, FeedEntry]]:
+	# Undated entries keep their place in the feed: they take the date of
+	# the entry before them, or the current time at the top of the feed.
+	timestamp: float = now
+	for entry in entries:
+		if entry.published is not None:
+			timestamp = entry.published
+		yield timestamp, entry
+
+def merge_by_date(feeds: Iterable[Iterable[FeedEntry]], max_results: int,
+				  now: float | None = None) -> Iterator[FeedEntry]:
+	"""Merges the entries of several feeds into one stream, newest first.
+
+	Each feed is expected to list its newest entries first, as feeds do, and
+	is read lazily: a heap holds the next entry of every feed, so only about
+	``max_results`` entries are parsed in total however many feeds there
+	are.  Entries with the same date keep the order of the feeds.
+
+	Keyword arguments:
+	* feeds -- The entries of each feed, for example from ``parse_feed``.
+	* max_results -- The number of entries to yield.
+	* now -- The date given to undated entries at the top of a feed.
+	"""
+	if max_results <= 0:
+		return
+	now = time.time() if now is None else now
+	streams: list[Iterator[tuple[float, FeedEntry]]] = [_dated(feed, now) for feed in feeds]
+	merged: Iterator[tuple[float, FeedEntry]] = heapq.merge(
+		*streams, key=lambda dated: dated[0], reverse=True
+	)
+	for _, entry in islice(merged, max_results):
+		yield entry
+
+if __name__ == "__main__":
+	raise ValueError("This script is not meant to be run directly.")
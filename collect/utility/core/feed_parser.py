@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+
+import xml.etree.ElementTree as ElementTree
+from xml.etree.ElementTree import Element
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Final, Iterable, Iterator, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# RSS 2.0 and RSS 1.0 use <item>, Atom uses <entry>.
+_ENTRY_TAGS: Final[frozenset[str]] = frozenset({"item", "entry"})
+
+# Date elements by preference: the publication date wins over the update date.
+_DATE_TAGS: Final[dict[str, int]] = {"pubDate": 0, "published": 0, "date": 1, "issued": 1, "updated": 2}
+
+class FeedEntry(NamedTuple):
+	title: str
+	link: str
+	guid: str | None
+	published: float | None = None
+
+@dataclass
+class FeedChannel:
+	"""The refresh hints a feed gives about itself.
+
+	* ttl -- The number of seconds the feed may be cached, from ``<ttl>``.
+	* skip_hours -- The GMT hours in which the feed should not be read, from ``<skipHours>``.
+	"""
+	ttl: float | None = None
+	skip_hours: frozenset[int] = field(default_factory=frozenset)
+
+def _local_name(tag: str) -> str:
+	return tag.rsplit("}", 1)[-1]
+
+def _text(element: Element) -> str:
+	return (element.text or "").strip()
+
+def parse_timestamp(text: str) -> float | None:
+	"""Returns the POSIX timestamp of an RFC 822 (RSS) or ISO 8601 (Atom)
+	date, or None if the date cannot be read.  Dates without a time zone are
+	taken as UTC.
+	"""
+	text = text.strip()
+	if not text:
+		return None
+	value: datetime
+	try:
+		value = parsedate_to_datetime(text)
+	except (TypeError, ValueError, IndexError):
+		try:
+			value = datetime.fromisoformat(text)
+		except ValueError:
+			return None
+	if value.tzinfo is None:
+		value = value.replace(tzinfo=timezone.utc)
+	return value.timestamp()
+
+def _entry(element: Element) -> FeedEntry | None:
+	title: str | None = None
+	link: str | None = None
+	guid: str | None = None
+	published: float | None = None
+	date_rank: int = len(_DATE_TAGS)
+	for child in element:
+		name: str = _local_name(child.tag)
+		if name == "title" and title is None:
+			title = _text(child)
+		elif name == "link" and link is None:
+			href: str | None = child.get("href")
+			if href is None:
+				link = _text(child) or None
+			elif child.get("rel", "alternate") == "alternate":
+				link = href.strip() or None
+		elif name in ("guid", "id") and guid is None:
+			guid = _text(child) or None
+		elif _DATE_TAGS.get(name, date_rank) < date_rank:
+			timestamp: float | None = parse_timestamp(_text(child))
+			if timestamp is not None:
+				published, date_rank = timestamp, _DATE_TAGS[name]
+	if link is None and guid and guid.startswith(("http://", "https://")):
+		link = guid
+	if not link:
+		return None
+	return FeedEntry(title or "", link, guid, published)
+
+def _read_channel(element: Element, channel: FeedChannel) -> None:
+	name: str = _local_name(element.tag)
+	if name == "ttl":
+		try:
+			channel.ttl = max(0.0, float(_text(element)) * 60.0)
+		except ValueError:
+			pass
+	elif name == "skipHours":
+		hours: set[int] = set()
+		for child in element:
+			if _local_name(child.tag) == "hour" and _text(child).isdigit():
+				hours.add(int(_text(child)) % 24)
+		channel.skip_hours = frozenset(hours)
+
+def parse_feed(chunks: Iterable[bytes], max_results: int | None = None,
+			   channel: FeedChannel | None = None) -> Iterator[FeedEntry]:
+	"""Parses the entries of an RSS or Atom feed as the chunks arrive.
+
+	Each entry is yielded as soon as its closing tag was read and is then
+	removed from the tree, so memory use does not grow with the feed.
+	Reading stops after ``max_results`` entries; the caller closes the
+	response to drop the rest of the body.  Entries without a link are
+	skipped.
+
+	Keyword arguments:
+	* chunks -- The body of the feed, for example ``response.iter_content()``.
+	* max_results -- The number of entries to read, or None for all.
+	* channel -- Filled with the ``<ttl>`` and ``<skipHours>`` of an RSS
+	  channel read so far; feeds put them before their items.
+	"""
+	if max_results is not None and max_results <= 0:
+		return
+	parser: ElementTree.XMLPullParser = ElementTree.XMLPullParser(events=("start", "end"))
+	stack: list[Element] = []
+	count: int = 0
+	for chunk in chunks:
+		parser.feed(chunk)
+		for event, element in parser.read_events():
+			if event == "start":
+				stack.append(element)
+				continue
+			stack.pop()
+			if _local_name(element.tag) not in _ENTRY_TAGS:
+				if channel is not None and stack and _local_name(stack[-1].tag) == "channel":
+					_read_channel(element, channel)
+				continue
+			entry: FeedEntry | None = _entry(element)
+			element.clear()
+			if stack:
+				stack[-1].remove(element)
+			if entry is None:
+				continue
+			yield entry
+			count += 1
+			if max_results is not None and count >= max_results:
+				return
+
+if __name__ == "__main__":
+	raise ValueError("This script is not meant to be run directly.")
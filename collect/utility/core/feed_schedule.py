@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+import re
+import time
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Final, Iterable
+
+logger = logging.getLogger(__name__)
+
+_MAX_PUBLISHED: Final[int] = 20
+_MAX_HISTORY: Final[int] = 10
+# Each refresh in a row without new entries stretches the interval by this
+# factor, up to _MAX_BACKOFF times.
+_BACKOFF: Final[float] = 1.5
+_MAX_BACKOFF: Final[float] = 8.0
+_MAX_AGE: Final[re.Pattern] = re.compile(r"(?:^|,)\s*max-age\s*=\s*\"?(\d+)", re.IGNORECASE)
+
+def cache_control_max_age(value: str | None) -> float | None:
+	"""Returns the max-age of a Cache-Control header, or None if it has none."""
+	if not value or "no-store" in value.lower():
+		return None
+	match: re.Match | None = _MAX_AGE.search(value)
+	return float(match.group(1)) if match else None
+
+@dataclass
+class FeedSchedule:
+	"""When to read a feed next, learned from the feed itself.
+
+	The interval follows the rate at which entries were published: the mean
+	gap between the recent publication dates, halved so a new entry waits
+	on average a quarter of a gap.  Refreshes in a row that brought nothing
+	new back the interval off.  The ``<ttl>`` and Cache-Control max-age of
+	the feed are lower limits, the result is kept within the configured
+	bounds, and a refresh due in one of the ``<skipHours>`` is moved to the
+	end of it.
+
+	Keyword arguments:
+	* published -- The recent publication dates, oldest first.
+	* history -- Whether each recent refresh brought new entries, oldest first.
+	* ttl -- The ``<ttl>`` of the feed in seconds.
+	* max_age -- The Cache-Control max-age of the last response.
+	* skip_hours -- The GMT hours in which the feed is not read.
+	* last_refresh -- The POSIX time the feed was last read.
+	"""
+	published: list[float] = field(default_factory=list)
+	history: list[bool] = field(default_factory=list)
+	ttl: float | None = None
+	max_age: float | None = None
+	skip_hours: list[int] = field(default_factory=list)
+	last_refresh: float | None = None
+
+	def record(self, published: Iterable[float | None], hit: bool,
+			   ttl: float | None = None, max_age: float | None = None,
+			   skip_hours: Iterable[int] = (), now: float | None = None) -> None:
+		"""Records a refresh of the feed.
+
+		Keyword arguments:
+		* published -- The publication dates of the entries read.
+		* hit -- Whether the refresh brought entries not seen before.
+		* ttl, max_age, skip_hours -- The hints of the response.
+		* now -- The time of the refresh, the current time by default.
+		"""
+		dates: set[float] = set(self.published)
+		dates.update(date for date in published if date is not None)
+		self.published = sorted(dates)[-_MAX_PUBLISHED:]
+		self.history = (self.history + [hit])[-_MAX_HISTORY:]
+		self.ttl = ttl
+		self.max_age = max_age
+		self.skip_hours = sorted(set(skip_hours))
+		self.last_refresh = time.time() if now is None else now
+
+	def _misses(self) -> int:
+		count: int = 0
+		for hit in reversed(self.history):
+			if hit:
+				break
+			count += 1
+		return count
+
+	def interval(self, default: float, min_interval: float, max_interval: float) -> float:
+		"""Returns the number of seconds to wait after a refresh.
+
+		Keyword arguments:
+		* default -- The interval used until two publication dates are known.
+		* min_interval -- The shortest interval.
+		* max_interval -- The longest interval.
+		"""
+		interval: float = default
+		if len(self.published) >= 2:
+			span: float = self.published[-1] - self.published[0]
+			interval = span / (len(self.published) - 1) / 2.0
+		interval *= min(_MAX_BACKOFF, _BACKOFF ** self._misses())
+		for limit in (self.ttl, self.max_age):
+			if limit is not None:
+				interval = max(interval, limit)
+		return min(max(interval, min_interval), max_interval)
+
+	def next_refresh(self, last_refresh: float, default: float,
+					 min_interval: float, max_interval: float) -> float:
+		"""Returns the POSIX time of the next refresh after ``last_refresh``."""
+		due: float = last_refresh + self.interval(default, min_interval, max_interval)
+		skip: set[int] = set(self.skip_hours)
+		if skip and len(skip) < 24:
+			latest: float = last_refresh + max_interval
+			while due < latest and datetime.fromtimestamp(due, timezone.utc).hour in skip:
+				due = (due // 3600 + 1) * 3600
+			due = min(due, latest)
+		return due
+
+	def to_dict(self) -> dict[str, any]:
+		return {
+			"published": self.published,
+			"history": self.history,
+			"ttl": self.ttl,
+			"max-age": self.max_age,
+			"skip-hours": self.skip_hours,
+			"last-refresh": self.last_refresh
+		}
+
+	@staticmethod
+	def from_dict(data: dict[str, any]) -> "FeedSchedule":
+		return FeedSchedule(
+			published=list(data.get("published", [])),
+			history=list(data.get("history", [])),
+			ttl=data.get("ttl"),
+			max_age=data.get("max-age"),
+			skip_hours=list(data.get("skip-hours", [])),
+			last_refresh=data.get("last-refresh")
+		)
+
+if __name__ == "__main__":
+	raise ValueError("This script is not meant to be run directly.")
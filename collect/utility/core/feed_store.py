@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import os
+
+from typing import Generator
+
+from .rss_tool import RssTool
+
+logger = logging.getLogger(__name__)
+
+class FeedStore:
+	"""The state of every feed group, kept in one file.
+
+	The file is read once, when the store is created, and each group's
+	RssTool works on its state in memory.  ``save`` writes the file again
+	only when a group changed, in one atomic replace; the groups that did
+	not change are written from their encoded form of the last save, so
+	only the changed ones are encoded again.
+
+	Groups are identified by the ``filename`` of their entry in
+	``rss-feeds.json``.  The RssTool of a group is created again when its
+	entry changes, and reads the stored state of the group.  A group missing from the store is read once from
+	its legacy ``rss_*.json`` file in the cache directory, which is removed
+	after the store was saved.
+
+	Keyword arguments:
+	* file_path -- The file holding the state of every group.
+	* user_agent -- The user agent sent with the feed requests.
+	* legacy_directory -- The directory of the per group files to migrate.
+	* options -- Further RssTool arguments (endpoint, min_interval, ...).
+	"""
+	def __init__(self, file_path: str, user_agent: str,
+				 legacy_directory: str | None = None, **options: any):
+		self._file_path: str = file_path
+		self._user_agent: str = user_agent
+		self._legacy_directory: str | None = legacy_directory
+		self._options: dict[str, any] = options
+		self._states: dict[str, dict[str, any]] = {}
+		self._encoded: dict[str, str] = {}
+		self._changed: set[str] = set()
+		self._migrated: list[str] = []
+		self._tools: dict[str, RssTool] = {}
+		self._entries: dict[str, tuple] = {}
+		self._load()
+
+	def _load(self) -> None:
+		if not os.path.exists(self._file_path):
+			return
+		try:
+			with open(self._file_path, "r", encoding="utf-8") as file:
+				data: dict[str, any] = json.load(file)
+		except (OSError, ValueError) as e:
+			logger.error(f"Could not read {self._file_path}, starting empty: {e}")
+			return
+		self._states = data.get("groups", {})
+
+	def _legacy_state(self, name: str) -> dict[str, any] | None:
+		if not self._legacy_directory:
+			return None
+		legacy_path: str = os.path.join(self._legacy_directory, name)
+		if not os.path.exists(legacy_path):
+			return None
+		try:
+			with open(legacy_path, "r") as file:
+				state: dict[str, any] = json.load(file)
+		except (OSError, ValueError) as e:
+			logger.warning(f"Could not migrate {legacy_path}: {e}")
+			return None
+		self._migrated.append(legacy_path)
+		self._changed.add(name)
+		logger.info(f"Migrating {legacy_path} into {self._file_path}.")
+		return state
+
+	def state(self, name: str) -> dict[str, any]:
+		"""Returns the stored state of the group, or an empty state."""
+		state: dict[str, any] | None = self._states.get(name)
+		if state is None:
+			state = self._legacy_state(name) or {}
+			self._states[name] = state
+		return state
+
+	def update(self, name: str, state: dict[str, any]) -> None:
+		"""Replaces the state of the group, to be written by the next ``save``."""
+		self._states[name] = state
+		self._encoded.pop(name, None)
+		self._changed.add(name)
+
+	@property
+	def changed(self) -> bool:
+		return bool(self._changed)
+
+	def group(self, title: str, urls: list[str], interval: int, filename: str,
+			  max_results: int = 10) -> RssTool:
+		"""Returns the RssTool for a feed group, created on first use and
+		whenever the entry of the group changes.
+		"""
+		entry: tuple = (title, tuple(urls), interval, max_results)
+		tool: RssTool | None = self._tools.get(filename)
+		if tool is None or self._entries.get(filename) != entry:
+			if tool is not None:
+				logger.info(f"The feed group {title} changed, reading it with the new settings.")
+			tool = RssTool(
+				self._user_agent, urls=list(urls), cache_duration=interval,
+				max_results=max_results, cache_file=filename, store=self,
+				**self._options
+			)
+			self._tools[filename] = tool
+			self._entries[filename] = entry
+		return tool
+
+	def fetch(self, title: str, urls: list[str], interval: int, filename: str,
+			  max_results: int = 10) -> Generator[dict[str, str], None, None]:
+		"""Refreshes the group if it is stale and yields its items."""
+		return self.group(title, urls, interval, filename, max_results).fetch()
+
+	def refresh(self, filename: str) -> bool:
+		"""Refreshes a group created with ``group`` and saves the store.
+
+		Returns True if the group produced new items.
+		"""
+		try:
+			return self._tools[filename].refresh()
+		finally:
+			self.save()
+
+	def _encode(self, name: str) -> str:
+		encoded: str | None = self._encoded.get(name)
+		if encoded is None:
+			encoded = json.dumps(name) + ":" + json.dumps(self._states[name], separators=(",", ":"))
+			self._encoded[name] = encoded
+		return encoded
+
+	def save(self) -> bool:
+		"""Writes the store if a group changed and returns whether it did."""
+		if not self._changed:
+			return False
+		content: str = '{"groups":{' + ",".join(self._encode(name) for name in self._states) + "}}"
+		directory: str = os.path.dirname(self._file_path)
+		if directory:
+			os.makedirs(directory, exist_ok=True)
+		temp_file: str = self._file_path + ".tmp"
+		with open(temp_file, "w", encoding="utf-8") as file:
+			file.write(content)
+		os.replace(temp_file, self._file_path)
+		logger.debug(f"Saved {len(self._changed)} of {len(self._states)} feed groups.")
+		self._changed.clear()
+		for legacy_path in self._migrated:
+			try:
+				os.remove(legacy_path)
+			except OSError as e:
+				logger.warning(f"Could not remove {legacy_path}: {e}")
+		self._migrated.clear()
+		return True
+
+if __name__ == "__main__":
+	raise ValueError("This script is not meant to be run directly.")
@@ -3,11 +3,14 @@
 
 import os
 import platform
-import requests
 import logging
 
-from requests.models import Request, Response
-from typing import Final
+from typing import Final, TYPE_CHECKING
+from urllib.parse import urlsplit, urlunsplit
+from .http_session import shared_session
+
+if TYPE_CHECKING:
+	from requests.models import Request, Response
 
 logger = logging.getLogger(__name__)
 
@@ -19,11 +22,14 @@ class FetchBot:
 			self,
 			url: str,
 			cache_directory: str | None = None,
-			user_agent: str | None = "HobbyBot/1.0"
+			user_agent: str | None = "HobbyBot/1.0",
+			endpoint: str | None = None
 		):
 		self._user_agent = user_agent
 		self._url: str = url
+		self._endpoint: str | None = endpoint
 		self._cache_directory: str = cache_directory or "cache"
+		from requests.models import Request
 		self._request: Request = Request()
 		
 		# Set the no_proxy environment variable for macOS.
@@ -31,6 +37,17 @@ class FetchBot:
 		if str.lower(platform.system()) == "darwin":
 			os.environ["no_proxy"] = "*"
 	
+	@staticmethod
+	def endpoint_url(url: str, endpoint: str | None) -> str:
+		"""Return the URL with its scheme and host replaced by the endpoint's,
+		which points the request at a local stand-in server.
+		"""
+		if not endpoint:
+			return url
+		target = urlsplit(endpoint)
+		parts = urlsplit(url)
+		return urlunsplit((target.scheme, target.netloc, parts.path, parts.query, parts.fragment))
+
 	@property
 	def request_headers(self) -> dict[str, str]:
 		"""Return the headers for the request."""
@@ -38,20 +55,24 @@ class FetchBot:
 				"User-Agent": self._user_agent
 			}
 
-	def get(self, url: str | None = None) -> Response:
-		"""Send a GET request to the given URL."""
+	def get(self, url: str | None = None, stream: bool = False) -> "Response":
+		"""Send a GET request to the given URL.
+
+		With ``stream`` the body is read as it is consumed, and the caller
+		closes the response.
+		"""
 		self._request.method = "GET"
-		_request_url: str = url or self._url
+		_request_url: str = FetchBot.endpoint_url(url or self._url, self._endpoint)
 		self._request.url = _request_url
 		self._request.headers = self.request_headers
-		_response: Response = requests.get(
-			self._request.url, headers=self._request.headers
+		_response: Response = shared_session().get(
+			self._request.url, headers=self._request.headers, stream=stream
 		)
 		return _response
 
-	def fetch(self) -> Response:
+	def fetch(self, stream: bool = False) -> "Response":
 		"""Fetch data from the given URL."""
-		return self.get()
+		return self.get(stream=stream)
 
 if __name__ == "__main__":
 	raise ValueError("This script is not meant to be run directly.")
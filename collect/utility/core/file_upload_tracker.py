@@ -5,73 +5,182 @@ import os
 import hashlib
 import json
 import logging
+from datetime import datetime, timezone, timedelta
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Final, Iterable, NamedTuple
 
 logger = logging.getLogger(__name__)
 
+class FileDigests(NamedTuple):
+	"""The digests of a file and the modification time it had when it was read."""
+	sha256: str
+	md5: str
+	size: int
+	mtime_ns: int
+
 class FileUploadTracker:
+	"""The upload manifest.
+
+	Entries are keyed by the bucket object key and store the size, the
+	modification time in nanoseconds, the SHA-256 hash and the upload time of
+	the file.  A file is only read and hashed when its size or modification
+	time differ from the manifest entry.  The MD5 digest, which S3 reports as
+	the ETag of single part uploads, is computed in the same pass.
+	"""
+	_CHUNK_SIZE: Final[int] = 1024 * 1024
+	_KEY_SIZE: Final[str] = "size"
+	_KEY_MTIME: Final[str] = "mtime_ns"
+	_KEY_HASH: Final[str] = "sha256"
+	_KEY_MD5: Final[str] = "md5"
+	_KEY_UPLOADED: Final[str] = "uploaded_at"
+
 	def __init__(self, cache_dir: str):
 		self.cache_dir: Path = Path(cache_dir)
 		self.cache_file: Path = self.cache_dir / "upload_cache.json"
-		self.uploaded_files = self._load_cache()
+		self.uploaded_files: Dict[str, Dict[str, any]] = self._load_cache()
+
+	@staticmethod
+	def _key(file_path: str, key: str | None) -> str:
+		return key or Path(file_path).name
 
-	def _load_cache(self) -> Dict[str, str]:
-		"""Load the cache of uploaded file hashes from the cache file."""
+	def _load_cache(self) -> Dict[str, Dict[str, any]]:
+		"""Load the manifest from the cache file."""
 		if not self.cache_file.exists():
 			return {}
-		
+
 		with open(self.cache_file, 'r') as f:
 			try:
-				return json.load(f)
+				data: dict[str, any] = json.load(f)
 			except json.JSONDecodeError:
 				logging.error(f"Error loading cache file: {self.cache_file}")
 				logging.error("Creating a new empty cache file.")
 				return {}
 
+		# Entries written before the manifest held only the hash of the file.
+		return {
+			key: value if isinstance(value, dict) else {FileUploadTracker._KEY_HASH: value}
+			for key, value in data.items()
+		}
+
 	def _save_cache(self):
-		"""Save the current cache of uploaded file hashes to the cache file."""
+		"""Save the manifest to the cache file."""
 		with open(self.cache_file, 'w') as f:
 			json.dump(self.uploaded_files, f, indent="\t")
 
+	def save(self):
+		"""Save the manifest. Use after marking files with ``save=False``."""
+		self._save_cache()
+
+	def _digest_file(self, file_path: str) -> FileDigests:
+		"""Generate the SHA-256 and MD5 digests of the file in one pass."""
+		sha256 = hashlib.sha256()
+		md5 = hashlib.md5(usedforsecurity=False)
+		size: int = 0
+		with open(file_path, 'rb') as f:
+			# Taken before reading, so a change made while the file is read
+			# does not match the manifest entry.
+			mtime_ns: int = os.fstat(f.fileno()).st_mtime_ns
+			for chunk in iter(lambda: f.read(FileUploadTracker._CHUNK_SIZE), b''):
+				sha256.update(chunk)
+				md5.update(chunk)
+				size += len(chunk)
+		return FileDigests(sha256.hexdigest(), md5.hexdigest(), size, mtime_ns)
+
 	def _hash_file(self, file_path: str) -> str:
 		"""Generate a hash for the given file using SHA-256."""
-		hasher = hashlib.sha256()
-		with open(file_path, 'rb') as f:
-			for chunk in iter(lambda: f.read(4096), b''):
-				hasher.update(chunk)
-		return hasher.hexdigest()
+		return self._digest_file(file_path).sha256
 
-	def has_changed(self, file_path: str) -> bool:
-		"""Check if the file has changed since it was last uploaded."""
-		if not os.path.exists(file_path):
-			raise FileNotFoundError(f"File not found: {file_path}")
-			
-		file_hash = self._hash_file(file_path)
-		file_name = Path(file_path).name
-		previous_hash = self.uploaded_files.get(file_name)
-		
-		# Return True if the file is not in the cache or the hash has changed
-		return previous_hash != file_hash
-
-	def is_uploaded(self, file_path: str) -> bool:
-		"""Check if the file has already been uploaded based on its name and hash."""
+	def _stat_matches(self, entry: Dict[str, any] | None, stat: os.stat_result) -> bool:
+		return bool(entry) \
+			and entry.get(FileUploadTracker._KEY_SIZE) == stat.st_size \
+			and entry.get(FileUploadTracker._KEY_MTIME) == stat.st_mtime_ns \
+			and FileUploadTracker._KEY_MD5 in entry
+
+	def file_digests(self, file_path: str, key: str | None = None) -> FileDigests:
+		"""Return the digests of the file, reusing the manifest entry when the
+		file size and modification time are unchanged.
+		"""
 		if not os.path.exists(file_path):
 			raise FileNotFoundError(f"File not found: {file_path}")
-		file_name = Path(file_path).name
-		file_hash = self._hash_file(file_path)
-		return self.uploaded_files.get(file_name) == file_hash
-
-	def mark_as_uploaded(self, file_path: str):
-		"""Mark the file as uploaded by saving its name and hash in the cache."""
-		file_name = Path(file_path).name
-		file_hash = self._hash_file(file_path)
-		self.uploaded_files[file_name] = file_hash
-		self._save_cache()
+		entry: Dict[str, any] | None = self.uploaded_files.get(FileUploadTracker._key(file_path, key))
+		if self._stat_matches(entry, os.stat(file_path)):
+			return FileDigests(
+				entry[FileUploadTracker._KEY_HASH],
+				entry[FileUploadTracker._KEY_MD5],
+				entry[FileUploadTracker._KEY_SIZE],
+				entry[FileUploadTracker._KEY_MTIME]
+			)
+		return self._digest_file(file_path)
+
+	def hash_file(self, file_path: str, key: str | None = None) -> str:
+		"""Return the SHA-256 hash of the file."""
+		return self.file_digests(file_path, key).sha256
+
+	def has_changed_hash(self, key: str, file_hash: str) -> bool:
+		"""Check if a file with the given hash differs from the last upload to the key."""
+		entry: Dict[str, any] | None = self.uploaded_files.get(key)
+		return not entry or entry.get(FileUploadTracker._KEY_HASH) != file_hash
+
+	def has_changed(self, file_path: str, key: str | None = None) -> bool:
+		"""Check if the file has changed since it was last uploaded."""
+		key = FileUploadTracker._key(file_path, key)
+		return self.has_changed_hash(key, self.hash_file(file_path, key))
+
+	def is_uploaded(self, file_path: str, key: str | None = None) -> bool:
+		"""Check if the file has already been uploaded to the key."""
+		return not self.has_changed(file_path, key)
 
-	def cleanup_cache(self):
-		"""Optional: Clean up the cache file if needed to free up space."""
-		raise NotImplementedError("Cleanup logic is not implemented.")
+	def mark_as_uploaded(self, file_path: str, key: str | None = None,
+						 digests: FileDigests | None = None, save: bool = True):
+		"""Record the upload of the file to the key.
+
+		Pass the digests the upload was decided on, from ``file_digests``, to
+		avoid hashing the file again; they carry the size and modification
+		time the file had when it was hashed.  Pass ``save=False`` to defer
+		writing the manifest.
+		"""
+		key = FileUploadTracker._key(file_path, key)
+		if digests is None:
+			digests = self._digest_file(file_path)
+		self.uploaded_files[key] = {
+			FileUploadTracker._KEY_SIZE: digests.size,
+			FileUploadTracker._KEY_MTIME: digests.mtime_ns,
+			FileUploadTracker._KEY_HASH: digests.sha256,
+			FileUploadTracker._KEY_MD5: digests.md5,
+			FileUploadTracker._KEY_UPLOADED: datetime.now(timezone.utc).isoformat()
+		}
+		if save:
+			self._save_cache()
+
+	def prune(self, live_keys: Iterable[str], prefix: str = "",
+			  max_age_days: int | None = None, save: bool = True) -> int:
+		"""Remove the entries below ``prefix`` whose files no longer exist.
+
+		An entry is removed when its key is not in ``live_keys`` and, if
+		``max_age_days`` is given, it was uploaded more than that many days
+		ago.  Returns the number of removed entries.
+		"""
+		live: set[str] = set(live_keys)
+		cutoff: datetime | None = None
+		if max_age_days is not None:
+			cutoff = datetime.now(timezone.utc) - timedelta(days=max_age_days)
+
+		def expired(entry: Dict[str, any]) -> bool:
+			if cutoff is None:
+				return True
+			uploaded_at: str | None = entry.get(FileUploadTracker._KEY_UPLOADED)
+			return not uploaded_at or datetime.fromisoformat(uploaded_at) < cutoff
+
+		stale: list[str] = [
+			key for key, entry in self.uploaded_files.items()
+			if key.startswith(prefix) and key not in live and expired(entry)
+		]
+		for key in stale:
+			del self.uploaded_files[key]
+		if stale and save:
+			self._save_cache()
+		logger.info(f"Pruned {len(stale)} upload manifest entries.")
+		return len(stale)
 
 if __name__ == "__main__":
 	import sys
@@ -79,9 +188,9 @@ if __name__ == "__main__":
 	def _test():
 		cache_dir = "cache"
 		tracker = FileUploadTracker(cache_dir)
-		
+
 		test_file = "httpd/style.css"
-		
+
 		if tracker.has_changed(test_file):
 			print("File has already been uploaded.")
 			tracker.mark_as_uploaded(test_file)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+
+from typing import TYPE_CHECKING
+
+from .offline import is_offline
+
+if TYPE_CHECKING:
+	from requests import Session
+	from requests.adapters import BaseAdapter
+
+logger = logging.getLogger(__name__)
+
+_session: "Session | None" = None
+_session_lock: threading.Lock = threading.Lock()
+_transport: "BaseAdapter | None" = None
+
+def _offline_adapter() -> "BaseAdapter":
+	from .offline_adapter import OfflineAdapter
+	return OfflineAdapter()
+
+def shared_session() -> "Session":
+	"""Return the process wide requests session.
+
+	Reusing one session keeps the connection pools alive between requests,
+	which matters when the application runs as a long lived daemon.
+	While offline, every request made through the session fails.  requests
+	is imported here, so runs served from the caches never import it.
+	"""
+	global _session
+	if _session is None:
+		with _session_lock:
+			if _session is None:
+				from requests import Session
+				from requests.adapters import HTTPAdapter
+				session: Session = Session()
+				adapter: BaseAdapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+				if is_offline():
+					adapter = _offline_adapter()
+				elif _transport is not None:
+					adapter = _transport
+				session.mount("http://", adapter)
+				session.mount("https://", adapter)
+				_session = session
+	return _session
+
+def set_transport(adapter: "BaseAdapter | None") -> None:
+	"""Routes the requests of the shared session, and of the sessions passed
+	to ``mount_transport``, through the adapter.  Used to record and
+	replay the network traffic of a run.
+	"""
+	global _transport
+	with _session_lock:
+		_transport = adapter
+		if _session is not None and adapter is not None:
+			_session.mount("http://", adapter)
+			_session.mount("https://", adapter)
+
+def mount_transport(session: any) -> None:
+	"""Mounts the transport adapter, if any, on a session owned by another client."""
+	adapter: BaseAdapter | None = _offline_adapter() if is_offline() else _transport
+	if adapter is not None:
+		session.mount("http://", adapter)
+		session.mount("https://", adapter)
+
+def close_shared_session() -> None:
+	"""Close the process wide session and release its connection pools."""
+	global _session
+	with _session_lock:
+		if _session is not None:
+			_session.close()
+			_session = None
+
+if __name__ == "__main__":
+	raise ValueError("This script is not meant to be run directly.")
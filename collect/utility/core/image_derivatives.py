@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import threading
+
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+class ImageVariant(NamedTuple):
+	path: str
+	width: int
+	height: int
+	mime_type: str
+
+class ResponsiveImage(NamedTuple):
+	"""The derivatives of one source image, smallest first."""
+	variants: tuple[ImageVariant, ...]
+
+	def _srcset(self, mime_type: str, base_url: str) -> str:
+		return ", ".join(
+			f"{base_url}{variant.path} {variant.width}w"
+			for variant in self.variants if variant.mime_type == mime_type
+		)
+
+	def webp_srcset(self, base_url: str = "") -> str:
+		return self._srcset("image/webp", base_url)
+
+	def jpeg_srcset(self, base_url: str = "") -> str:
+		return self._srcset("image/jpeg", base_url)
+
+	def fallback(self, preferred_width: int) -> ImageVariant:
+		"""Returns the JPEG closest to, but not wider than, the preferred width."""
+		jpegs: list[ImageVariant] = [v for v in self.variants if v.mime_type == "image/jpeg"]
+		fitting: list[ImageVariant] = [v for v in jpegs if v.width <= preferred_width]
+		return fitting[-1] if fitting else jpegs[0]
+
+_FORMATS: dict[str, tuple[str, str]] = {
+	"webp": ("WEBP", "image/webp"),
+	"jpeg": ("JPEG", "image/jpeg")
+}
+
+def _render_derivatives(source_path: str, output_dir: str, prefix: str,
+						name: str, widths: tuple[int, ...],
+						formats: tuple[str, ...], quality: int) -> list[ImageVariant]:
+	"""Resizes the source image to each width and format.
+
+	Runs in a worker process.  Widths larger than the source are replaced by
+	the source width, so images are never upscaled.
+	"""
+	from PIL import Image
+
+	variants: list[ImageVariant] = []
+	with Image.open(source_path) as image:
+		image = image.convert("RGB")
+		source_width, source_height = image.size
+		targets: list[int] = sorted({min(width, source_width) for width in widths})
+		for width in targets:
+			height: int = max(1, round(source_height * width / source_width))
+			resized = image if width == source_width else image.resize((width, height), Image.LANCZOS)
+			for extension in formats:
+				pil_format, mime_type = _FORMATS[extension]
+				filename: str = f"w{width}-{name}.{extension}"
+				resized.save(
+					os.path.join(output_dir, filename), pil_format,
+					quality=quality, optimize=True
+				)
+				variants.append(ImageVariant(prefix + filename, width, height, mime_type))
+	return variants
+
+class ImageDerivativePipeline:
+	"""Generates resized WebP and JPEG derivatives of images in a process pool.
+
+	Derivatives are named after the hash of the source image and listed in an
+	index file, so a source image is only processed once.  The file names
+	carry the hash, which makes them safe to cache forever.
+
+	Pillow is an optional dependency; use ``available()`` before creating a
+	pipeline.
+
+	Keyword arguments:
+	* output_dir -- The directory the derivatives are written to.
+	* url_prefix -- The site relative path of ``output_dir``, e.g. ``i/d/``.
+	* widths -- The widths to generate.
+	* formats -- The formats to generate, ``webp`` and ``jpeg``.
+	* quality -- The encoder quality.
+	* max_workers -- The number of worker processes.
+	"""
+	def __init__(self, output_dir: str, url_prefix: str = "i/d/",
+				 widths: tuple[int, ...] = (200, 400, 800),
+				 formats: tuple[str, ...] = ("webp", "jpeg"),
+				 quality: int = 80, max_workers: int | None = None,
+				 executor: Executor | None = None):
+		if not widths:
+			raise ValueError("At least one width is required.")
+		for extension in formats:
+			if extension not in _FORMATS:
+				raise ValueError(f"Unsupported format: {extension}")
+		if "jpeg" not in formats:
+			raise ValueError("The jpeg format is required as a fallback.")
+		os.makedirs(output_dir, exist_ok=True)
+		self._output_dir: str = output_dir
+		self._url_prefix: str = url_prefix
+		self._widths: tuple[int, ...] = tuple(widths)
+		self._formats: tuple[str, ...] = tuple(formats)
+		self._quality: int = quality
+		self._max_workers: int | None = max_workers
+		self._executor: Executor | None = executor
+		self._index_file: str = os.path.join(output_dir, "index.json")
+		self._index: dict[str, list[list]] = self._load_index()
+		# The index is updated and written from the done callbacks of the jobs,
+		# which run on the threads of the executor.
+		self._index_lock: threading.Lock = threading.Lock()
+
+	@staticmethod
+	def available() -> bool:
+		"""Returns True if Pillow is installed."""
+		return importlib.util.find_spec("PIL") is not None
+
+	@property
+	def output_dir(self) -> str:
+		return self._output_dir
+
+	def _load_index(self) -> dict[str, list[list]]:
+		if not os.path.exists(self._index_file):
+			return {}
+		with open(self._index_file, "r") as file:
+			try:
+				return json.load(file)
+			except json.JSONDecodeError:
+				logger.warning(f"Corrupted derivative index: {self._index_file}")
+				return {}
+
+	def _save_index(self) -> None:
+		"""Writes the index.  Call with ``_index_lock`` held."""
+		temp_file: str = self._index_file + ".tmp"
+		with open(temp_file, "w") as file:
+			json.dump(self._index, file)
+		os.replace(temp_file, self._index_file)
+
+	def _index_key(self, source_hash: str) -> str:
+		return ":".join((source_hash, ",".join(map(str, self._widths)),
+						 ",".join(self._formats), str(self._quality)))
+
+	def _cached(self, key: str) -> ResponsiveImage | None:
+		entry: list[list] | None = self._index.get(key)
+		if not entry:
+			return None
+		variants: tuple[ImageVariant, ...] = tuple(ImageVariant(*variant) for variant in entry)
+		if not all(os.path.exists(self.local_path(v)) for v in variants):
+			return None
+		return ResponsiveImage(variants)
+
+	def local_path(self, variant: ImageVariant) -> str:
+		"""Returns the path of the derivative on disk."""
+		return os.path.join(self._output_dir, variant.path[len(self._url_prefix):])
+
+	def _get_executor(self) -> Executor:
+		if self._executor is None:
+			self._executor = ProcessPoolExecutor(max_workers=self._max_workers)
+		return self._executor
+
+	def submit(self, source_path: str) -> Future:
+		"""Starts generating the derivatives of the source image.
+
+		Returns a future resolving to a ResponsiveImage.  Cached derivatives
+		resolve immediately without using the process pool.
+		"""
+		with open(source_path, "rb") as file:
+			source_hash: str = hashlib.file_digest(file, "sha256").hexdigest()[:16]
+		key: str = self._index_key(source_hash)
+		cached: ResponsiveImage | None = self._cached(key)
+		if cached:
+			future: Future = Future()
+			future.set_result(cached)
+			return future
+
+		job: Future = self._get_executor().submit(
+			_render_derivatives, source_path, self._output_dir, self._url_prefix,
+			source_hash, self._widths, self._formats, self._quality
+		)
+		result: Future = Future()
+
+		def done(job: Future) -> None:
+			try:
+				variants: list[ImageVariant] = job.result()
+			except Exception as e:
+				logger.error(f"Could not create derivatives of {source_path}: {e}")
+				result.set_exception(e)
+				return
+			with self._index_lock:
+				self._index[key] = [list(variant) for variant in variants]
+				self._save_index()
+			result.set_result(ResponsiveImage(tuple(variants)))
+
+		job.add_done_callback(done)
+		return result
+
+	def shutdown(self) -> None:
+		"""Stops the worker processes."""
+		if self._executor is not None:
+			self._executor.shutdown()
+			self._executor = None
+
+if __name__ == "__main__":
+	raise ValueError("This script is not meant to be run directly.")
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from typing import Final
+
+logger = logging.getLogger(__name__)
+
+class ImageStore:
+	"""A content addressed image store.
+
+	Images are stored once as blobs named after the SHA-256 hash of their
+	content, and an index maps each identifier (an eBay item ID, or an item
+	ID with a variant suffix) to its blob.  The same photo shared by several
+	listings is therefore stored, and uploaded, only once.
+
+	Images cached as ``<identifier><ext>`` by earlier versions are moved into
+	the store by ``migrate``.
+
+	The index is kept in memory and written by ``flush``, or ``close``, once
+	for all the images stored since the last write.
+
+	Keyword arguments:
+	* directory -- The directory holding the blobs and the index.
+	"""
+	_HASH_LENGTH: Final[int] = 32
+
+	def __init__(self, directory: str):
+		os.makedirs(directory, exist_ok=True)
+		self._directory: str = directory
+		self._index_file: str = os.path.join(directory, "index.json")
+		self._lock: threading.Lock = threading.Lock()
+		self._index: dict[str, str] = self._load_index()
+		self._dirty: bool = False
+
+	@property
+	def directory(self) -> str:
+		return self._directory
+
+	def __len__(self) -> int:
+		return len(self._index)
+
+	def _load_index(self) -> dict[str, str]:
+		if not os.path.exists(self._index_file):
+			return {}
+		with open(self._index_file, "r") as file:
+			try:
+				return json.load(file)
+			except json.JSONDecodeError:
+				logger.warning(f"Corrupted image store index: {self._index_file}")
+				return {}
+
+	def _save_index(self) -> None:
+		temp_file: str = self._index_file + ".tmp"
+		with open(temp_file, "w") as file:
+			json.dump(self._index, file)
+		os.replace(temp_file, self._index_file)
+		self._dirty = False
+
+	def flush(self) -> bool:
+		"""Writes the index if it changed and returns whether it did."""
+		with self._lock:
+			if not self._dirty:
+				return False
+			self._save_index()
+			return True
+
+	def close(self) -> None:
+		"""Writes the pending changes of the index."""
+		self.flush()
+
+	@staticmethod
+	def blob_name(data: bytes, extension: str) -> str:
+		"""Returns the name of the blob holding the data."""
+		digest: str = hashlib.sha256(data).hexdigest()[:ImageStore._HASH_LENGTH]
+		return digest + extension.lower()
+
+	def lookup(self, identifier: str) -> str | None:
+		"""Returns the path of the blob stored for the identifier, if any."""
+		with self._lock:
+			blob: str | None = self._index.get(identifier)
+		if blob is None:
+			return None
+		blob_path: str = os.path.join(self._directory, blob)
+		if not os.path.exists(blob_path):
+			# The blob was evicted from the cache.
+			with self._lock:
+				if self._index.pop(identifier, None) is not None:
+					self._dirty = True
+			return None
+		return blob_path
+
+	def put(self, identifier: str, data: bytes, extension: str) -> str:
+		"""Stores the data for the identifier and returns the path of its blob.
+
+		Data already in the store is not written again.
+		"""
+		blob: str = ImageStore.blob_name(data, extension)
+		blob_path: str = os.path.join(self._directory, blob)
+		if not os.path.exists(blob_path):
+			temp_file: str = f"{blob_path}.{threading.get_ident()}.tmp"
+			with open(temp_file, "wb") as file:
+				file.write(data)
+			os.replace(temp_file, blob_path)
+		else:
+			logger.info(f"Image {identifier} is a duplicate of {blob}.")
+		with self._lock:
+			if self._index.get(identifier) != blob:
+				self._index[identifier] = blob
+				self._dirty = True
+		return blob_path
+
+	def migrate(self, legacy_directory: str, extensions: tuple[str, ...]) -> int:
+		"""Moves the ``<identifier><ext>`` files of the legacy directory into
+		the store and returns the number of migrated files.
+		"""
+		migrated: int = 0
+		with os.scandir(legacy_directory) as iterator:
+			legacy: list[os.DirEntry] = [
+				entry for entry in iterator
+				if entry.is_file() and entry.name.lower().endswith(extensions)
+			]
+		for entry in legacy:
+			identifier, extension = os.path.splitext(entry.name)
+			with open(entry.path, "rb") as file:
+				data: bytes = file.read()
+			blob_path: str = os.path.join(self._directory, ImageStore.blob_name(data, extension))
+			if os.path.exists(blob_path):
+				os.remove(entry.path)
+			else:
+				os.replace(entry.path, blob_path)
+			with self._lock:
+				self._index[identifier] = os.path.basename(blob_path)
+				self._dirty = True
+			migrated += 1
+		if migrated:
+			self.flush()
+			logger.info(f"Migrated {migrated} images into {self._directory}.")
+		return migrated
+
+if __name__ == "__main__":
+	raise ValueError("This script is not meant to be run directly.")
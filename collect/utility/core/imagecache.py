@@ -3,7 +3,17 @@
 
 import os
 import logging
-import urllib.request
+import urllib.parse
+
+from typing import TYPE_CHECKING
+
+from .http_session import shared_session
+from .image_store import ImageStore
+from .offline import is_offline
+from .run_metrics import run_metrics
+
+if TYPE_CHECKING:
+	from requests import Response
 
 logger = logging.getLogger(__name__)
 
@@ -16,15 +26,19 @@ class ImageCache:
 	The local path to the image can be accessed using the image_path property.
 	The cache directory can be specified, otherwise it defaults to
 	"cache/images".
+	With an image store, the image is stored as a blob named after its
+	content and looked up by the identifier in the store index.
 
 	Keyword arguments:
 	* url -- The URL of the image to cache.
 	* identifier -- A unique identifier for the image.
 	* cache_dir -- The directory to store cached images.
+	* store -- The content addressed store to keep the image in.
 	"""
 	def __init__(self, url: str = None, identifier: str = None,
 				 cache_dir: str = "cache/images",
-				 user_agent: str | None = None):
+				 user_agent: str | None = None,
+				 store: ImageStore | None = None):
 		if not url or not identifier:
 			raise ValueError("url and identifier are required.")
 		
@@ -36,9 +50,14 @@ class ImageCache:
 		self.identifier = identifier
 		self._downloaded_image = False
 		self.cache_dir = cache_dir
+		self._store: ImageStore | None = store
 
 	@property
 	def image_path(self) -> str:
+		if self._store is not None:
+			blob_path: str | None = self._store.lookup(self.identifier)
+			if blob_path:
+				return blob_path
 		return self._cache_file_path()
 
 	def download_image_if_needed(self) -> bool:
@@ -62,16 +81,20 @@ class ImageCache:
 		"""Downloads the image from the URL and saves the image to the cache
 		file path.
 		"""
+		if is_offline():
+			logger.warning(f"Offline, not downloading {self.url}")
+			return False
 		try:
-			request: urllib.request.Request
-			if not self._user_agent:
-				request = urllib.request.Request(self.url)
+			h: dict[str, str] = {'User-Agent': self._user_agent} if self._user_agent else {}
+			with run_metrics().span("image_fetch") as span:
+				response: Response = shared_session().get(self.url, headers=h, timeout=30)
+				response.raise_for_status()
+				image_data: bytes = response.content
+				span.add(images=1, bytes=len(image_data))
+			if self._store is not None:
+				extension: str = os.path.splitext(self._cache_file_name())[1]
+				self._store.put(self.identifier, image_data, extension)
 			else:
-				h: dict[str, str] = {'User-Agent': self._user_agent}
-				request = urllib.request.Request(self.url, headers=h)
-
-			with urllib.request.urlopen(request) as response:
-				image_data: bytes = response.read()
 				with open(self.image_path, 'wb') as out_file:
 					out_file.write(image_data)
 			return True
@@ -90,14 +113,5 @@ class ImageCache:
 			self._downloaded_image = self._read_image_from_url()
 			return self._downloaded_image
 
-	def _get_image_path(self) -> str:
-		"""Ensures the image is cached and returns the local path to the
-		image.
-		"""
-		if self._load_cache():
-			return self._cache_file_path()
-		else:
-			raise FileNotFoundError("The image could not be loaded or downloaded.")
-	
 if __name__ == "__main__":
 	raise ValueError("This script is not meant to be run directly.")
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_offline: threading.Event = threading.Event()
+
+class OfflineError(ConnectionError):
+	"""Raised when a network request is made while the network is disabled."""
+
+def set_offline(offline: bool = True) -> None:
+	"""Disables, or enables again, the network for the whole process.
+
+	While offline the caches are used regardless of their age, and anything
+	not cached is skipped or raises an OfflineError.
+	"""
+	if offline:
+		_offline.set()
+		logger.info("Network disabled, running from cached data.")
+	else:
+		_offline.clear()
+
+def is_offline() -> bool:
+	return _offline.is_set()
+
+if __name__ == "__main__":
+	raise ValueError("This script is not meant to be run directly.")
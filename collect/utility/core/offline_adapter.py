@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from requests import PreparedRequest, Response
+from requests.adapters import BaseAdapter
+
+from .offline import OfflineError
+
+class OfflineAdapter(BaseAdapter):
+	"""A requests transport adapter that refuses every request."""
+	def send(self, request: PreparedRequest, **kwargs) -> Response:
+		raise OfflineError(f"Offline, not fetching {request.url}.")
+
+	def close(self) -> None:
+		pass
+
+if __name__ == "__main__":
+	raise ValueError("This script is not meant to be run directly.")
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import cProfile
+import logging
+import os
+import re
+import sys
+import threading
+import tracemalloc
+
+from collections import Counter
+from contextlib import contextmanager
+from types import FrameType
+from typing import Callable, Final, Iterator
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES: Final[tuple[str, ...]] = ("cpu", "mem", "both")
+_UNSAFE: Final[re.Pattern] = re.compile(r"[^\w.-]+")
+
+class StackSampler:
+	"""Samples the stacks of every thread at a fixed interval.
+
+	The samples are written in the collapsed stack format read by flame
+	graph tools: one line per distinct stack, frames separated by
+	semicolons, followed by the number of samples.  Unlike cProfile, the
+	sampler also sees the worker threads of the thread pools.
+	"""
+	def __init__(self, interval: float = 0.005):
+		self._interval: float = interval
+		self._samples: Counter[str] = Counter()
+		self._stop: threading.Event = threading.Event()
+		self._thread: threading.Thread | None = None
+
+	@staticmethod
+	def _frame_label(frame: FrameType) -> str:
+		code = frame.f_code
+		return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+	def _sample(self) -> None:
+		own: int = threading.get_ident()
+		names: dict[int, str] = {thread.ident: thread.name for thread in threading.enumerate()}
+		for ident, frame in sys._current_frames().items():
+			if ident == own:
+				continue
+			stack: list[str] = []
+			while frame is not None:
+				stack.append(StackSampler._frame_label(frame))
+				frame = frame.f_back
+			stack.append(names.get(ident, str(ident)))
+			self._samples[";".join(reversed(stack))] += 1
+
+	def _run(self) -> None:
+		while not self._stop.wait(self._interval):
+			self._sample()
+
+	def start(self) -> None:
+		self._samples.clear()
+		self._stop.clear()
+		self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+		self._thread.start()
+
+	def stop(self) -> None:
+		self._stop.set()
+		if self._thread is not None:
+			self._thread.join()
+			self._thread = None
+
+	def write(self, file_path: str) -> None:
+		with open(file_path, "w", encoding="utf-8") as file:
+			for stack, count in self._samples.most_common():
+				file.write(f"{stack} {count}\n")
+
+class StageProfiler:
+	"""Profiles each stage of a run.
+
+	In ``cpu`` mode each stage is run under cProfile, written as
+	``<stage>.pstats``, and sampled into ``<stage>.collapsed`` for flame
+	graphs.  In ``mem`` mode tracemalloc snapshots taken around each stage
+	are compared and the top allocators written to ``<stage>.mem.txt``.
+	``both`` does both.  The labels of a stage are appended to its name.
+
+	One stage is profiled at a time.  A stage nested in the running one is
+	part of its profile.  A stage entered on another thread while one runs
+	only shows in the stack samples, which cover every thread; these stages
+	are logged and listed by ``close``.  Run the stages one after the other
+	to profile each of them.
+
+	Profiles of stages that end before the output directory is known, such
+	as loading the configuration holding it, are written by
+	``set_output_dir``.
+
+	Keyword arguments:
+	* mode -- One of ``cpu``, ``mem`` or ``both``.
+	* output_dir -- The directory the profiles are written to.
+	* top -- The number of allocators listed per stage.
+	"""
+	def __init__(self, mode: str, output_dir: str | None, top: int = 25,
+				 sample_interval: float = 0.005):
+		if mode not in PROFILE_MODES:
+			raise ValueError(f"Unknown profile mode: {mode}")
+		self._cpu: bool = mode in ("cpu", "both")
+		self._mem: bool = mode in ("mem", "both")
+		self._output_dir: str | None = None
+		self._top: int = top
+		self._sample_interval: float = sample_interval
+		self._stages: int = 0
+		self._active: threading.Lock = threading.Lock()
+		# The name and thread of the stage being profiled.
+		self._running: tuple[str, int] | None = None
+		self._skipped: Counter[str] = Counter()
+		self._pending: list[Callable[[], None]] = []
+		if output_dir is not None:
+			self.set_output_dir(output_dir)
+
+	def set_output_dir(self, output_dir: str) -> None:
+		"""Sets the directory the profiles are written to and writes the
+		profiles of the stages that already ended.
+		"""
+		os.makedirs(output_dir, exist_ok=True)
+		self._output_dir = output_dir
+		pending: list[Callable[[], None]] = self._pending
+		self._pending = []
+		for write in pending:
+			write()
+
+	def _path(self, stem: str, extension: str) -> str:
+		return os.path.join(self._output_dir, f"{stem}{extension}")
+
+	@contextmanager
+	def stage(self, name: str, **labels: any) -> Iterator[None]:
+		"""Profiles the enclosed block as a stage, unless another stage runs."""
+		if not self._active.acquire(blocking=False):
+			running: tuple[str, int] | None = self._running
+			if running is not None and running[1] == threading.get_ident():
+				logger.debug(f"Stage {name} is profiled as part of {running[0]}.")
+			else:
+				self._skipped[name] += 1
+				logger.info(f"Stage {name} is not profiled, it runs on another thread during another stage.")
+			yield
+			return
+		self._running = (name, threading.get_ident())
+		try:
+			yield from self._profile(name, labels)
+		finally:
+			self._running = None
+			self._active.release()
+
+	def _profile(self, name: str, labels: dict[str, any]) -> Iterator[None]:
+		self._stages += 1
+		stem: str = _UNSAFE.sub("_", "-".join([f"{self._stages:02d}", name, *map(str, labels.values())]))
+		profile: cProfile.Profile | None = None
+		sampler: StackSampler | None = None
+		before: tracemalloc.Snapshot | None = None
+		if self._mem:
+			if not tracemalloc.is_tracing():
+				tracemalloc.start(10)
+			before = tracemalloc.take_snapshot()
+		if self._cpu:
+			sampler = StackSampler(self._sample_interval)
+			sampler.start()
+			profile = cProfile.Profile()
+			profile.enable()
+		try:
+			yield
+		finally:
+			writes: list[Callable[[], None]] = []
+			if profile is not None:
+				profile.disable()
+				sampler.stop()
+				writes.append(lambda: profile.dump_stats(self._path(stem, ".pstats")))
+				writes.append(lambda: sampler.write(self._path(stem, ".collapsed")))
+			if before is not None:
+				report: str = self._allocations(before, tracemalloc.take_snapshot())
+				writes.append(lambda: self._write_allocations(stem, report))
+			for write in writes:
+				if self._output_dir is None:
+					self._pending.append(write)
+				else:
+					write()
+			logger.info(f"Profiled stage {stem}.")
+
+	def _allocations(self, before: tracemalloc.Snapshot, after: tracemalloc.Snapshot) -> str:
+		filters: list[tracemalloc.Filter] = [
+			tracemalloc.Filter(False, tracemalloc.__file__),
+			tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+			tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>")
+		]
+		stats: list[tracemalloc.StatisticDiff] = after.filter_traces(filters).compare_to(
+			before.filter_traces(filters), "lineno"
+		)[:self._top]
+		current, peak = tracemalloc.get_traced_memory()
+		tracemalloc.reset_peak()
+		return f"current {current} bytes, peak {peak} bytes\n" + "".join(f"{stat}\n" for stat in stats)
+
+	def _write_allocations(self, stem: str, report: str) -> None:
+		with open(self._path(stem, ".mem.txt"), "w", encoding="utf-8") as file:
+			file.write(report)
+
+	@property
+	def skipped(self) -> dict[str, int]:
+		"""The number of times each stage was not profiled as it ran on
+		another thread during another stage.
+		"""
+		return dict(self._skipped)
+
+	def close(self) -> None:
+		"""Lists the stages that were not profiled and stops tracing memory
+		allocations.
+		"""
+		if self._skipped:
+			logger.warning("Stages not profiled as they ran concurrently with another stage: " + ", ".join(
+				f"{name} ({count}x)" for name, count in self._skipped.most_common()
+			))
+		if tracemalloc.is_tracing():
+			tracemalloc.stop()
+
+if __name__ == "__main__":
+	raise ValueError("This script is not meant to be run directly.")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+import random
+import threading
+import time
+
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+class TokenBudget:
+	"""A token bucket limiting the tokens spent per minute.
+
+	The bucket holds at most one minute of tokens and refills continuously.
+	``acquire`` blocks until the requested tokens are available.  A request
+	larger than the whole budget waits for a full bucket and then overdraws
+	it, so it is delayed rather than rejected.
+
+	Keyword arguments:
+	* tokens_per_minute -- The budget.
+	* clock -- Returns a monotonic time in seconds.
+	* sleep -- Sleeps for the given number of seconds.
+	"""
+	def __init__(self, tokens_per_minute: int,
+				 clock: Callable[[], float] = time.monotonic,
+				 sleep: Callable[[float], None] = time.sleep):
+		if tokens_per_minute <= 0:
+			raise ValueError("tokens_per_minute must be positive.")
+		self._capacity: float = float(tokens_per_minute)
+		self._rate: float = tokens_per_minute / 60.0
+		self._clock: Callable[[], float] = clock
+		self._sleep: Callable[[float], None] = sleep
+		self._lock: threading.Lock = threading.Lock()
+		self._available: float = self._capacity
+		self._updated: float = clock()
+
+	def _refill(self) -> None:
+		now: float = self._clock()
+		self._available = min(self._capacity, self._available + (now - self._updated) * self._rate)
+		self._updated = now
+
+	def acquire(self, tokens: int) -> None:
+		"""Waits until the tokens are available and spends them."""
+		needed: float = min(float(tokens), self._capacity)
+		while True:
+			with self._lock:
+				self._refill()
+				if self._available >= needed:
+					self._available -= tokens
+					return
+				wait: float = (needed - self._available) / self._rate
+			logger.info(f"Token budget exhausted, waiting {wait:.1f} seconds.")
+			self._sleep(wait)
+
+	def adjust(self, tokens: int) -> None:
+		"""Spends, or with a negative value refunds, tokens after the fact.
+
+		Use once the actual usage of a request is known.
+		"""
+		with self._lock:
+			self._refill()
+			self._available = min(self._capacity, self._available - tokens)
+
+def backoff_delay(attempt: int, base: float = 1.0, maximum: float = 30.0,
+				  retry_after: float | None = None) -> float:
+	"""Returns the delay before the next attempt.
+
+	Uses exponential backoff with full jitter, and never less than the
+	``Retry-After`` the server asked for.
+	"""
+	delay: float = random.uniform(0, min(maximum, base * (2 ** attempt)))
+	if retry_after is not None:
+		delay = max(delay, retry_after)
+	return delay
+
+if __name__ == "__main__":
+	raise ValueError("This script is not meant to be run directly.")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import heapq
+import logging
+import random
+import threading
+import time
+
+from dataclasses import dataclass, field
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+@dataclass(order=True)
+class ScheduledJob:
+	"""A refresh job. The job function returns True when it produced new data."""
+	next_run: float
+	name: str = field(compare=False)
+	func: Callable[[], bool] = field(compare=False)
+	interval: float | Callable[[], float] = field(compare=False)
+
+	def next_interval(self) -> float:
+		if callable(self.interval):
+			return float(self.interval())
+		return float(self.interval)
+
+class RefreshScheduler:
+	"""Runs each source on its own interval.
+
+	Every job is rescheduled after it runs, using the job interval plus a
+	random jitter of up to ``jitter`` times the interval so that sources with
+	the same interval do not all refresh at the same moment.
+
+	Keyword arguments:
+	* jitter -- The maximum jitter as a fraction of the interval.
+	* min_interval -- The shortest delay between two runs of the same job.
+	* clock -- The monotonic clock used for scheduling.
+	"""
+	def __init__(self, jitter: float = 0.1, min_interval: float = 60.0,
+				 clock: Callable[[], float] = time.monotonic):
+		if jitter < 0:
+			raise ValueError("jitter must not be negative.")
+		self._jitter: float = jitter
+		self._min_interval: float = min_interval
+		self._clock: Callable[[], float] = clock
+		self._jobs: list[ScheduledJob] = []
+
+	def __len__(self) -> int:
+		return len(self._jobs)
+
+	def add_job(self, name: str, func: Callable[[], bool],
+				interval: float | Callable[[], float],
+				initial_delay: float = 0.0) -> None:
+		"""Schedule ``func`` to run after ``initial_delay`` and then every ``interval`` seconds."""
+		job: ScheduledJob = ScheduledJob(
+			next_run=self._clock() + max(0.0, initial_delay),
+			name=name,
+			func=func,
+			interval=interval
+		)
+		heapq.heappush(self._jobs, job)
+
+	def remove_job(self, name: str) -> bool:
+		"""Unschedule the job with the name and return whether there was one."""
+		count: int = len(self._jobs)
+		self._jobs = [job for job in self._jobs if job.name != name]
+		heapq.heapify(self._jobs)
+		return len(self._jobs) != count
+
+	def seconds_until_next(self) -> float | None:
+		"""Return the number of seconds until the next job is due, or None without jobs."""
+		if not self._jobs:
+			return None
+		return max(0.0, self._jobs[0].next_run - self._clock())
+
+	def run_pending(self) -> list[str]:
+		"""Run every job that is due and return the names of the jobs that produced new data."""
+		changed: list[str] = []
+		now: float = self._clock()
+		while self._jobs and self._jobs[0].next_run <= now:
+			job: ScheduledJob = heapq.heappop(self._jobs)
+			try:
+				if job.func():
+					changed.append(job.name)
+			except Exception as e:
+				logger.error(f"Refresh job {job.name} failed: {e}")
+			self._reschedule(job)
+		return changed
+
+	def run_forever(self, on_change: Callable[[list[str]], None],
+					stop_event: threading.Event | None = None) -> None:
+		"""Run jobs as they become due until ``stop_event`` is set.
+
+		``on_change`` is called with the names of the jobs that produced new
+		data, once per scheduling pass.
+		"""
+		stop: threading.Event = stop_event or threading.Event()
+		while not stop.is_set():
+			changed: list[str] = self.run_pending()
+			if changed:
+				logger.info(f"New data from: {', '.join(changed)}")
+				on_change(changed)
+			# Without jobs, waits until stopped.
+			stop.wait(self.seconds_until_next())
+
+	def _reschedule(self, job: ScheduledJob) -> None:
+		try:
+			interval: float = max(self._min_interval, job.next_interval())
+		except Exception as e:
+			logger.error(f"Could not compute the interval for {job.name}: {e}")
+			interval = self._min_interval
+		jitter: float = random.uniform(0.0, self._jitter * interval)
+		job.next_run = self._clock() + interval + jitter
+		heapq.heappush(self._jobs, job)
+
+if __name__ == "__main__":
+	raise ValueError("This script is not meant to be run directly.")
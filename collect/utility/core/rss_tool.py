@@ -2,19 +2,39 @@
 # -*- coding: utf-8 -*-
 
 import json
+import logging
 import os
+import time
 from os import path
 
-import xml.etree.ElementTree as ElementTree
-from xml.etree.ElementTree import Element
-
+from .feed_merge import identity_keys, merge_by_date, merge_items
+from .feed_parser import FeedChannel, FeedEntry, parse_feed
+from .feed_schedule import FeedSchedule, cache_control_max_age
 from .fetch_bot import FetchBot
 from .caching_robot_file_parser import CachingRobotFileParser
+from .offline import is_offline
 from datetime import datetime, timedelta
-from requests.models import Response
-from typing import Generator
+from typing import Final, Generator, Iterator, TYPE_CHECKING
+
+if TYPE_CHECKING:
+	from requests.models import Response
+	from .feed_store import FeedStore
+
+logger = logging.getLogger(__name__)
 
 class RssTool:
+	"""Reads a group of feeds into a cache of recent items.
+
+	The ``cache_duration`` is the refresh interval until the feeds have
+	shown how often they publish; from then on each feed is read on its own
+	schedule (see FeedSchedule), between ``min_interval`` and
+	``max_interval``.  The group is refreshed when its first feed is due,
+	and only the feeds that are due are read; the cached items of the
+	others are kept.
+
+	With a ``store`` the state is kept in the FeedStore under ``cache_file``
+	instead of in a file of its own.
+	"""
 	def __init__(
 			self,
 			user_agent: str,
@@ -23,7 +43,11 @@ class RssTool:
 			cache_duration: int = 28800,
 			max_results: int = 10, cache_directory: str ="cache",
 			cache_file: str = "rss_cache.json",
-			max_cache_size: int = 20
+			max_cache_size: int = 20,
+			endpoint: str | None = None,
+			min_interval: float = 900.0,
+			max_interval: float = 86400.0,
+			store: "FeedStore | None" = None
 		):
 
 		assert user_agent, "user_agent is required."
@@ -45,81 +69,185 @@ class RssTool:
 		self._last_fetch_time: datetime | None = None
 		self._cache: list[dict[str, str]] = []
 		self._max_cache_size: int = max_cache_size
-		self._load_cache_from_file()
+		self._robot_parsers: dict[str, CachingRobotFileParser] = {}
+		self._endpoint: str | None = endpoint
+		self._min_interval: float = min_interval
+		self._max_interval: float = max(min_interval, max_interval)
+		self._schedules: dict[str, FeedSchedule] = {}
+		self._store: FeedStore | None = store
+		if store is None:
+			self._load_cache_from_file()
+		else:
+			self._load_state(store.state(cache_file))
 	
+	@property
+	def items(self) -> list[dict[str, str]]:
+		"""The cached items, without refreshing the cache."""
+		return self._cache
+
 	def fetch(self) -> Generator[dict[str, str], None, None]:
-		if self._is_cache_valid():
-			for item in self._cache:
-				yield item
-		else:
-			self._cache = self._update_cache()
-			self._save_cache_to_file()
-			for item in self._cache:
-				yield item
+		self.refresh()
+		for item in self._cache:
+			yield item
+
+	def refresh(self) -> bool:
+		"""Update the cache if it has expired.
+
+		Returns True if the feed produced items that were not cached before.
+		"""
+		if self._is_cache_valid() or is_offline():
+			return False
+		previous: set[str] = {key for item in self._cache for key in identity_keys(item)}
+		self._cache = self._update_cache()
+		self._save_cache_to_file()
+		return any(previous.isdisjoint(identity_keys(item)) for item in self._cache)
+
+	def seconds_until_stale(self) -> float:
+		"""Return the number of seconds until the cached data expires."""
+		if self._last_fetch_time is None:
+			return 0.0
+		return max(0.0, self._next_refresh_time() - time.time())
 
 	def _is_cache_valid(self) -> bool:
 		"""Check if the cached data is still valid."""
 		if self._last_fetch_time is None:
 			return False
-		return datetime.now() - self._last_fetch_time < self.cache_duration
+		return time.time() < self._next_refresh_time()
 
-	def _update_cache(self) -> list[dict[str, str]]:
-		"""Fetch data from the URL and update the cache."""
+	def _schedule(self, url: str) -> FeedSchedule:
+		schedule: FeedSchedule | None = self._schedules.get(url)
+		if schedule is None:
+			schedule = FeedSchedule()
+			self._schedules[url] = schedule
+		return schedule
 
-		new_items: list[dict[str, str]] = []
+	def _feed_due_time(self, url: str) -> float:
+		"""Return the POSIX time at which the feed is due."""
+		schedule: FeedSchedule = self._schedule(url)
+		last: float | None = schedule.last_refresh
+		if last is None:
+			# Caches written before feeds were tracked one by one.
+			if self._last_fetch_time is None:
+				return 0.0
+			last = self._last_fetch_time.timestamp()
+		default: float = self.cache_duration.total_seconds()
+		return schedule.next_refresh(last, default, self._min_interval, self._max_interval)
 
-		for url in self._urls:
+	def _next_refresh_time(self) -> float:
+		"""Return the POSIX time at which the first feed of the group is due."""
+		return min(self._feed_due_time(url) for url in self._urls)
+
+	def _robot_parser(self, url: str) -> CachingRobotFileParser:
+		"""Return the robots.txt parser for the URL, reloading it once it is stale."""
+		parser: CachingRobotFileParser | None = self._robot_parsers.get(url)
+		if parser is None:
 			parser = CachingRobotFileParser(url=url)
+			self._robot_parsers[url] = parser
+		if parser.is_stale:
 			parser.load_robots_txt()
+		return parser
+
+	_CHUNK_SIZE: Final[int] = 16 * 1024
 
-			if not parser.can_fetch(url=url, user_agent=self._user_agent):
-				raise ValueError("The URL is disallowed by robots.txt.")
-			
-			request_bot: FetchBot = FetchBot(url)
-			response: Response = request_bot.fetch()
+	def _feed_entries(self, url: str, known: set[str]) -> Iterator[FeedEntry]:
+		"""Fetch the feed and yield its entries as they are parsed.
 
+		The entries read and whether any of them has none of the ``known``
+		keys are recorded in the feed's schedule, with the hints of the
+		response.
+		"""
+		request_url: str = FetchBot.endpoint_url(url, self._endpoint)
+		parser: CachingRobotFileParser = self._robot_parser(request_url)
+		if not parser.can_fetch(url=request_url, user_agent=self._user_agent):
+			raise ValueError("The URL is disallowed by robots.txt.")
+
+		request_bot: FetchBot = FetchBot(url, endpoint=self._endpoint)
+		response: Response = request_bot.fetch(stream=True)
+		channel: FeedChannel = FeedChannel()
+		published: list[float | None] = []
+		hit: bool = False
+		try:
 			if response.status_code != 200:
 				raise ValueError(f"Failed to fetch data from {url}.")
 
-			root: Element = ElementTree.fromstring(response.content)
+			# Closing the response drops the part of the body that was not read.
+			chunks = response.iter_content(chunk_size=RssTool._CHUNK_SIZE)
+			for entry in parse_feed(chunks, channel=channel):
+				published.append(entry.published)
+				hit = hit or known.isdisjoint(identity_keys(entry._asdict()))
+				yield entry
+		finally:
+			response.close()
+			self._schedule(url).record(
+				published, hit,
+				ttl=channel.ttl,
+				max_age=cache_control_max_age(response.headers.get("Cache-Control")),
+				skip_hours=channel.skip_hours
+			)
 
-			for i, item in enumerate(root.findall(".//item")):
-				if i >= self._max_results:
-					break
-				title: str = item.find("title").text
-				link: str = item.find("link").text
-				new_items.append({
-					"title": title,
-					"link": link,
-					"date-added": datetime.now().isoformat()
-				})
+	def _update_cache(self) -> list[dict[str, str]]:
+		"""Fetch data from the feeds that are due and update the cache.
+
+		The feeds are merged by date and reading stops after ``max_results``
+		entries in total, not per feed.
+		"""
 
-		combined_cache = new_items + [
-			item for item in self._cache
-			if item["link"] not in {i["link"] for i in new_items}
-		]
+		new_items: list[dict[str, str]] = []
+		known: set[str] = {key for item in self._cache for key in identity_keys(item)}
+		now: float = time.time()
+		due: list[str] = [url for url in self._urls if self._feed_due_time(url) <= now] or self._urls
+		feeds: list[Iterator[FeedEntry]] = [self._feed_entries(url, known) for url in due]
+		try:
+			for entry in merge_by_date(feeds, self._max_results):
+				item: dict[str, str] = {
+					"title": entry.title,
+					"link": entry.link,
+					"date-added": datetime.now().isoformat()
+				}
+				if entry.guid:
+					item["guid"] = entry.guid
+				if entry.published is not None:
+					item["published"] = datetime.fromtimestamp(entry.published).isoformat()
+				new_items.append(item)
+		finally:
+			for feed in feeds:
+				feed.close()
 
 		self._last_fetch_time = datetime.now()
-		return combined_cache[:self._max_cache_size]
+		logger.debug(f"{self.cache_file}: next refresh in {self.seconds_until_stale():.0f} seconds.")
+		return merge_items(new_items, self._cache, self._max_cache_size)
+
+	def _load_state(self, data: dict[str, any]) -> None:
+		"""Restore the cache, last fetch time and feed schedules."""
+		self._cache = data.get("cache", [])
+		self._schedules = {
+			url: FeedSchedule.from_dict(schedule)
+			for url, schedule in data.get("feeds", {}).items()
+		}
+		last_fetch_time_str = data.get("last_fetch_time")
+		if last_fetch_time_str:
+			self._last_fetch_time = datetime.fromisoformat(last_fetch_time_str)
+
+	def _state(self) -> dict[str, any]:
+		return {
+			"cache": self._cache,
+			"last_fetch_time": self._last_fetch_time.isoformat() if self._last_fetch_time else None,
+			"feeds": {url: self._schedules[url].to_dict() for url in self._urls if url in self._schedules}
+		}
 
 	def _load_cache_from_file(self):
 		"""Load cache and last fetch time from a file."""
 		if os.path.exists(self.cache_filepath):
 			with open(self.cache_filepath, "r") as file:
-				data = json.load(file)
-				self._cache = data.get("cache", [])
-				last_fetch_time_str = data.get("last_fetch_time")
-				if last_fetch_time_str:
-					self._last_fetch_time = datetime.fromisoformat(last_fetch_time_str)
+				self._load_state(json.load(file))
 
 	def _save_cache_to_file(self):
-		"""Save cache and last fetch time to a file."""
-		data = {
-			"cache": self._cache,
-			"last_fetch_time": self._last_fetch_time.isoformat() if self._last_fetch_time else None
-		}
+		"""Save cache and last fetch time to a file, or hand them to the store."""
+		if self._store is not None:
+			self._store.update(self.cache_file, self._state())
+			return
 		with open(self.cache_filepath, "w") as file:
-			json.dump(data, file, indent="\t")
+			json.dump(self._state(), file, indent="\t")
 
 if __name__ == "__main__":
 	import sys
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import Final, Iterator
+
+from .profiling import StageProfiler
+
+logger = logging.getLogger(__name__)
+
+LabelSet = tuple[tuple[str, str], ...]
+
+@dataclass
+class StageStats:
+	"""The aggregated spans of one stage and label set."""
+	calls: int = 0
+	seconds: float = 0.0
+	max_seconds: float = 0.0
+	errors: int = 0
+	counters: dict[str, float] = field(default_factory=dict)
+
+class Span:
+	"""A running span.  Use ``add`` to count items or bytes handled by the stage."""
+	def __init__(self, name: str, labels: LabelSet):
+		self.name: str = name
+		self.labels: LabelSet = labels
+		self.counters: dict[str, float] = {}
+
+	def add(self, **counters: float) -> None:
+		for counter, value in counters.items():
+			self.counters[counter] = self.counters.get(counter, 0) + value
+
+class RunMetrics:
+	"""Durations, counts and bytes of the stages of a run.
+
+	Stages are timed with the ``span`` context manager, which may be used
+	from any thread.  Spans with the same name and labels are aggregated.
+	At the end of a run the metrics are written as JSON and in the
+	Prometheus textfile format.
+
+	With a profiler set by ``set_profiler``, each span is also profiled as
+	a stage of the same name and labels.
+	"""
+	_PREFIX: Final[str] = "collect"
+	_NAME_PATTERN: Final[re.Pattern] = re.compile(r"[^a-zA-Z0-9_]")
+
+	def __init__(self):
+		self._lock: threading.Lock = threading.Lock()
+		self._stages: dict[tuple[str, LabelSet], StageStats] = {}
+		self._started: float = time.time()
+		self._started_perf: float = time.perf_counter()
+		self._profiler: StageProfiler | None = None
+
+	def set_profiler(self, profiler: StageProfiler | None) -> None:
+		"""Profiles the spans with the profiler, or stops profiling them with None."""
+		self._profiler = profiler
+
+	def reset(self) -> None:
+		"""Starts a new run."""
+		with self._lock:
+			self._stages = {}
+			self._started = time.time()
+			self._started_perf = time.perf_counter()
+
+	@staticmethod
+	def _labels(labels: dict[str, any]) -> LabelSet:
+		return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+	@contextmanager
+	def span(self, name: str, **labels: any) -> Iterator[Span]:
+		"""Times the enclosed block as a stage of the run."""
+		span: Span = Span(name, RunMetrics._labels(labels))
+		profiler: StageProfiler | None = self._profiler
+		with profiler.stage(name, **labels) if profiler else nullcontext():
+			start: float = time.perf_counter()
+			failed: bool = False
+			try:
+				yield span
+			except BaseException:
+				failed = True
+				raise
+			finally:
+				elapsed: float = time.perf_counter() - start
+				self._record(span, elapsed, failed)
+
+	def _record(self, span: Span, elapsed: float, failed: bool) -> None:
+		with self._lock:
+			stats: StageStats = self._stages.setdefault((span.name, span.labels), StageStats())
+			stats.calls += 1
+			stats.seconds += elapsed
+			stats.max_seconds = max(stats.max_seconds, elapsed)
+			stats.errors += int(failed)
+			for counter, value in span.counters.items():
+				stats.counters[counter] = stats.counters.get(counter, 0) + value
+
+	def count(self, name: str, **counters: float) -> None:
+		"""Adds counters to a stage without timing it."""
+		with self._lock:
+			stats: StageStats = self._stages.setdefault((name, ()), StageStats())
+			for counter, value in counters.items():
+				stats.counters[counter] = stats.counters.get(counter, 0) + value
+
+	def snapshot(self) -> dict[str, any]:
+		"""Returns the metrics of the run as a JSON serializable dict."""
+		with self._lock:
+			stages: list[dict[str, any]] = [
+				{
+					"stage": name,
+					"labels": dict(labels),
+					"calls": stats.calls,
+					"seconds": round(stats.seconds, 6),
+					"max_seconds": round(stats.max_seconds, 6),
+					"errors": stats.errors,
+					"counters": dict(stats.counters)
+				}
+				for (name, labels), stats in self._stages.items()
+			]
+			return {
+				"started": self._started,
+				"seconds": round(time.perf_counter() - self._started_perf, 6),
+				"stages": stages
+			}
+
+	@staticmethod
+	def _escape(value: str) -> str:
+		return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+	@staticmethod
+	def _metric_name(*parts: str) -> str:
+		return RunMetrics._NAME_PATTERN.sub("_", "_".join((RunMetrics._PREFIX,) + parts))
+
+	@staticmethod
+	def _label_text(stage: str, labels: dict[str, str]) -> str:
+		pairs: list[str] = [f"stage=\"{RunMetrics._escape(stage)}\""]
+		pairs.extend(
+			f"{RunMetrics._NAME_PATTERN.sub('_', key)}=\"{RunMetrics._escape(value)}\""
+			for key, value in labels.items()
+		)
+		return "{" + ",".join(pairs) + "}"
+
+	def to_prometheus(self) -> str:
+		"""Returns the metrics of the run in the Prometheus text format."""
+		snapshot: dict[str, any] = self.snapshot()
+		samples: dict[str, list[str]] = {}
+
+		def sample(metric: str, labels: str, value: float) -> None:
+			samples.setdefault(metric, []).append(f"{metric}{labels} {value}")
+
+		for stage in snapshot["stages"]:
+			labels: str = RunMetrics._label_text(stage["stage"], stage["labels"])
+			if stage["calls"]:
+				sample(RunMetrics._metric_name("stage_seconds"), labels, stage["seconds"])
+				sample(RunMetrics._metric_name("stage_max_seconds"), labels, stage["max_seconds"])
+				sample(RunMetrics._metric_name("stage_calls"), labels, stage["calls"])
+				sample(RunMetrics._metric_name("stage_errors"), labels, stage["errors"])
+			for counter, value in stage["counters"].items():
+				sample(RunMetrics._metric_name("stage", counter), labels, value)
+
+		lines: list[str] = []
+		for metric in sorted(samples):
+			lines.append(f"# TYPE {metric} gauge")
+			lines.extend(samples[metric])
+		for metric, value in (("run_timestamp_seconds", snapshot["started"]),
+							  ("run_seconds", snapshot["seconds"])):
+			name: str = RunMetrics._metric_name(metric)
+			lines.append(f"# TYPE {name} gauge")
+			lines.append(f"{name} {value}")
+		return "\n".join(lines) + "\n"
+
+	@staticmethod
+	def _write_atomic(file_path: str, content: str) -> None:
+		temp_file: str = file_path + ".tmp"
+		with open(temp_file, "w", encoding="utf-8") as file:
+			file.write(content)
+		os.replace(temp_file, file_path)
+
+	def write(self, directory: str) -> None:
+		"""Writes ``metrics.json`` and ``collect.prom`` to the directory."""
+		os.makedirs(directory, exist_ok=True)
+		RunMetrics._write_atomic(
+			os.path.join(directory, "metrics.json"),
+			json.dumps(self.snapshot(), indent="\t")
+		)
+		RunMetrics._write_atomic(os.path.join(directory, "collect.prom"), self.to_prometheus())
+		logger.info(f"Run metrics written to {directory}.")
+
+_metrics: RunMetrics = RunMetrics()
+
+def run_metrics() -> RunMetrics:
+	"""Returns the process wide run metrics."""
+	return _metrics
+
+if __name__ == "__main__":
+	raise ValueError("This script is not meant to be run directly.")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import unicodedata
+
+from datetime import datetime, timezone, timedelta
+from typing import Final, Optional
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD: Final[re.Pattern] = re.compile(r"[^\w]+|_+")
+
+def normalize_title(title: str) -> str:
+	"""Returns the title folded to lower case words separated by single spaces.
+
+	Punctuation, emojis and repeated whitespace are dropped, so listings that
+	only differ in such details share one normalized title.
+	"""
+	folded: str = unicodedata.normalize("NFKC", title).casefold()
+	return " ".join(_NON_WORD.sub(" ", folded).split())
+
+def prompt_version(prompt_definition: dict[str, any]) -> str:
+	"""Returns a short hash of the prompt definition.
+
+	Any edit to the prompt, its context or its function changes the version.
+	"""
+	canonical: str = json.dumps(prompt_definition, sort_keys=True, separators=(",", ":"))
+	return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:12]
+
+class TitleHeadlineCache:
+	"""Headlines keyed by the prompt version and the normalized source title.
+
+	Relisted items get a new item ID but usually keep their title, so this
+	cache lets a headline generated for one listing be reused by the others.
+	The headlines are held in memory in a dict per prompt version, keyed by
+	the normalized title, and written by ``save``, or ``close``, once for all
+	the headlines added since the last write.
+
+	Keyword arguments:
+	* file_path -- The file holding the headlines.
+	* max_record_age -- The number of days a headline is kept.
+	"""
+	_KEY_HEADLINE: Final[str] = "headline"
+	_KEY_TIMESTAMP: Final[str] = "timestamp"
+
+	def __init__(self, file_path: str, max_record_age: int = 30):
+		self._file_path: str = file_path
+		self._max_record_age: int = max_record_age
+		self._lock: threading.Lock = threading.Lock()
+		self._headlines: dict[str, dict[str, dict[str, str]]] = self._load()
+		self._dirty: bool = False
+		self._prune()
+
+	def _load(self) -> dict[str, dict[str, dict[str, str]]]:
+		if not os.path.exists(self._file_path):
+			return {}
+		try:
+			with open(self._file_path, "r", encoding="utf-8") as file:
+				data: any = json.load(file)
+			if not isinstance(data, dict) or not all(
+				isinstance(titles, dict) and all(
+					isinstance(record, dict)
+					and TitleHeadlineCache._KEY_HEADLINE in record
+					and TitleHeadlineCache._KEY_TIMESTAMP in record
+					for record in titles.values()
+				)
+				for titles in data.values()
+			):
+				raise ValueError("unexpected structure")
+		except (OSError, ValueError) as e:
+			logger.warning(f"Could not read {self._file_path}, starting empty: {e}")
+			return {}
+		return data
+
+	def _prune(self) -> None:
+		"""Drops the headlines older than the max record age."""
+		threshold: datetime = datetime.now(timezone.utc) - timedelta(days=self._max_record_age)
+		for version in list(self._headlines):
+			titles: dict[str, dict[str, str]] = self._headlines[version]
+			for title in [t for t, r in titles.items()
+						  if datetime.fromisoformat(r[TitleHeadlineCache._KEY_TIMESTAMP]) <= threshold]:
+				del titles[title]
+				self._dirty = True
+			if not titles:
+				del self._headlines[version]
+
+	@staticmethod
+	def key(version: str, title: str) -> str:
+		"""Returns the key shared by the titles that normalize alike for the prompt version."""
+		return f"{version}:{normalize_title(title)}"
+
+	def find(self, version: str, title: str) -> Optional[str]:
+		"""Returns the cached headline of the title, or None."""
+		record: dict[str, str] | None = self._headlines.get(version, {}).get(normalize_title(title))
+		return record[TitleHeadlineCache._KEY_HEADLINE] if record else None
+
+	def add(self, version: str, title: str, headline: str) -> None:
+		"""Caches the headline generated for the title, to be written by ``save``."""
+		with self._lock:
+			titles: dict[str, dict[str, str]] = self._headlines.setdefault(version, {})
+			normalized: str = normalize_title(title)
+			if normalized in titles:
+				return
+			titles[normalized] = {
+				TitleHeadlineCache._KEY_HEADLINE: headline,
+				TitleHeadlineCache._KEY_TIMESTAMP: datetime.now(timezone.utc).isoformat()
+			}
+			self._dirty = True
+
+	def save(self) -> bool:
+		"""Writes the headlines if they changed and returns whether they did."""
+		with self._lock:
+			if not self._dirty:
+				return False
+			directory: str = os.path.dirname(self._file_path)
+			if directory:
+				os.makedirs(directory, exist_ok=True)
+			temp_file: str = self._file_path + ".tmp"
+			with open(temp_file, "w", encoding="utf-8") as file:
+				json.dump(self._headlines, file, ensure_ascii=False)
+			os.replace(temp_file, self._file_path)
+			self._dirty = False
+			return True
+
+	def close(self) -> None:
+		"""Writes the headlines added since the last write."""
+		self.save()
+
+if __name__ == "__main__":
+	raise ValueError("This script is not meant to be run directly.")
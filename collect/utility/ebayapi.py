@@ -1,23 +1,33 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import heapq
 import os
 import re
+import threading
 import urllib.parse
-import json
 import logging
 
-from .formatted_prompt import PromptPersonalityFunctional, GptFunctionPrompt
+from .formatted_prompt import PromptPersonalityFunctional
+from .gpt_function_prompt import LoadedPrompt, load_prompt
 from .apicache import APICache
-from .aws_helper import AwsS3Helper
+from .aws_helper import AwsS3Helper, S3Service
+from .core.deferred_downloads import DeferredDownloadQueue
+from .core.image_derivatives import ImageDerivativePipeline, ResponsiveImage
 from .core.imagecache import ImageCache
+from .core.image_store import ImageStore
 from .core.jsondatacache import JSONDataCache
+from .core.title_cache import TitleHeadlineCache
+from .core.config_registry import config_registry
+from .core.rate_limit import TokenBudget
+from .core.run_metrics import run_metrics
+from .core.offline import is_offline
+from .core.http_session import mount_transport
 from datetime import datetime, timezone, timedelta
-from ebaysdk.finding import Connection as Finding
-from ebaysdk.exception import ConnectionError
 from os import path
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import NamedTuple
+from typing import Final, Iterable, Iterator, NamedTuple
 from urllib.parse import urlencode, urlparse, urlunparse, parse_qsl, ParseResult
 
 logger = logging.getLogger(__name__)
@@ -38,7 +48,24 @@ class AuctionListing(NamedTuple):
 	image: str
 
 class eBayAPIHelper:
-	def __init__(self):
+	"""Searches the eBay Finding API.
+
+	Searches that need more than one page fetch the pages concurrently,
+	each worker thread with a Finding connection of its own.
+
+	Keyword arguments:
+	* domain -- The host, and optional port, of the Finding API.
+	* https -- False to connect to a local stand-in over plain HTTP.
+	* page_size -- The number of items requested per page.
+	* max_workers -- The number of pages fetched at the same time.
+	"""
+
+	# The Finding API returns at most 100 items per page and 100 pages.
+	_MAX_PAGE_SIZE: Final[int] = 100
+	_MAX_PAGES: Final[int] = 100
+
+	def __init__(self, domain: str = "svcs.ebay.com", https: bool = True,
+				 page_size: int = 100, max_workers: int = 4):
 		self.appid = os.getenv("EBAY_APPID")
 		self.certid = os.getenv("EBAY_CERTID")
 		self.devid = os.getenv("EBAY_DEVID")
@@ -46,11 +73,44 @@ class eBayAPIHelper:
 		if not self.appid or not self.certid or not self.devid:
 			raise ValueError("Please set the EBAY_APPID, EBAY_CERTID, and EBAY_DEVID environment variables.")
 
-		self.api = Finding(
-			appid=self.appid,
-			config_file=None,
-			domain="svcs.ebay.com"
-		)
+		self._domain: str = domain
+		self._https: bool = https
+		self._page_size: int = max(1, min(page_size, eBayAPIHelper._MAX_PAGE_SIZE))
+		self._max_workers: int = max(1, max_workers)
+		self._local: threading.local = threading.local()
+		self._executor: ThreadPoolExecutor | None = None
+		self._executor_lock: threading.Lock = threading.Lock()
+
+	def _connection(self):
+		"""Returns the Finding connection of the current thread."""
+		api = getattr(self._local, "api", None)
+		if api is None:
+			from ebaysdk.finding import Connection as Finding
+			api = Finding(
+				appid=self.appid,
+				config_file=None,
+				domain=self._domain
+			)
+			# The Finding connection forces https, so it is set afterwards.
+			api.config.set('https', self._https, force=True)
+			mount_transport(api.session)
+			self._local.api = api
+		return api
+
+	def _pool(self) -> ThreadPoolExecutor:
+		with self._executor_lock:
+			if self._executor is None:
+				self._executor = ThreadPoolExecutor(
+					max_workers=self._max_workers, thread_name_prefix="ebay-search"
+				)
+			return self._executor
+
+	def close(self) -> None:
+		"""Shuts down the page fetching threads."""
+		with self._executor_lock:
+			if self._executor is not None:
+				self._executor.shutdown(wait=False, cancel_futures=True)
+				self._executor = None
 
 	@staticmethod
 	def generate_epn_link(original_url: str, campaign_id: str, custom_id: str = "") -> str:
@@ -82,7 +142,11 @@ class eBayAPIHelper:
 		)
 		return urlunparse(url_new)
 
-	def search_top_watched_items(self, category_id: str, max_results: int = 10) -> list[dict[str, any]]:
+	def _search_page(self, category_id: str, page: int,
+					 entries_per_page: int) -> tuple[list[dict[str, any]], int]:
+		"""Returns the items on one page of the most watched auctions and the
+		number of pages the search has.
+		"""
 
 		def update_item_times(items: list[dict[str, any]]) -> None:
 			for item in items:
@@ -91,12 +155,14 @@ class eBayAPIHelper:
 				aware_dt: datetime = naive_dt.replace(tzinfo=timezone.utc)
 				item['listingInfo']['endTime'] = aware_dt.isoformat()
 
+		from ebaysdk.exception import ConnectionError
 		try:
 			request_params = {
 				'categoryId': category_id,
 				'outputSelector': 'WatchCount',
 				'paginationInput': {
-					'entriesPerPage': max_results
+					'entriesPerPage': entries_per_page,
+					'pageNumber': page
 				},
 				'sortOrder': 'WatchCountDecreaseSort',
 				'itemFilter': [
@@ -104,46 +170,187 @@ class eBayAPIHelper:
 				]
 			}
 
-			response = self.api.execute('findItemsAdvanced', request_params)
-			items = response.dict().get('searchResult', {}).get('item', [])
+			response = self._connection().execute('findItemsAdvanced', request_params)
+			data: dict[str, any] = response.dict()
+			items = data.get('searchResult', {}).get('item', [])
 			update_item_times(items)
-			return items
+			total_pages: int = int(data.get('paginationOutput', {}).get('totalPages', page))
+			return items, total_pages
 
 		except ConnectionError as e:
 			logger.error(f"Error: {e}")
 			raise
 
+	def iter_top_watched_items(self, category_id: str, budget: int) -> Iterator[dict[str, any]]:
+		"""Yields up to ``budget`` of the most watched auctions in the category
+		as their pages arrive.
+
+		Pages are fetched concurrently, a few ahead of the ones read, and no
+		page is requested past the budget, the last page of the search or a
+		short page.  Items listed on two pages, as happens when the ranking
+		shifts during the search, are yielded once.  A failed first page
+		raises; a failed later page ends the search with the items read.
+		Closing the iterator early cancels the pages not yet requested.
+
+		Keyword arguments:
+		* category_id -- The eBay category.
+		* budget -- The number of items to read.
+		"""
+		if budget <= 0:
+			return
+		per_page: int = min(self._page_size, budget)
+		last_page: int = min(-(-budget // per_page), eBayAPIHelper._MAX_PAGES)
+		if last_page == 1:
+			# A single page is fetched on the calling thread.
+			items, _ = self._search_page(category_id, 1, per_page)
+			yield from items[:budget]
+			return
+
+		pool: ThreadPoolExecutor = self._pool()
+		pending: dict[Future, int] = {}
+		next_page: int = 1
+		seen: set[str] = set()
+		try:
+			while True:
+				while next_page <= last_page and len(pending) < self._max_workers:
+					future: Future = pool.submit(self._search_page, category_id, next_page, per_page)
+					pending[future] = next_page
+					next_page += 1
+				if not pending:
+					return
+				done, _ = wait(pending, return_when=FIRST_COMPLETED)
+				for future in done:
+					page: int = pending.pop(future)
+					if page > last_page:
+						continue
+					try:
+						items, total_pages = future.result()
+					except Exception as e:
+						if page == 1:
+							raise
+						logger.warning(f"Page {page} of category {category_id} failed: {e}")
+						last_page = min(last_page, page - 1)
+						continue
+					if len(items) < per_page:
+						last_page = min(last_page, page)
+					last_page = min(last_page, total_pages)
+					for item in items:
+						if item['itemId'] in seen:
+							continue
+						seen.add(item['itemId'])
+						yield item
+						if len(seen) >= budget:
+							return
+				for future, page in list(pending.items()):
+					if page > last_page and future.cancel():
+						del pending[future]
+		finally:
+			for future in pending:
+				future.cancel()
+
+	def search_top_watched_items(self, category_id: str, max_results: int = 10) -> list[dict[str, any]]:
+		"""Returns up to ``max_results`` of the most watched auctions in the category."""
+		return list(self.iter_top_watched_items(category_id, max_results))
+
 class EBayAuctions:
 	def __init__(self, filepath_cache_directory: str = "cache/",
 				 filepath_image_directory: str = "httpd/i",
 				 filepath_config_directory: str = "config/",
 				 refresh_time: int=8 * 60 * 60,
-				 user_agent: str | None = None):
-		self._ebay_api: eBayAPIHelper = eBayAPIHelper()
+				 user_agent: str | None = None,
+				 s3_service: S3Service | None = None,
+				 image_pipeline: ImageDerivativePipeline | None = None,
+				 image_store: ImageStore | None = None,
+				 large_images: DeferredDownloadQueue | None = None,
+				 prompt_options: dict[str, any] | None = None,
+				 ebay_options: dict[str, any] | None = None,
+				 candidates: int = 0):
+		self._ebay_api: eBayAPIHelper = eBayAPIHelper(**(ebay_options or {}))
+		self._candidates: int = candidates
 		self._api_cache: APICache = APICache(filepath_cache_directory)
 		self._hl_cache: JSONDataCache = JSONDataCache("cache/auctioneer_headlines.json")
+		self._title_cache: TitleHeadlineCache = TitleHeadlineCache("cache/headlines_by_title.json")
 		self._image_dir: str = filepath_image_directory
 		self._refresh_time: int = refresh_time
 		self._cache_dir = filepath_cache_directory
 		self._user_agent: str | None = user_agent
+		self._s3_service: S3Service | None = s3_service
+		self._image_pipeline: ImageDerivativePipeline | None = image_pipeline
+		self._image_jobs: dict[str, Future] = {}
+		self._image_store: ImageStore | None = image_store
+		self._large_images: DeferredDownloadQueue | None = large_images
+		self._prompt_options: dict[str, any] = dict(prompt_options or {})
+		# The token budget and the requests in flight are shared by every
+		# headline prompt of the run.
+		tokens_per_minute: int | None = self._prompt_options.pop("tokens_per_minute", None)
+		self._token_budget: TokenBudget | None = TokenBudget(tokens_per_minute) if tokens_per_minute else None
+		self._prompt_limiter: threading.Semaphore = threading.BoundedSemaphore(
+			self._prompt_options.get("max_concurrency", 4)
+		)
 		self._hl_cache.prune_and_save()
-
-		auctions_list: str = path.join(filepath_config_directory, "auctions-ebay.json")
-		with open(auctions_list, "r") as file:
-			self._auctions: list[dict[str, any]] = json.load(file)
+		if image_store is not None and path.isdir(filepath_image_directory):
+			image_store.migrate(filepath_image_directory, AwsS3Helper._IMAGE_EXTENSIONS)
+		if large_images is not None and not is_offline():
+			large_images.start(self._fetch_large_image)
+
+		self._auctions_file: str = path.join(filepath_config_directory, "auctions-ebay.json")
+		self._auctions_config: tuple = ()
+		self._auctions: list[dict[str, any]] = []
+		self._sync_auctions()
+
+	def _sync_auctions(self) -> None:
+		"""Rebuilds the category list when the auctions file changed, keeping
+		the items of the categories that remain.
+		"""
+		auctions_config: tuple = config_registry().json(self._auctions_file)
+		if auctions_config is self._auctions_config:
+			return
+		items: dict[str, list[dict[str, any]]] = {
+			auction['id']: auction['items'] for auction in self._auctions if 'items' in auction
+		}
+		self._auctions_config = auctions_config
+		self._auctions = [dict(auction) for auction in auctions_config]
+		for auction in self._auctions:
+			if auction['id'] in items:
+				auction['items'] = items[auction['id']]
 
 	@property
 	def auctions(self) -> list[dict[str, any]]:
 		return self._auctions
 
 	def load_auctions(self):
+		self._sync_auctions()
 		for auction in self._auctions:
-			auction['items'] = self._search_top_items_from_catagory(
-				auction['id'],
-				ttl=self._refresh_time,
-				max_results=auction['count']
-			)
+			with run_metrics().span("ebay_fetch", category=auction['id']) as span:
+				auction['items'] = self._search_top_items_from_catagory(
+					auction['id'],
+					ttl=self._refresh_time,
+					max_results=auction['count'],
+					candidates=auction.get('candidates', self._candidates)
+				)
+				span.add(items=len(auction['items']))
 		return self._auctions
+
+	def refresh_auctions(self) -> bool:
+		"""Reload every category and return True if any category listing changed."""
+		previous: list[list[str]] = [
+			[item['itemId'] for item in auction.get('items', [])]
+			for auction in self._auctions
+		]
+		self.load_auctions()
+		current: list[list[str]] = [
+			[item['itemId'] for item in auction['items']]
+			for auction in self._auctions
+		]
+		return previous != current
+
+	def seconds_until_stale(self) -> float:
+		"""Return the number of seconds until the first category cache expires."""
+		remaining: list[float] = []
+		for auction in self._auctions:
+			self._select_category_cache(auction['id'], self._refresh_time)
+			remaining.append(self._api_cache.seconds_until_stale())
+		return min(remaining, default=0.0)
 	
 	def most_watched(self) -> dict[str, any]:
 		return max(
@@ -165,13 +372,16 @@ class EBayAuctions:
 		top_items = sorted(items, key=lambda x: int(x['listingInfo']['watchCount']), reverse=True)[:n]
 		return top_items
 	
-	def top_n_sorted_auctions_static(items: list, n: int) -> list[dict[str, any]]:
-		max_watchers = max(
-			int(item['listingInfo']['watchCount']) for item in items
-		)
-		max_price = max(
-			float(item['sellingStatus']['currentPrice']['value']) for item in items
-		)
+	def top_n_sorted_auctions_static(items: Iterable[dict[str, any]], n: int) -> list[dict[str, any]]:
+		# The items may be a stream of search results; they are collected
+		# with the maxima in one pass as they arrive.
+		collected: list[dict[str, any]] = []
+		max_watchers: int = 0
+		max_price: float = 0.0
+		for item in items:
+			collected.append(item)
+			max_watchers = max(max_watchers, int(item['listingInfo']['watchCount']))
+			max_price = max(max_price, float(item['sellingStatus']['currentPrice']['value']))
 
 		# Define the sort factor calculation
 		def calculate_sort_factor(item):
@@ -183,8 +393,7 @@ class EBayAuctions:
 			weight_price = 0.6
 			return (weight_watchers * normalized_watchers) + (weight_price * normalized_price)
 
-		sorted_items = sorted(items, key=calculate_sort_factor, reverse=True)[:n]
-		return sorted_items
+		return heapq.nlargest(n, collected, key=calculate_sort_factor)
 
 	def top_n_sorted_auctions(self, n: int, exclude: list[str] = []) -> list[dict[str, any]]:
 		items = [
@@ -197,21 +406,67 @@ class EBayAuctions:
 							exclude:list[str] = None) -> list[AuctionListingSimple]:
 		return self._search_results_to_auction_listings(items, epn_category, exclude)
 
-	def _search_top_items_from_catagory(self, category_id: str, ttl: int, max_results: int) -> list[dict[str, any]]:
+	def _search_top_items_from_catagory(self, category_id: str, ttl: int, max_results: int,
+										candidates: int = 0) -> list[dict[str, any]]:
+		"""Returns the best ``max_results`` of the first ``candidates`` most
+		watched auctions in the category, which are read page by page straight
+		into the ranking.  Only the ranked items are cached.
+		"""
 		if not category_id or len(category_id) > 6:
 			raise ValueError("category_id is required and must be less than six characters.")
 
-		self._api_cache._cache_file = str.join(".", [str.zfill(category_id, 6), "json"])	
-		search_results: list[dict[str, any]] = self._api_cache.cached_api_call(
-			self._ebay_api.search_top_watched_items,
-			category_id, max_results
-		)
+		def search() -> list[dict[str, any]]:
+			return EBayAuctions.top_n_sorted_auctions_static(
+				self._ebay_api.iter_top_watched_items(category_id, max(max_results, candidates)),
+				max_results
+			)
+
+		self._select_category_cache(category_id, ttl)
+		search_results: list[dict[str, any]] = self._api_cache.cached_api_call(search)
 		return EBayAuctions.top_n_sorted_auctions_static(search_results, max_results)
 
+	def _select_category_cache(self, category_id: str, ttl: int) -> None:
+		"""Point the API cache at the cache file for the category."""
+		self._api_cache._cache_file = str.join(".", [str.zfill(category_id, 6), "json"])
+		self._api_cache._cache_ttl = ttl
+
+	def _image_cache(self, identifier: str, url: str) -> ImageCache:
+		return ImageCache(
+			url=url, identifier=identifier,
+			cache_dir=self._image_dir, user_agent=self._user_agent,
+			store=self._image_store
+		)
+
+	def _fetch_large_image(self, identifier: str, url: str) -> bool:
+		return self._image_cache(identifier, url).download_image_if_needed()
+
+	def flush(self) -> None:
+		"""Writes the headlines by title and the image store index if they
+		changed since the last write.
+		"""
+		self._title_cache.save()
+		if self._image_store is not None:
+			self._image_store.flush()
+
+	def close(self) -> None:
+		"""Stops the deferred downloads, keeping the pending ones for the next run,
+		and the search threads, and writes the headlines by title and the image
+		store index.
+		"""
+		if self._large_images is not None:
+			self._large_images.close()
+		self._ebay_api.close()
+		self._title_cache.close()
+		if self._image_store is not None:
+			self._image_store.close()
+
 	def process_and_upload_image(self, item: dict) -> str:
 		"""
-		Process an image URL, download the image if necessary, upload it to S3, 
-		and return the image path.
+		Process an image URL, download the image if necessary, upload it to S3
+		when an S3 service was provided and the run is not offline, and return
+		the image path.
+		The large variant is queued for a deferred download and used by the
+		derivative pipeline once it is cached.
 
 		:param self: The instance containing configurations like cache directories.
 		:param item: The dictionary containing the item's details including the image URL and itemId.
@@ -220,7 +475,6 @@ class EBayAuctions:
 		"""
 		image_url: str = item['galleryURL']
 		image_url_large: str = ""
-		path_obj: Path | None = None
 
 		if image_url.endswith("s-l140.jpg"):
 			image_url = image_url.replace("s-l140.jpg", "s-l400.jpg")
@@ -231,7 +485,8 @@ class EBayAuctions:
 		try:
 			image_cache = ImageCache(
 				url=image_url, identifier=item['itemId'],
-				cache_dir=self._image_dir, user_agent=self._user_agent
+				cache_dir=self._image_dir, user_agent=self._user_agent,
+				store=self._image_store
 			)
 		except Exception as e:
 			logger.warning(f"Warning (trying to handle) \"{e.__repr__}\"")
@@ -239,35 +494,73 @@ class EBayAuctions:
 				url=item['galleryURL'],
 				identifier=item['itemId'],
 				cache_dir=self._image_dir,
-				user_agent=self._user_agent
+				user_agent=self._user_agent,
+				store=self._image_store
 			)
 
 
-		# Ensure images are downloaded
+		# Ensure the image is downloaded; the large variant is only queued.
 		image_cache.download_image_if_needed()
-		if image_url_large:
-			image_cache_large = ImageCache(
-				url=image_url_large,
-				identifier=item['itemId'] + "_large",
-				cache_dir=self._image_dir,
-				user_agent=self._user_agent
-			)
-			image_cache_large.download_image_if_needed()
+		image_path_large: str | None = None
+		if image_url_large and self._large_images is not None:
+			identifier_large: str = item['itemId'] + "_large"
+			image_cache_large: ImageCache = self._image_cache(identifier_large, image_url_large)
+			if path.exists(image_cache_large.image_path):
+				image_path_large = image_cache_large.image_path
+			else:
+				self._large_images.enqueue(identifier_large, image_url_large)
 
 		local_path = image_cache.image_path
-		aws_helper = AwsS3Helper(
-			bucket_name='hobbyreport.net',
-			region='us-east-1',
-			ensure_bucket=False,
-			cache_dir=self._cache_dir
-		)
+		# Blobs of the image store are keyed by their content hash.
+		object_name: str = Path(path.relpath(local_path, self._image_dir)).as_posix()
+		if self._image_pipeline is not None:
+			source: str = image_path_large or local_path
+			if path.exists(source):
+				self._image_jobs[item['itemId']] = self._image_pipeline.submit(source)
+		if self._s3_service is not None and not is_offline():
+			aws_helper: AwsS3Helper = self._s3_service.helper()
+			aws_helper.upload_file_if_changed(
+				local_path,
+				f"i/{object_name}"
+			)
+		return f"i/{object_name}"
 
-		path_obj = Path(local_path)
-		aws_helper.upload_file_if_changed(
-			local_path,
-			f"i/{path_obj.name}"
+	def responsive_image(self, item_id: str) -> ResponsiveImage | None:
+		"""Wait for the derivatives of the item image and upload them to S3
+		when an S3 service was provided and the run is not offline.
+
+		Returns None when no derivatives were requested or they failed.
+		"""
+		job: Future | None = self._image_jobs.pop(item_id, None)
+		if job is None:
+			return None
+		try:
+			responsive: ResponsiveImage = job.result()
+		except Exception as e:
+			logger.warning(f"Image derivatives of {item_id} are unavailable: {e}")
+			return None
+		if self._s3_service is not None and not is_offline():
+			aws_helper: AwsS3Helper = self._s3_service.helper()
+			for variant in responsive.variants:
+				aws_helper.upload_file_if_changed(
+					self._image_pipeline.local_path(variant),
+					variant.path
+				)
+		return responsive
+
+	@staticmethod
+	def _headline_function() -> LoadedPrompt:
+		return load_prompt("prompts/function_headlines.json")
+
+	def _headline_prompt(self, loaded: LoadedPrompt) -> PromptPersonalityFunctional:
+		return PromptPersonalityFunctional(
+			apikey=os.getenv("OPENAI_API_KEY"),
+			prompt=loaded.prompt,
+			function_schema=loaded.function_schema,
+			budget=self._token_budget,
+			limiter=self._prompt_limiter,
+			**self._prompt_options
 		)
-		return str(Path('i') / path_obj.name)
 
 	def top_item_to_auction_listing(
 			self,
@@ -285,20 +578,28 @@ class EBayAuctions:
 			title = self._hl_cache.find_record_by_id(item['itemId'])['headline']
 
 		else:
-			with open("prompts/function_headlines.json", "r") as file:
-				function_def = json.load(file)
-				prompt: GptFunctionPrompt = GptFunctionPrompt.from_dict(function_def)
-				fprompt: PromptPersonalityFunctional = PromptPersonalityFunctional(
-					apikey=os.getenv("OPENAI_API_KEY"),
-					prompt=prompt
-				)
+			loaded: LoadedPrompt = EBayAuctions._headline_function()
+			version: str = loaded.version
+			title = self._title_cache.find(version, item['title']) or ""
+			if title:
+				self._hl_cache.add_record(title=title, record_id=item['itemId'])
+			else:
+				fprompt: PromptPersonalityFunctional = self._headline_prompt(loaded)
 				fprompt.add_prompt_item_data((item['title'], item['itemId']),)
-				results: list[dict[str, str]] = fprompt.get_results()
+				try:
+					results: list[dict[str, str]] = fprompt.get_results()
+				except Exception as e:
+					logger.error(f"Could not generate the headline of {item['itemId']}: {e}")
+					results = []
 				for result in results:
-					result["identifier"]
+					if result["identifier"] != item['itemId']:
+						continue
 					title = result["headline"]
 					self._hl_cache.add_record(title=title, record_id=result["identifier"])
+					self._title_cache.add(version, item['title'], title)
 					break
+			if not title:
+				title = item['title']
 
 		item_url: str = item['viewItemURL']
 		epn_url: str = eBayAPIHelper.generate_epn_link(item_url, epn_category)
@@ -332,26 +633,46 @@ class EBayAuctions:
 		ctr: int = 0
 		headlines_ids: dict[str, str] = {}
 
-		with open("prompts/function_headlines.json", "r") as file:
-			function_def = json.load(file)
-			prompt = GptFunctionPrompt.from_dict(function_def)
-			fprompt = PromptPersonalityFunctional(os.getenv("OPENAI_API_KEY"), prompt)
-		
-			for item in items:
-				item_id = item['itemId']
-				if exclude and item_id in exclude:
-					continue
-			
-				if not self._hl_cache.record_exists(item_id):
-					fprompt.add_prompt_item_data((item['title'], item_id),)
-				else:
-					headlines_ids[item_id] = self._hl_cache.find_title_by_id(item_id)
-
-			if len(fprompt) > 0:
-				results: list[dict[str, str]] = fprompt.get_results()
-				for result in results:
-					headlines_ids[result['identifier']] = result['headline']
-					self._hl_cache.add_record(result['headline'], result['identifier'])
+		loaded: LoadedPrompt = EBayAuctions._headline_function()
+		fprompt: PromptPersonalityFunctional = self._headline_prompt(loaded)
+		version: str = loaded.version
+		# Items sharing a normalized title are sent once, keyed by the first item.
+		pending_titles: dict[str, str] = {}
+		pending_items: dict[str, list[dict]] = {}
+
+		for item in items:
+			item_id = item['itemId']
+			if exclude and item_id in exclude:
+				continue
+
+			if self._hl_cache.record_exists(item_id):
+				headlines_ids[item_id] = self._hl_cache.find_title_by_id(item_id)
+				continue
+			cached_headline: str | None = self._title_cache.find(version, item['title'])
+			if cached_headline:
+				run_metrics().count("headline_cache", title_hits=1)
+				headlines_ids[item_id] = cached_headline
+				self._hl_cache.add_record(cached_headline, item_id)
+				continue
+			key: str = TitleHeadlineCache.key(version, item['title'])
+			if key not in pending_titles:
+				pending_titles[key] = item_id
+				pending_items[item_id] = []
+				fprompt.add_prompt_item_data((item['title'], item_id),)
+			pending_items[pending_titles[key]].append(item)
+
+		if len(fprompt) > 0:
+			results: list[dict[str, str]] = []
+			try:
+				results = fprompt.get_results()
+			except Exception as e:
+				# The listings fall back to their original titles.
+				logger.error(f"Could not generate headlines: {e}")
+			for result in results:
+				for pending_item in pending_items.get(result['identifier'], []):
+					headlines_ids[pending_item['itemId']] = result['headline']
+					self._hl_cache.add_record_if_not_exists(result['headline'], pending_item['itemId'])
+					self._title_cache.add(version, pending_item['title'], result['headline'])
 
 		for item in items:
 			item_id = item['itemId']
@@ -3,11 +3,22 @@
 
 import logging
 import json
-import requests
+import threading
+import time
 
 from .gpt_function_prompt import GptFunctionPrompt, GptFunctionProperty
+from .core.http_session import shared_session
+from .core.rate_limit import TokenBudget, backoff_delay
+from .core.run_metrics import run_metrics
+from .core.offline import OfflineError, is_offline
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
 from io import StringIO
-from typing import overload
+from typing import Callable, Final, TYPE_CHECKING, overload
+
+if TYPE_CHECKING:
+	import requests
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +33,21 @@ class PromptPersonalityFunctional:
 			model (str): The model to use for the completion. Default is "gpt-4o-mini".
 			prompt (GptFunctionPrompt): The functional prompt.  It will have
 				json data appended to the prompt to call the function.
+			chunk_size (int): The number of items sent in one request.
+			max_concurrency (int): The number of requests sent at once.
+			tokens_per_minute (int | None): The token budget shared by the
+				requests, or None for no budget.
+			budget (TokenBudget | None): A token budget shared with other
+				prompts, used instead of ``tokens_per_minute``.
+			limiter (threading.Semaphore | None): Limits the requests in
+				flight across the prompts sharing it.
+			max_retries (int): The number of retries after a 429 or 5xx
+				response, a timeout or a connection error.
+			timeout (float): The timeout of each request in seconds.
+			url (str): The chat completions endpoint, overridden to use a
+				local stand-in.
+			function_schema (dict | None): The function schema of the prompt,
+				when it was already built.
 
 		Methods:
 			add_prompt_item(item: dict[str, str]) -> None: Add a single item to the prompt.
@@ -30,19 +56,45 @@ class PromptPersonalityFunctional:
 			get_results() -> Iterator[dict[str, str]]: Get the results from the chat completion.
 
 	"""
+	_URL: Final[str] = "https://api.openai.com/v1/chat/completions"
+	_RETRY_STATUS_CODES: Final[frozenset[int]] = frozenset({429, 500, 502, 503, 504})
+	_IDENTIFIER: Final[str] = "identifier"
 
 	def __init__(
 			self,
 			apikey: str,
 			prompt: GptFunctionPrompt,
-			model: str = "gpt-4o-mini"
+			model: str = "gpt-4o-mini",
+			chunk_size: int = 20,
+			max_concurrency: int = 4,
+			tokens_per_minute: int | None = None,
+			max_retries: int = 4,
+			timeout: float = 60.0,
+			url: str = _URL,
+			function_schema: dict[str, any] | None = None,
+			sleep: Callable[[float], None] = time.sleep,
+			budget: TokenBudget | None = None,
+			limiter: threading.Semaphore | None = None
 		):
 		if not apikey:
 			raise ValueError("OpenAI API key is missing. Ensure it is set in the environment variables.")
+		if chunk_size < 1 or max_concurrency < 1:
+			raise ValueError("chunk_size and max_concurrency must be at least 1.")
 		self._apikey: str = apikey
 		self._model = model
 		self._prompt: GptFunctionPrompt = prompt
 		self._prompt_items: list[dict[str, str]] = []
+		self._chunk_size: int = chunk_size
+		self._max_concurrency: int = max_concurrency
+		if budget is None and tokens_per_minute:
+			budget = TokenBudget(tokens_per_minute)
+		self._budget: TokenBudget | None = budget
+		self._limiter: threading.Semaphore | None = limiter
+		self._max_retries: int = max_retries
+		self._timeout: float = timeout
+		self._url: str = url
+		self._function_schema: dict[str, any] = function_schema or prompt.function.to_dict()
+		self._sleep: Callable[[float], None] = sleep
 
 	def __len__(self) -> int:
 		return len(self._prompt_items)
@@ -64,8 +116,8 @@ class PromptPersonalityFunctional:
 		fun_prop: GptFunctionProperty = self._prompt.function.parameters.properties[fun_param_name]
 		return fun_prop.items.required
 
-	def _generate_prompt(self) -> str:
-		prompt_data = json.dumps(self._prompt_items, indent="\t")
+	def _generate_prompt(self, items: list[dict[str, str]] | None = None) -> str:
+		prompt_data = json.dumps(self._prompt_items if items is None else items, indent="\t")
 		buffer_prompt = StringIO()
 		buffer_prompt.write(self._prompt.prompt)
 		buffer_prompt.write("\n```json\n")
@@ -76,35 +128,93 @@ class PromptPersonalityFunctional:
 		logger.info(f"Generated prompt: {s}")
 		return s
 
-	def _handle_api_response(self, response: requests.Response) -> dict[str, any]:
+	def _handle_api_response(self, response: "requests.Response") -> dict[str, any]:
 		if response.status_code != 200:
 			logger.error(f"API request failed. Status Code: {response.status_code}.")
 			logger.error(f"Response: {response.text}.")
 			response.raise_for_status()
 		return response.json()
 
-	def _request_chat_completion_functional(self) -> dict[str, any]:
-		url = "https://api.openai.com/v1/chat/completions"
+	@staticmethod
+	def _retry_after(response: "requests.Response") -> float | None:
+		value: str | None = response.headers.get("Retry-After")
+		if not value:
+			return None
+		try:
+			return max(0.0, float(value))
+		except ValueError:
+			pass
+		try:
+			retry_at: datetime = parsedate_to_datetime(value)
+		except (TypeError, ValueError):
+			return None
+		return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+	@staticmethod
+	def _estimate_tokens(json_data: dict[str, any]) -> int:
+		"""Estimates the tokens of a request and its reply at four characters a token."""
+		prompt_tokens: int = len(json.dumps(json_data)) // 4
+		return prompt_tokens * 2
+
+	def _post(self, json_data: dict[str, any]) -> "requests.Response":
+		import requests
 		headers = {
 			"Content-Type": "application/json",
 			"Authorization": f"Bearer {self._apikey}",
 		}
-		functions: list[dict[str, any]] = [self._prompt.function.to_dict()]
+		attempt: int = 0
+		while True:
+			retry_after: float | None = None
+			try:
+				with run_metrics().span("openai_request") as span:
+					response: requests.Response = shared_session().post(
+						url=self._url, headers=headers,
+						json=json_data, timeout=self._timeout
+					)
+					span.add(retries=int(attempt > 0))
+				if response.status_code not in PromptPersonalityFunctional._RETRY_STATUS_CODES:
+					return response
+				retry_after = PromptPersonalityFunctional._retry_after(response)
+				if attempt >= self._max_retries:
+					return response
+				logger.warning(f"API request returned {response.status_code}, retrying.")
+			except (requests.ConnectionError, requests.Timeout) as e:
+				if attempt >= self._max_retries:
+					raise
+				logger.warning(f"API request failed: {e}, retrying.")
+			self._sleep(backoff_delay(attempt, retry_after=retry_after))
+			attempt += 1
+
+	def _request_chat_completion_functional(self, items: list[dict[str, str]] | None = None) -> dict[str, any]:
+		functions: list[dict[str, any]] = [self._function_schema]
 		json_data: dict[str, any] = {
 			"model": self._model,
 			"messages": [
 				{ "role": "system", "content": self._prompt.context },
-				{ "role": "user", "content": self._generate_prompt() },
+				{ "role": "user", "content": self._generate_prompt(items) },
 			],
 			"functions": functions,
 			"function_call": {
 				"name": self._prompt.function.name
 			},
 		}
-		response = requests.post(url=url, headers=headers, json=json_data)
+		estimate: int = 0
+		if self._budget:
+			estimate = PromptPersonalityFunctional._estimate_tokens(json_data)
+			self._budget.acquire(estimate)
+		if self._limiter is not None:
+			with self._limiter:
+				response = self._post(json_data)
+		else:
+			response = self._post(json_data)
 		functions.clear()
 		json_data.clear()
-		return self._handle_api_response(response)
+		result: dict[str, any] = self._handle_api_response(response)
+		if self._budget:
+			used: int | None = result.get("usage", {}).get("total_tokens")
+			if used is not None:
+				self._budget.adjust(used - estimate)
+		return result
 
 	@overload
 	def add_prompt_item(self, item: dict[str, str]) -> None: ...
@@ -130,13 +240,77 @@ class PromptPersonalityFunctional:
 				raise ValueError("Item does not match the required function parameters.")
 			self._prompt_items.append(item)
 
-	def get_results(self) -> list[dict[str, str]]:
-		response: dict[str, any] = self._request_chat_completion_functional()
+	def _chunks(self) -> list[list[dict[str, str]]]:
+		return [
+			self._prompt_items[i:i + self._chunk_size]
+			for i in range(0, len(self._prompt_items), self._chunk_size)
+		]
+
+	def _chunk_results(self, items: list[dict[str, str]]) -> list[dict[str, str]]:
+		response: dict[str, any] = self._request_chat_completion_functional(items)
 		arguments = json.loads(
 			response["choices"][0]["message"]["function_call"]['arguments']
 		)
 		fun_arguments: list[dict[str, str]] = arguments[self._prompt.function.parameters.required[0]]
 		return fun_arguments
 
+	def _merge_results(self, results: list[list[dict[str, str]]]) -> list[dict[str, str]]:
+		"""Merges the results of the chunks in the order of the prompt items.
+
+		Results are matched to the items by identifier; results without a
+		known identifier are appended.
+		"""
+		key: str = PromptPersonalityFunctional._IDENTIFIER
+		if key not in self._fun_object_properties():
+			return [result for chunk in results for result in chunk]
+		by_identifier: dict[str, dict[str, str]] = {}
+		unmatched: list[dict[str, str]] = []
+		for chunk in results:
+			for result in chunk:
+				if key in result:
+					by_identifier.setdefault(str(result[key]), result)
+				else:
+					unmatched.append(result)
+		merged: list[dict[str, str]] = []
+		for item in self._prompt_items:
+			result: dict[str, str] | None = by_identifier.pop(str(item[key]), None)
+			if result is not None:
+				merged.append(result)
+		merged.extend(by_identifier.values())
+		merged.extend(unmatched)
+		return merged
+
+	def get_results(self) -> list[dict[str, str]]:
+		"""Requests the results of the prompt items, a chunk per request.
+
+		Chunks are requested concurrently.  A chunk that still fails after
+		its retries is logged and left out; the first error is raised only
+		when every chunk failed.
+		"""
+		if is_offline():
+			raise OfflineError("Offline, not requesting headlines.")
+		with run_metrics().span("headlines") as span:
+			span.add(items=len(self._prompt_items))
+			return self._get_chunked_results()
+
+	def _get_chunked_results(self) -> list[dict[str, str]]:
+		chunks: list[list[dict[str, str]]] = self._chunks()
+		if len(chunks) <= 1:
+			return self._merge_results([self._chunk_results(self._prompt_items)])
+
+		results: list[list[dict[str, str]]] = []
+		errors: list[Exception] = []
+		with ThreadPoolExecutor(max_workers=min(self._max_concurrency, len(chunks))) as executor:
+			futures = [executor.submit(self._chunk_results, chunk) for chunk in chunks]
+			for future in futures:
+				try:
+					results.append(future.result())
+				except Exception as e:
+					logger.error(f"Chunk request failed: {e}")
+					errors.append(e)
+		if errors and not results:
+			raise errors[0]
+		return self._merge_results(results)
+
 if __name__ == "__main__":
 	raise ValueError("This script is not meant to be run directly.")
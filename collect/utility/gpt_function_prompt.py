@@ -2,6 +2,10 @@
 # -*- coding: utf-8 -*-
 
 from dataclasses import dataclass, field
+from typing import Final, Mapping, NamedTuple
+
+from .core.config_registry import ConfigRegistry, config_registry, freeze, require_keys
+from .core.title_cache import prompt_version
 
 @dataclass
 class GptFunctionItemProperty:
@@ -107,5 +111,36 @@ class GptFunctionPrompt:
 		function = GptFunction(fun["name"], fun["description"], params)
 		return cls(data["name"], data["context"], data["prompt"], function)
 
+PROMPT_LOADER: Final[str] = "prompt"
+
+class LoadedPrompt(NamedTuple):
+	"""A function prompt, parsed and hashed once per version of its file."""
+	definition: Mapping[str, any]
+	prompt: GptFunctionPrompt
+	version: str
+	function_schema: dict[str, any]
+
+def parse_prompt(file_path: str, data: any) -> LoadedPrompt:
+	"""Parses a function prompt file, the ConfigRegistry loader of prompts."""
+	require_keys(file_path, data, ("name", "context", "prompt", "function"))
+	try:
+		prompt: GptFunctionPrompt = GptFunctionPrompt.from_dict(data)
+	except (KeyError, TypeError) as e:
+		raise ValueError(f"{file_path} has an invalid function definition: {e}") from e
+	if not prompt.function.parameters.required:
+		raise ValueError(f"{file_path} does not require a function parameter.")
+	return LoadedPrompt(
+		definition=freeze(data),
+		prompt=prompt,
+		version=prompt_version(data),
+		function_schema=prompt.function.to_dict()
+	)
+
+def load_prompt(file_path: str, registry: ConfigRegistry | None = None) -> LoadedPrompt:
+	"""Returns the function prompt defined in the file, parsed once per version."""
+	return (registry or config_registry()).load(PROMPT_LOADER, file_path)
+
+config_registry().register_loader(PROMPT_LOADER, parse_prompt)
+
 if __name__ == "__main__":
 	raise ValueError("This script is not meant to be run directly.")
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import logging
+import mimetypes
+
+from concurrent.futures import ThreadPoolExecutor, as_completed, Future
+from typing import Callable, Final, NamedTuple
+
+from .core.file_upload_tracker import FileUploadTracker, FileDigests
+from .core.run_metrics import run_metrics
+
+logger = logging.getLogger(__name__)
+
+class SyncItem(NamedTuple):
+	file_path: str
+	object_name: str
+
+def content_type_args(file_path: str) -> dict[str, str]:
+	"""Returns the ExtraArgs for an upload, with the content type of the file."""
+	content_type, _ = mimetypes.guess_type(file_path)
+	return {"ContentType": content_type or "application/octet-stream"}
+
+class S3RemoteListing:
+	"""The objects in the bucket, listed once and cached between runs.
+
+	The listing maps each object key to its size and ETag.  It is fetched
+	with a paginated ``list_objects_v2`` when the cache file is missing or
+	older than ``max_age`` seconds, and kept up to date with the uploads and
+	deletions made by the sync.
+	"""
+	_KEY_SIZE: Final[str] = "size"
+	_KEY_ETAG: Final[str] = "etag"
+
+	def __init__(self, s3_client: any, bucket_name: str, cache_file: str,
+				 max_age: int = 24 * 60 * 60):
+		self._s3_client: any = s3_client
+		self._bucket_name: str = bucket_name
+		self._cache_file: str = cache_file
+		self._max_age: int = max_age
+		self._objects: dict[str, dict[str, any]] | None = None
+		self._timestamp: float = 0.0
+
+	def _load_cache(self) -> bool:
+		if not os.path.exists(self._cache_file):
+			return False
+		with open(self._cache_file, "r") as file:
+			try:
+				data: dict[str, any] = json.load(file)
+			except json.JSONDecodeError:
+				logger.warning(f"Corrupted remote listing cache: {self._cache_file}")
+				return False
+		if data.get("bucket") != self._bucket_name \
+				or time.time() - data.get("timestamp", 0) >= self._max_age:
+			return False
+		self._objects = data["objects"]
+		self._timestamp = data["timestamp"]
+		return True
+
+	def save(self) -> None:
+		"""Saves the listing to the cache file."""
+		if self._objects is None:
+			return
+		with open(self._cache_file, "w") as file:
+			json.dump({
+				"bucket": self._bucket_name,
+				"timestamp": self._timestamp,
+				"objects": self._objects
+			}, file)
+
+	def refresh(self) -> None:
+		"""Lists the bucket with a paginated list_objects_v2."""
+		objects: dict[str, dict[str, any]] = {}
+		paginator: any = self._s3_client.get_paginator("list_objects_v2")
+		for page in paginator.paginate(Bucket=self._bucket_name):
+			for content in page.get("Contents", []):
+				objects[content["Key"]] = {
+					S3RemoteListing._KEY_SIZE: content["Size"],
+					S3RemoteListing._KEY_ETAG: content["ETag"].strip('"')
+				}
+		self._objects = objects
+		self._timestamp = time.time()
+		logger.info(f"Listed {len(objects)} objects in {self._bucket_name}.")
+		self.save()
+
+	@property
+	def objects(self) -> dict[str, dict[str, any]]:
+		if self._objects is None and not self._load_cache():
+			self.refresh()
+		return self._objects
+
+	def matches(self, key: str, digests: FileDigests) -> bool:
+		"""Returns True if the remote object has the size and MD5 of the local file.
+
+		The ETag of a multipart upload is not the MD5 of the object, so such
+		objects are compared by size only.
+		"""
+		remote: dict[str, any] | None = self.objects.get(key)
+		if not remote or remote[S3RemoteListing._KEY_SIZE] != digests.size:
+			return False
+		etag: str = remote[S3RemoteListing._KEY_ETAG]
+		return "-" in etag or etag == digests.md5
+
+	def set(self, key: str, digests: FileDigests) -> None:
+		self.objects[key] = {
+			S3RemoteListing._KEY_SIZE: digests.size,
+			S3RemoteListing._KEY_ETAG: digests.md5
+		}
+
+	def remove(self, key: str) -> None:
+		self.objects.pop(key, None)
+
+class S3SyncManager:
+	"""Uploads the files that changed since their last upload.
+
+	Each file is hashed once in a thread pool.  The changed files are then
+	uploaded concurrently over one shared S3 client, and the upload tracker
+	is saved once at the end.  Files whose size and modification time match
+	the upload manifest are not read at all.
+
+	When a remote listing is given, files are compared with the objects in
+	the bucket rather than with the local manifest, so a host without the
+	manifest still uploads only the differences.
+
+	Keyword arguments:
+	* s3_client -- The boto3 S3 client shared by every upload.
+	* bucket_name -- The destination bucket.
+	* tracker -- The tracker recording the uploaded file hashes.
+	* max_workers -- The number of concurrent hashes and uploads.
+	"""
+	_DELETE_BATCH_SIZE: Final[int] = 1000
+
+	def __init__(self, s3_client: any, bucket_name: str,
+				 tracker: FileUploadTracker, max_workers: int = 8):
+		if max_workers < 1:
+			raise ValueError("max_workers must be at least 1.")
+		self._s3_client: any = s3_client
+		self._bucket_name: str = bucket_name
+		self._tracker: FileUploadTracker = tracker
+		self._max_workers: int = max_workers
+
+	@staticmethod
+	def walk_directory(directory_path: str, prefix: str = "",
+					   include: Callable[[str], bool] | None = None) -> list[SyncItem]:
+		"""Returns the files below the directory, keyed by their relative path."""
+		items: list[SyncItem] = []
+		for root, _, files in os.walk(directory_path):
+			for file in files:
+				if include and not include(file):
+					continue
+				file_path: str = os.path.join(root, file)
+				relative_path: str = os.path.relpath(file_path, directory_path)
+				object_name: str = prefix + relative_path.replace(os.sep, "/")
+				items.append(SyncItem(file_path, object_name))
+		return items
+
+	def _hash_items(self, items: list[SyncItem]) -> dict[SyncItem, FileDigests]:
+		with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+			digests: list[FileDigests] = list(executor.map(
+				lambda item: self._tracker.file_digests(item.file_path, item.object_name), items
+			))
+		return dict(zip(items, digests))
+
+	def _upload(self, item: SyncItem) -> None:
+		with run_metrics().span("s3_upload") as span:
+			self._s3_client.upload_file(
+				item.file_path, self._bucket_name, item.object_name,
+				ExtraArgs=content_type_args(item.file_path)
+			)
+			span.add(files=1, bytes=os.path.getsize(item.file_path))
+		logger.info(f"File {item.file_path} uploaded to {self._bucket_name}/{item.object_name}")
+
+	def _delete(self, keys: list[str]) -> None:
+		for i in range(0, len(keys), S3SyncManager._DELETE_BATCH_SIZE):
+			batch: list[str] = keys[i:i + S3SyncManager._DELETE_BATCH_SIZE]
+			with run_metrics().span("s3_delete") as span:
+				self._s3_client.delete_objects(
+					Bucket=self._bucket_name,
+					Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True}
+				)
+				span.add(files=len(batch))
+			logger.info(f"Deleted {len(batch)} objects from {self._bucket_name}.")
+
+	def sync(self, items: list[SyncItem], remote: S3RemoteListing | None = None,
+			 delete_prefix: str | None = None) -> list[str]:
+		"""Uploads the changed items and returns the object names that were uploaded.
+
+		With a remote listing, objects below ``delete_prefix`` that have no
+		local file are deleted from the bucket.
+		"""
+		if not items and delete_prefix is None:
+			return []
+
+		digests: dict[SyncItem, FileDigests] = self._hash_items(items)
+		changed: list[SyncItem] = [
+			item for item in items
+			if (not remote.matches(item.object_name, digests[item]) if remote
+				else self._tracker.has_changed_hash(item.object_name, digests[item].sha256))
+		]
+		logger.info(f"{len(changed)} of {len(items)} files changed.")
+
+		uploaded: list[str] = []
+		errors: list[Exception] = []
+		with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+			futures: dict[Future, SyncItem] = {
+				executor.submit(self._upload, item): item for item in changed
+			}
+			for future in as_completed(futures):
+				item: SyncItem = futures[future]
+				try:
+					future.result()
+				except Exception as e:
+					logger.error(f"Could not upload {item.file_path}: {e}")
+					errors.append(e)
+					continue
+				self._tracker.mark_as_uploaded(
+					item.file_path, key=item.object_name,
+					digests=digests[item], save=False
+				)
+				if remote:
+					remote.set(item.object_name, digests[item])
+				uploaded.append(item.object_name)
+
+		if remote and delete_prefix is not None and not errors:
+			local: set[str] = {item.object_name for item in items}
+			orphans: list[str] = sorted(
+				key for key in remote.objects
+				if key.startswith(delete_prefix) and key not in local
+			)
+			if orphans:
+				self._delete(orphans)
+				for key in orphans:
+					remote.remove(key)
+
+		if uploaded:
+			self._tracker.save()
+		if remote:
+			remote.save()
+		if errors:
+			raise errors[0]
+		return uploaded
+
+	def sync_directory(self, directory_path: str, prefix: str = "",
+					   include: Callable[[str], bool] | None = None,
+					   remote: S3RemoteListing | None = None,
+					   delete_orphans: bool = False) -> list[str]:
+		"""Uploads the changed files below the directory.
+
+		With a remote listing and ``delete_orphans``, objects below ``prefix``
+		without a local file are deleted.
+		"""
+		return self.sync(
+			S3SyncManager.walk_directory(directory_path, prefix, include),
+			remote=remote,
+			delete_prefix=prefix if delete_orphans else None
+		)
+
+if __name__ == "__main__":
+	raise ValueError("This script is not meant to be run directly.")